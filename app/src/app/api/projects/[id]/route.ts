@@ -241,6 +241,7 @@ export async function PUT(
 
         // Log the activity
         await logActivity(supabase, id, 'brief_created', 'Brief created', body.user_id)
+        await invalidateAgentCache(id)
 
         return NextResponse.json(newBrief)
       }
@@ -263,6 +264,7 @@ export async function PUT(
 
     // Log the activity
     await logActivity(supabase, id, 'brief_updated', 'Brief updated from canvas', body.user_id, briefUpdate)
+    await invalidateAgentCache(id)
 
     return NextResponse.json(briefData)
   } catch (error) {
@@ -568,3 +570,16 @@ async function logActivity(
     console.error('Error logging activity:', error)
   }
 }
+
+// Helper to drop the agent backend's cached copy of a project after a write
+async function invalidateAgentCache(caseId: string) {
+  const agentUrl = process.env.LANGGRAPH_URL || 'http://localhost:8000'
+  try {
+    await fetch(`${agentUrl}/cache/projects/${encodeURIComponent(caseId)}/invalidate`, {
+      method: 'POST',
+      signal: AbortSignal.timeout(2000),
+    })
+  } catch (error) {
+    console.error('Error invalidating agent cache:', error)
+  }
+}
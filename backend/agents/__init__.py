@@ -1,3 +1,11 @@
-from .brief_analyzer import brief_analyzer_graph
+def __getattr__(name: str):
+    # Importing a light submodule (agents.http_client, ...) shouldn't load the
+    # graph and its dependencies; the compiled graph is resolved on first access
+    if name == "brief_analyzer_graph":
+        from .brief_analyzer import get_brief_analyzer_graph
+
+        return get_brief_analyzer_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["brief_analyzer_graph"]
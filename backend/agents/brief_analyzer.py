@@ -3,44 +3,84 @@ Brief Analyzer Agent using LangGraph
 
 This agent analyzes raw client briefs and extracts structured data
 for the TF Project Builder.
+
+Importing this module doesn't load langchain_core, langgraph or copilotkit:
+the graph (with its state schema in agents.graph_state), the model's tools
+and the message classes are imported where they are first used.
 """
 
 import os
+import asyncio
 import json
+import logging
+import time
 import httpx
-from typing import TypedDict, Annotated, Any
-from operator import add
-
-from langchain_groq import ChatGroq
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
-from langchain_core.tools import tool
-from langgraph.graph import StateGraph, END
-from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import ToolNode
-from copilotkit import CopilotKitState
-
-# Frontend API base URL (Next.js app)
-FRONTEND_API_URL = os.getenv("FRONTEND_API_URL", "http://localhost:3000")
-
-# Field priorities for completeness calculation
-CRITICAL_FIELDS = [
+from typing import TYPE_CHECKING, Optional, TypedDict, Any
+
+from .brief_answers import answer_brief_question
+from .brief_index import brief_index
+from .cancellation import ensure_latest, record_cancelled_work
+from .chunked_extraction import extract_chunked, CHUNKED_EXTRACTION_THRESHOLD
+from .extraction_cache import extraction_cache, extraction_cache_key
+from .field_commands import parse_field_command, FIELD_COMMAND_MIN_CONFIDENCE
+from .hedging import LLM_HEDGE_FALLBACK_MODEL, llm_hedger, remaining_budget, turn_budget
+from .http_client import get_http_client
+from .intent_router import (
+    INTENT_BRIEF_PASTE,
+    INTENT_FIELD_EDIT,
+    INTENT_QUESTION,
+    TIER_LARGE,
+    TIER_SMALL,
+    route_intent,
+    routing_stats,
+    tier_model,
+)
+from .json_patch import patch_from_field_updates
+from .json_stream import StreamingJSONObjectParser
+from .llm_registry import llm_registry
+from .observability import (
+    TIME_TO_FIRST_FIELD,
+    TIME_TO_FIRST_TOKEN,
+    get_logger,
+    log_fields,
+    record_llm_usage,
+    span,
+    turn,
+)
+from .project_cache import project_cache
+from .prompts import (
+    EXTRACTION_PROMPT_VERSION,
+    build_extraction_messages,
+    compact_json,
+    prompt_token_stats,
+    revision_message,
+    truncated_history,
+)
+from .scoring import scoring_rules
+from .structured_output import build_extraction_model, json_mode_enabled, parse_extraction_output
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage, BaseMessage
+    from langchain_core.runnables import RunnableConfig
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+
+    from .graph_state import BriefAnalyzerState
+
+logger = get_logger(__name__)
+
+# Every extractable field; which ones count toward completeness (and how much)
+# is part of the scoring rules (agents.scoring)
+ALL_FIELDS = [
     "client_name",
     "budget_amount",  # Renamed from 'budget' to match frontend
     "territory",
     "deadline_date",
-]
-
-IMPORTANT_FIELDS = [
     "project_title",
     "media_types",
     "creative_direction",
     "video_lengths",
     "brief_sender_name",
     "brief_sender_email",
-]
-
-HELPFUL_FIELDS = [
     "agency_name",
     "brand_name",
     "mood_keywords",
@@ -52,9 +92,6 @@ HELPFUL_FIELDS = [
     "term_length",
     "exclusivity",
     "air_date",
-]
-
-ALL_FIELDS = CRITICAL_FIELDS + IMPORTANT_FIELDS + HELPFUL_FIELDS + [
     "budget_currency",
     "exclusivity_details",
     "must_avoid",
@@ -89,12 +126,83 @@ def resolve_project_id(state: dict[str, Any]) -> str | None:
     return None
 
 
+def brief_scope(project_id: str | None, config: "RunnableConfig | None") -> str | None:
+    """Near-duplicate index scope: the project, else the thread (None outside both)"""
+    if project_id:
+        return f"project:{project_id}"
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    return f"thread:{thread_id}" if thread_id else None
+
+
 # =============================================================================
 # Tools for the agent
 # =============================================================================
 
-@tool
-def get_project_data(project_id: str) -> str:
+def format_project_info(data: dict[str, Any]) -> dict[str, Any]:
+    """Project a /api/projects/{id} response onto the agent's brief fields"""
+    # Extract brief data from the response
+    brief = data.get("tf_briefs")
+    if isinstance(brief, list):
+        brief = brief[0] if brief else {}
+    elif brief is None:
+        brief = {}
+
+    # Format the relevant data for the agent
+    project_info = {
+        "project_id": data.get("id"),
+        "case_number": data.get("case_number"),
+        "project_type": data.get("project_type"),
+        "status": data.get("status"),
+        "project_title": brief.get("project_title") or data.get("project_title"),
+        "client": brief.get("client"),
+        "agency": brief.get("agency"),
+        "brand": brief.get("brand"),
+        "budget_amount": brief.get("budget_min"),
+        "budget_currency": "EUR",  # Default
+        "territory": brief.get("territory"),
+        "media_types": brief.get("media"),
+        "term_length": brief.get("term"),
+        "exclusivity": brief.get("exclusivity"),
+        "creative_direction": brief.get("mood") or brief.get("creative_direction"),
+        "mood_keywords": brief.get("keywords"),
+        "genre_preferences": brief.get("genres"),
+        "reference_tracks": brief.get("reference_tracks"),
+        "vocals_preference": brief.get("vocals_preference"),
+        "video_lengths": brief.get("lengths"),
+        "deadline_date": brief.get("submission_deadline"),
+        "air_date": brief.get("air_date"),
+        "brief_sender_name": brief.get("brief_sender_name"),
+        "brief_sender_email": brief.get("brief_sender_email"),
+        "completion_rate": brief.get("completion_rate"),
+    }
+
+    # Filter out None values for cleaner output
+    return {k: v for k, v in project_info.items() if v is not None}
+
+
+class ProjectFetchError(Exception):
+    """Raised when the frontend API cannot return a project"""
+
+
+async def fetch_project_info(project_id: str) -> dict[str, Any]:
+    """Fetch a project from the Next.js API and project it onto brief fields"""
+    # Shared pooled client, owned by the FastAPI lifespan
+    client = get_http_client()
+    try:
+        response = await client.get(f"/api/projects/{project_id}")
+    except httpx.TimeoutException:
+        raise ProjectFetchError("Request timed out")
+
+    if response.status_code == 404:
+        raise ProjectFetchError("Project not found")
+
+    if response.status_code != 200:
+        raise ProjectFetchError(f"Failed to fetch project: {response.status_code}")
+
+    return format_project_info(response.json())
+
+
+async def get_project_data(project_id: str) -> str:
     """
     Fetch the current project brief data from the database.
     Use this tool when you need to answer questions about the project,
@@ -107,67 +215,74 @@ def get_project_data(project_id: str) -> str:
         JSON string with the project brief data, or an error message
     """
     try:
-        # Make sync request to the Next.js API
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(f"{FRONTEND_API_URL}/api/projects/{project_id}")
-            
-            if response.status_code == 404:
-                return json.dumps({"error": "Project not found"})
-            
-            if response.status_code != 200:
-                return json.dumps({"error": f"Failed to fetch project: {response.status_code}"})
-            
-            data = response.json()
-            
-            # Extract brief data from the response
-            brief = data.get("tf_briefs")
-            if isinstance(brief, list):
-                brief = brief[0] if brief else {}
-            elif brief is None:
-                brief = {}
-            
-            # Format the relevant data for the agent
-            project_info = {
-                "project_id": data.get("id"),
-                "case_number": data.get("case_number"),
-                "project_type": data.get("project_type"),
-                "status": data.get("status"),
-                "project_title": brief.get("project_title") or data.get("project_title"),
-                "client": brief.get("client"),
-                "agency": brief.get("agency"),
-                "brand": brief.get("brand"),
-                "budget_amount": brief.get("budget_min"),
-                "budget_currency": "EUR",  # Default
-                "territory": brief.get("territory"),
-                "media_types": brief.get("media"),
-                "term_length": brief.get("term"),
-                "exclusivity": brief.get("exclusivity"),
-                "creative_direction": brief.get("mood") or brief.get("creative_direction"),
-                "mood_keywords": brief.get("keywords"),
-                "genre_preferences": brief.get("genres"),
-                "reference_tracks": brief.get("reference_tracks"),
-                "vocals_preference": brief.get("vocals_preference"),
-                "video_lengths": brief.get("lengths"),
-                "deadline_date": brief.get("submission_deadline"),
-                "air_date": brief.get("air_date"),
-                "brief_sender_name": brief.get("brief_sender_name"),
-                "brief_sender_email": brief.get("brief_sender_email"),
-                "completion_rate": brief.get("completion_rate"),
-            }
-            
-            # Filter out None values for cleaner output
-            project_info = {k: v for k, v in project_info.items() if v is not None}
-            
-            return json.dumps(project_info, indent=2)
-            
-    except httpx.TimeoutException:
-        return json.dumps({"error": "Request timed out"})
+        # Read-through cache coalesces concurrent lookups of the same project
+        project_info = await project_cache.get_or_fetch(project_id, fetch_project_info)
+        return json.dumps(project_info, indent=2)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-# List of tools available to the agent
-agent_tools = [get_project_data]
+# Tools available to the agent, built on first use
+_agent_tools: list | None = None
+
+
+def get_agent_tools() -> list:
+    """The model's tools (LangChain tool objects wrapping the functions above)"""
+    global _agent_tools
+    if _agent_tools is None:
+        from langchain_core.tools import tool
+
+        _agent_tools = [tool(get_project_data)]
+    return _agent_tools
+
+
+class ProjectPrefetch:
+    """Speculative get_project_data call started as soon as the project id is known.
+
+    Runs concurrently with intent routing and the LLM call; later lookups of
+    the same project (the empty-brief fetch or a model tool call) await it
+    instead of starting a new round trip.
+    """
+
+    def __init__(self, project_id: str | None):
+        self.project_id = project_id
+        self.task: asyncio.Task | None = None
+        if project_id:
+            self.task = asyncio.create_task(get_project_data(project_id))
+
+    async def result(self, project_id: str) -> tuple[str, bool]:
+        """Tool result for ``project_id`` and whether it was already prefetched"""
+        if self.task is None or self.task.cancelled() or project_id != self.project_id:
+            return await get_project_data(project_id), False
+        ready = self.task.done()
+        return await self.task, ready
+
+    def cancel(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+# format_project_info keys that name a brief field differently
+PROJECT_INFO_FIELDS = {
+    "client": "client_name",
+    "agency": "agency_name",
+    "brand": "brand_name",
+}
+
+
+def merge_project_data(current_brief_dict: dict[str, Any], tool_result: str) -> str | None:
+    """Merge a get_project_data result into the brief; returns an error message or None"""
+    try:
+        fetched_data = json.loads(tool_result)
+    except json.JSONDecodeError:
+        return "unparseable tool result"
+    if "error" in fetched_data:
+        return fetched_data["error"]
+    for key, value in fetched_data.items():
+        key = PROJECT_INFO_FIELDS.get(key, key)
+        if value is not None and key in ALL_FIELDS:
+            current_brief_dict[key] = value
+    return None
 
 
 class ExtractedBrief(TypedDict, total=False):
@@ -215,6 +330,10 @@ class ExtractedBrief(TypedDict, total=False):
     extraction_notes: str  # Agent observations about ambiguous/interpreted information
 
 
+# Schema of the extraction response (all brief fields optional, plus summary)
+ExtractionOutput = build_extraction_model(ExtractedBrief)
+
+
 class SuggestionChip(TypedDict):
     """Suggestion chip for missing fields"""
     id: str
@@ -223,102 +342,43 @@ class SuggestionChip(TypedDict):
     priority: str  # 'critical' | 'important' | 'helpful'
 
 
-class InputState(CopilotKitState):
-    """Input state - what we receive from the frontend"""
-    pass  # CopilotKitState includes messages
-
-
-class OutputState(CopilotKitState):
-    """Output state - what we send back to the frontend for state sync"""
-    extracted_brief: ExtractedBrief
-    completeness: int
-    project_type: str | None
-    suggestion_chips: list[SuggestionChip]
-    field_updates: list[str]
-    current_project_id: str | None
+def get_llm(with_tools: bool = False, model: str | None = None, json_mode: bool = False):
+    """Get the shared Groq LLM client, optionally with tools bound or JSON-object output"""
+    return llm_registry.get(model=model, tools=get_agent_tools() if with_tools else (), json_mode=json_mode)
 
 
-class BriefAnalyzerState(InputState, OutputState):
-    """Full state for the brief analyzer agent (combines input + output)"""
-    current_project_id: str | None  # Track the project being worked on
+def get_repair_llm():
+    """Small-tier JSON-mode client for repairing broken extraction fragments"""
+    return get_llm(model=tier_model(TIER_SMALL), json_mode=json_mode_enabled())
 
 
-def get_llm(with_tools: bool = False):
-    """Initialize the LLM with Groq, optionally with tools bound"""
-    llm = ChatGroq(
-        model=os.getenv("MODEL_NAME", "llama-3.3-70b-versatile"),
-        api_key=os.getenv("GROQ_API_KEY"),
-        temperature=0.1,
-    )
-    if with_tools:
-        return llm.bind_tools(agent_tools)
-    return llm
+def get_hedge_llm(with_tools: bool = False):
+    """Client for hedged duplicates: the fallback model if configured, else None (same model)"""
+    if not LLM_HEDGE_FALLBACK_MODEL:
+        return None
+    return get_llm(with_tools=with_tools, model=LLM_HEDGE_FALLBACK_MODEL)
 
 
 def calculate_completeness(brief: ExtractedBrief) -> int:
     """Calculate completeness score based on field priorities"""
-    score = 0
-    max_score = 0
-    filled_fields = []
-    missing_fields = []
-
-    # Critical fields: 10 points each
-    for field in CRITICAL_FIELDS:
-        max_score += 10
-        value = brief.get(field)
-        # Check for meaningful values (not None, not empty string, not empty list)
-        has_value = value is not None and value != "" and value != []
-        if has_value:
-            score += 10
-            filled_fields.append(f"{field}(critical)")
-        else:
-            missing_fields.append(f"{field}(critical)")
-
-    # Important fields: 5 points each
-    for field in IMPORTANT_FIELDS:
-        max_score += 5
-        value = brief.get(field)
-        has_value = value is not None and value != "" and value != []
-        if has_value:
-            score += 5
-            filled_fields.append(f"{field}(important)")
-        else:
-            missing_fields.append(f"{field}(important)")
-
-    # Helpful fields: 2 points each
-    for field in HELPFUL_FIELDS:
-        max_score += 2
-        value = brief.get(field)
-        has_value = value is not None and value != "" and value != []
-        if has_value:
-            score += 2
-            filled_fields.append(f"{field}(helpful)")
-        else:
-            missing_fields.append(f"{field}(helpful)")
-
-    completeness = int((score / max_score) * 100) if max_score > 0 else 0
-    print(f"DEBUG completeness: {completeness}% (score={score}/{max_score})")
-    print(f"DEBUG filled fields: {filled_fields}")
-    print(f"DEBUG missing fields: {missing_fields}")
-
+    rules = scoring_rules()
+    present, _ = rules.masks(brief)
+    completeness = rules.completeness_of(present)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("completeness", extra=log_fields(
+            completeness=completeness,
+            missing=[
+                f"{field}({rules.priorities[bit]})"
+                for bit, field in enumerate(rules.fields)
+                if not present >> bit & 1
+            ],
+        ))
     return completeness
 
 
 def classify_project_type(budget: float | None) -> str | None:
     """Classify project type based on budget"""
-    if budget is None:
-        return None
-
-    if budget >= 100000:
-        return "A"
-    elif budget >= 25000:
-        return "B"
-    elif budget >= 10000:
-        return "C"
-    elif budget >= 2500:
-        return "D"
-    else:
-        return "E"
+    return scoring_rules().project_type(budget)
 
 
 def normalize_project_type(value: Any) -> str | None:
@@ -340,149 +400,290 @@ def normalize_project_type(value: Any) -> str | None:
 
 def generate_suggestion_chips(brief: ExtractedBrief) -> list[SuggestionChip]:
     """Generate suggestion chips for missing fields"""
-    chips = []
-    chip_id = 0
-
-    # Define questions for each field
-    field_questions = {
-        "budget_amount": "What's the total budget for this project?",
-        "territory": "What territories will this be used in?",
-        "deadline_date": "When is the music needed by?",
-        "client_name": "Who is the client for this project?",
-        "project_title": "What should this project be called?",
-        "media_types": "What media types will be used?",
-        "creative_direction": "What's the creative direction or mood?",
-        "video_lengths": "What are the video/spot lengths?",
-        "sync_points": "Are there specific sync points in the edit?",
-        "stems_required": "Do they need stems for the music?",
-        "vocals_preference": "Should the music be instrumental, with vocals, or either?",
-        "reference_tracks": "Are there any reference tracks?",
-        "brief_sender_name": "Who sent the brief?",
-        "brief_sender_email": "What's the brief sender's email?",
-        "air_date": "When does the campaign air?",
+    return scoring_rules().suggestion_chips(brief)
+
+
+# Stream extraction output and push fields to the UI as soon as each one completes
+EXTRACTION_STREAMING = os.getenv("EXTRACTION_STREAMING", "true").lower() in {"1", "true", "yes"}
+
+
+
+def ai_message(content: str) -> "AIMessage":
+    """Assistant message for a node output"""
+    from langchain_core.messages import AIMessage
+
+    return AIMessage(content=content)
+
+
+def merge_extracted_fields(
+    state: "BriefAnalyzerState",
+    current_brief_dict: dict[str, Any],
+    extracted: dict[str, Any],
+    project_id: str | None,
+) -> dict:
+    """Merge extracted/updated fields into the brief and build the node output"""
+    summary = extracted.pop("summary", "")
+
+    # Track which fields were updated
+    field_updates = []
+
+    logger.debug("merging extracted fields", extra=log_fields(
+        existing_fields=len(current_brief_dict),
+        extracted_fields=list(extracted.keys()),
+    ))
+
+    explicit_project_type = None
+    for key, value in extracted.items():
+        # Check if value is meaningful (not None, not empty string, not empty list)
+        # But allow False and 0 as valid values
+        is_meaningful = value is not None and value != "" and value != []
+
+        if key == "project_type":
+            normalized_type = normalize_project_type(value) if is_meaningful else None
+            if normalized_type and normalized_type != state.get("project_type"):
+                explicit_project_type = normalized_type
+                field_updates.append("project_type")
+                logger.debug("updated project_type", extra=log_fields(value=normalized_type))
+            continue
+
+        if is_meaningful and key in ALL_FIELDS:
+            if current_brief_dict.get(key) != value:
+                field_updates.append(key)
+                logger.debug("updated field", extra=log_fields(field=key))
+            current_brief_dict[key] = value
+        elif key not in ALL_FIELDS and key != "summary":
+            logger.debug("skipping unknown field", extra=log_fields(field=key))
+
+    with span("scoring", fields=len(current_brief_dict)):
+        # Calculate completeness and project type
+        completeness = calculate_completeness(current_brief_dict)
+        project_type = explicit_project_type or classify_project_type(current_brief_dict.get("budget_amount"))
+
+        # Generate suggestion chips
+        suggestion_chips = generate_suggestion_chips(current_brief_dict)
+
+    # Create response message
+    response_parts = []
+    if summary:
+        response_parts.append(summary)
+
+    if field_updates:
+        response_parts.append(f"\n\n**Extracted {len(field_updates)} fields** from your brief.")
+
+    if completeness < 70:
+        response_parts.append(f"\n\nThe brief is **{completeness}% complete**. I've identified some missing information that would help with the music search.")
+    elif completeness < 90:
+        response_parts.append(f"\n\nThe brief is **{completeness}% complete**. Just a few more details would make it comprehensive.")
+    else:
+        response_parts.append(f"\n\nThe brief is **{completeness}% complete**. This is a solid brief with most key information captured.")
+
+    if explicit_project_type:
+        response_parts.append(f"\n\nProject type has been set to **{project_type}** based on your instruction.")
+    elif project_type:
+        budget = current_brief_dict.get("budget_amount")
+        response_parts.append(f"\n\nBased on the budget of €{budget:,.0f}, this is classified as a **Type {project_type}** project.")
+
+    return {
+        "messages": [ai_message("".join(response_parts))],
+        "extracted_brief": current_brief_dict,
+        "completeness": completeness,
+        "project_type": project_type,
+        "suggestion_chips": suggestion_chips,
+        "field_updates": field_updates,
+        "brief_patch": patch_from_field_updates(
+            state.get("extracted_brief") or {}, current_brief_dict, field_updates, root="/extracted_brief",
+        ),
+        "current_project_id": project_id,
     }
 
-    # Check critical fields
-    for field in CRITICAL_FIELDS:
-        if not brief.get(field) and field in field_questions:
-            chips.append({
-                "id": f"chip_{chip_id}",
-                "label": field_questions[field],
-                "field": field,
-                "priority": "critical",
-            })
-            chip_id += 1
-
-    # Check important fields (limit to 3)
-    for field in IMPORTANT_FIELDS:
-        if not brief.get(field) and field in field_questions and len([c for c in chips if c["priority"] == "important"]) < 3:
-            chips.append({
-                "id": f"chip_{chip_id}",
-                "label": field_questions[field],
-                "field": field,
-                "priority": "important",
-            })
-            chip_id += 1
-
-    # Check helpful fields (limit to 2)
-    for field in HELPFUL_FIELDS:
-        if not brief.get(field) and field in field_questions and len([c for c in chips if c["priority"] == "helpful"]) < 2:
-            chips.append({
-                "id": f"chip_{chip_id}",
-                "label": field_questions[field],
-                "field": field,
-                "priority": "helpful",
-            })
-            chip_id += 1
-
-    return chips[:8]  # Max 8 chips
-
-
-EXTRACTION_PROMPT = """You are a music licensing brief analyzer and project assistant. Your job is to:
-1. Extract structured information from raw client briefs (emails, notes, documents)
-2. Update specific fields when the user asks (e.g., "change the budget to X")
-3. Answer questions about the current project data
-
-**TOOLS AVAILABLE**:
-You have access to the `get_project_data` tool. Use it when:
-- The user asks a question about the project (budget, client, timeline, etc.)
-- You need to know the current state of the project data
-- The "Current extracted data" below is empty or missing information
-
-**IMPORTANT RULES**:
-- If the user is asking a question about the project and you don't have the data, USE THE TOOL to fetch it first.
-- If the user is asking to change, update, or set a specific field (like "make the title X" or "change the budget to Y"), treat that as a direct update request and return that field with the new value.
-- If you already have the data in "Current extracted data", you can answer directly without using the tool.
-
-Extract the following information if present:
-- project_title: A short descriptive title for this project (e.g., "BMW Electric Launch" or "Nike Summer Campaign")
-- client_name: The client company name
-- agency_name: The agency name (if different from client)
-- brand_name: The specific brand/sub-brand
-- budget_amount: The total budget as a number (extract currency value, convert to number)
-- budget_currency: The currency (EUR, USD, GBP, CHF)
-- territory: List of territories/countries where music will be used
-- media_types: List of media types (TV, Cinema, Online, Social, Radio, etc.)
-- term_length: License duration (e.g., "2 years", "12 months")
-- exclusivity: Whether exclusivity is required (true/false)
-- exclusivity_details: Details about exclusivity scope
-- creative_direction: Description of the creative direction/mood
-- mood_keywords: List of mood/emotion keywords
-- genre_preferences: List of preferred genres
-- reference_tracks: List of reference tracks with artist, title, and notes
-- must_avoid: Things to avoid in the music
-- vocals_preference: "instrumental", "vocals", "either", or "specific"
-- video_lengths: List of video/spot lengths (e.g., ["60s", "30s", "15s"])
-- stems_required: Whether stems are needed (true/false)
-- sync_points: Description of key sync points in the edit
-- deadline_date: When music is needed (ISO date if possible, e.g., "2025-12-15")
-- air_date: When the campaign airs (ISO date if possible)
-- deadline_urgency: "standard", "rush", or "urgent"
-- first_presentation_date: Date of first client presentation
-- kickoff_date: When the project starts
-- brief_sender_name: Name of person who sent the brief
-- brief_sender_email: Email of person who sent the brief
-- brief_sender_role: Role/title of brief sender
-- campaign_context: Background information about the campaign or product launch
-- target_audience: Who the campaign is aimed at (demographics, psychographics)
-- brand_values: List of brand attributes or values mentioned (e.g., ["innovative", "premium", "sustainable"])
-- extraction_notes: Your observations about ambiguous or interpreted information. Use this to note things like:
-  - "Air date was 'mid-March' - interpreted as March 15, 2026"
-  - "Budget described as 'around 18k' - may need confirmation"
-  - "Deadline urgency unclear - client said 'by next Wednesday'"
-  - "Reference track 'cozy Sunday morning vibes' - interpreted as acoustic/indie-folk genre"
-
-**Response Format**:
-- For extractions/updates: Respond with a JSON object containing the fields you extracted/updated and a "summary" field.
-- For questions about the project: Respond with a JSON object containing just a "summary" field with your helpful answer.
-
-Current extracted data:
-{current_brief}
 
-User message:
-{user_message}"""
+# Key of the node output that marks a turn whose extraction didn't finish:
+# "deadline" or "parse_failure". It isn't a state channel, so the graph drops
+# it; callers of extract_node (bulk ingestion) read it
+EXTRACTION_FAILURE = "extraction_failure"
+DEADLINE_FAILURE = "deadline"
+PARSE_FAILURE = "parse_failure"
+
+
+def deadline_output(
+    state: "BriefAnalyzerState",
+    current_brief_dict: dict[str, Any],
+    streamed_fields: dict[str, Any],
+    project_id: str | None,
+) -> dict:
+    """Node output when the turn's LLM budget runs out; keeps any streamed fields"""
+    llm_hedger.record_deadline()
+    if streamed_fields:
+        extracted = {
+            **streamed_fields,
+            "summary": "I ran out of time before finishing, so here is what I extracted so far. Send the message again to pick up the rest.",
+        }
+        return {
+            **merge_extracted_fields(state, current_brief_dict, extracted, project_id),
+            EXTRACTION_FAILURE: DEADLINE_FAILURE,
+        }
+    return {
+        "messages": [ai_message("That took longer than expected, so I stopped waiting for the model. Please try again in a moment.")],
+        "extracted_brief": current_brief_dict,
+        "field_updates": [],
+        "current_project_id": project_id,
+        EXTRACTION_FAILURE: DEADLINE_FAILURE,
+    }
 
 
-async def extract_node(state: BriefAnalyzerState) -> dict:
-    """Extract brief information from user message, using tools if needed"""
-    # Use LLM with tools for answering questions about project data
-    llm = get_llm(with_tools=True)
+def parse_failure_output(project_id: str | None) -> dict:
+    """Node output when the model's response can't be parsed"""
+    message = ai_message(
+        "I had trouble parsing that brief. Could you paste the raw text from the client email or document? I'll extract the key details like budget, territory, timeline, and creative direction."
+    )
+    return {
+        "messages": [message],
+        "field_updates": [],
+        "current_project_id": project_id,
+        EXTRACTION_FAILURE: PARSE_FAILURE,
+    }
+
+
+async def index_brief(
+    user_message: str,
+    extracted: dict[str, Any],
+    scope: str | None,
+    signature: tuple[int, ...] | None,
+) -> None:
+    """Remember the fields extracted from a pasted brief so revisions in its scope can reuse them"""
+    fields = {
+        key: value for key, value in extracted.items()
+        if key in ALL_FIELDS and value is not None and value != "" and value != []
+    }
+    await brief_index.add(user_message, fields, scope, signature)
+
+
+async def store_extraction(cache_key: str, result: dict) -> None:
+    """Remember a successful extraction in the content-addressed cache"""
+    await extraction_cache.put(cache_key, {
+        "message": result["messages"][0].content,
+        "extracted_brief": result["extracted_brief"],
+        "completeness": result["completeness"],
+        "project_type": result["project_type"],
+        "suggestion_chips": result["suggestion_chips"],
+        "field_updates": result["field_updates"],
+    })
+
+
+async def stream_extraction(
+    llm,
+    llm_messages: list["BaseMessage"],
+    current_brief_dict: dict[str, Any],
+    config: "RunnableConfig | None",
+    streamed_fields: dict[str, Any] | None = None,
+) -> tuple[Any, float | None]:
+    """Stream the LLM response, pushing each completed field to the frontend.
+
+    Returns the aggregated response message and the time to the first
+    completed field in milliseconds (None if no field was streamed).
+    Completed fields are also collected in ``streamed_fields`` so a caller
+    that hits its deadline mid-stream can still use them.
+    """
+    from copilotkit.langgraph import copilotkit_emit_state
+
+    started = time.perf_counter()
+    first_field_ms = None
+    parser = StreamingJSONObjectParser()
+    running_brief = dict(current_brief_dict)
+    streamed_updates: list[str] = []
+    response = None
+
+    streamed_fields = {} if streamed_fields is None else streamed_fields
+    hedge_llm = get_hedge_llm(with_tools=True)
+    async for chunk in llm_hedger.astream(llm, llm_messages, hedge_llm=hedge_llm, config=config):
+        if response is None:
+            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started)
+        response = chunk if response is None else response + chunk
+        if not isinstance(chunk.content, str) or not chunk.content:
+            continue
+
+        changed = False
+        for key, value in parser.feed(chunk.content):
+            is_meaningful = value is not None and value != "" and value != []
+            if key in ALL_FIELDS and is_meaningful and running_brief.get(key) != value:
+                running_brief[key] = value
+                streamed_fields[key] = value
+                streamed_updates.append(key)
+                changed = True
+
+        if changed and config is not None:
+            if first_field_ms is None:
+                first_field_ms = round((time.perf_counter() - started) * 1000, 1)
+                TIME_TO_FIRST_FIELD.observe(first_field_ms / 1000)
+            await copilotkit_emit_state(config, {
+                "extracted_brief": running_brief,
+                "field_updates": list(streamed_updates),
+                "completeness": calculate_completeness(running_brief),
+            })
 
-    # Debug: print state to see what's coming in
-    print(f"DEBUG: State keys: {state.keys() if hasattr(state, 'keys') else 'not a dict'}")
-    print(f"DEBUG: Messages: {state.get('messages', [])}")
+    if response is None:
+        response = ai_message("")
+    return response, first_field_ms
+
+
+async def run_tool_call(tool_call: dict[str, Any], prefetch: ProjectPrefetch) -> tuple[str, str | None]:
+    """Run one tool call from the model; returns (tool name, result or None if unknown)"""
+    name = tool_call["name"]
+    if name == "get_project_data":
+        project_id = (tool_call.get("args") or {}).get("project_id") or prefetch.project_id
+        if not project_id:
+            return name, None
+        with span("project_fetch", source="tool_call") as fetch:
+            result, fetch["prefetched"] = await prefetch.result(project_id)
+        return name, result
+    selected = next((t for t in get_agent_tools() if t.name == name), None)
+    if selected is None:
+        logger.info("unknown tool requested", extra=log_fields(tool=name))
+        return name, None
+    return name, await selected.ainvoke(tool_call.get("args") or {})
+
+
+# LangGraph only passes ``config`` to a node whose annotation it recognizes; of the
+# unresolved (string) forms it accepts "RunnableConfig" and "Optional[RunnableConfig]"
+async def extract_node(state: "BriefAnalyzerState", config: "Optional[RunnableConfig]" = None) -> dict:
+    """Extract brief information from user message, using tools if needed"""
+    with turn() as route, turn_budget():
+        # Project data is fetched in the background while the turn is routed
+        prefetch = ProjectPrefetch(resolve_project_id(state))
+        try:
+            result = await run_extract_turn(state, config, route, prefetch)
+            # A newer turn on this thread owns the state now; don't commit this one
+            await ensure_latest()
+            return result
+        except asyncio.CancelledError:
+            route["route"] = "cancelled"
+            if prefetch.task is not None and not prefetch.task.done():
+                record_cancelled_work("project_fetch")
+            raise
+        finally:
+            prefetch.cancel()
+
+
+async def run_extract_turn(
+    state: "BriefAnalyzerState",
+    config: "RunnableConfig | None",
+    route: dict[str, str],
+    prefetch: ProjectPrefetch,
+) -> dict:
+    """Body of extract_node; sets route["route"] to the path the turn took"""
+    from langchain_core.messages import HumanMessage
 
     # Get the last user message
     messages = state.get("messages", [])
+    logger.debug("turn started", extra=log_fields(messages=len(messages)))
     if not messages:
-        print("DEBUG: No messages in state")
+        route["route"] = "invalid_input"
         return {
-            "messages": [AIMessage(content="I didn't receive any message. Please paste your brief.")],
+            "messages": [ai_message("I didn't receive any message. Please paste your brief.")],
             "current_project_id": state.get("current_project_id"),
         }
 
     last_message = messages[-1]
-    print(f"DEBUG: Last message type: {type(last_message)}, content: {last_message}")
 
     # Handle different message types (HumanMessage from langchain or dict from AG-UI)
     if isinstance(last_message, HumanMessage):
@@ -492,85 +693,249 @@ async def extract_node(state: BriefAnalyzerState) -> dict:
     elif hasattr(last_message, "content"):
         user_message = last_message.content
     else:
-        print(f"DEBUG: Unknown message type: {type(last_message)}")
+        logger.warning("unknown message type", extra=log_fields(type=type(last_message).__name__))
+        route["route"] = "invalid_input"
         return {
-            "messages": [AIMessage(content="I couldn't read your message. Please try again.")],
+            "messages": [ai_message("I couldn't read your message. Please try again.")],
             "current_project_id": state.get("current_project_id"),
         }
 
-    print(f"DEBUG: User message: {user_message[:100] if user_message else 'empty'}...")
-    
     # Get current brief data from state
     current_brief_dict = dict(state.get("extracted_brief") or {})
     
-    # Get current project ID from state or try to extract from context
-    project_id = resolve_project_id(state)
-    print(f"DEBUG: Current project ID: {project_id}")
-    print(f"DEBUG: Current brief has {len(current_brief_dict)} fields")
-    
-    current_brief = json.dumps(current_brief_dict, indent=2)
-    
-    # Determine if this is a question about project data (needs tool) or extraction
-    is_question = any(q in user_message.lower() for q in [
-        "what", "who", "when", "where", "how much", "how many", "tell me", "show me",
-        "budget", "client", "agency", "deadline", "territory", "give me", "?",
-        "summary", "overview", "details", "information"
-    ])
-    is_brief_paste = len(user_message) > 200 or "from:" in user_message.lower() or "subject:" in user_message.lower()
-    
-    # If it's a question and we have a project ID but empty brief, we need to fetch data
-    needs_project_data = is_question and not is_brief_paste and project_id and len(current_brief_dict) == 0
-    
-    print(f"DEBUG: is_question={is_question}, is_brief_paste={is_brief_paste}, needs_project_data={needs_project_data}")
-    
-    # If we need project data, fetch it first using the tool
+    # Current project ID from state or thread context (resolved by extract_node)
+    project_id = prefetch.project_id
+
+    with span("intent_routing") as routing:
+        # Classify the turn (brief paste, field edit, question, chit-chat) and pick a model tier
+        decision = route_intent(user_message)
+        intent = decision["intent"]
+        tier = decision["tier"]
+        model = tier_model(tier)
+        is_question = intent == INTENT_QUESTION
+        is_brief_paste = intent == INTENT_BRIEF_PASTE
+
+        # Questions and edits on a project whose brief isn't loaded yet need its data first
+        needs_project_data = (
+            intent in {INTENT_QUESTION, INTENT_FIELD_EDIT} and project_id and len(current_brief_dict) == 0
+        )
+        routing.update(
+            intent=intent,
+            confidence=decision["confidence"],
+            tier=tier,
+            model=model,
+            needs_project_data=bool(needs_project_data),
+            brief_fields=len(current_brief_dict),
+        )
+
+    if is_brief_paste:
+        # A pasted brief replaces, rather than queries, the stored project
+        prefetch.cancel()
+
+    # If we need project data, use the prefetched tool result (usually already done)
     if needs_project_data:
-        print(f"DEBUG: Fetching project data for {project_id}")
-        tool_result = get_project_data.invoke({"project_id": project_id})
+        with span("project_fetch", project_id=project_id) as fetch:
+            tool_result, fetch["prefetched"] = await prefetch.result(project_id)
+            error = merge_project_data(current_brief_dict, tool_result)
+            if error:
+                fetch["error"] = error
+            else:
+                fetch["fields"] = len(current_brief_dict)
+
+    # Direct field edits ("change the budget to 40k") are applied without the LLM
+    if not is_brief_paste:
+        command = parse_field_command(user_message)
+        if command and command["confidence"] >= FIELD_COMMAND_MIN_CONFIDENCE:
+            route["route"] = "field_command"
+            extracted = {**command["updates"], "summary": command["summary"]}
+            return merge_extracted_fields(state, current_brief_dict, extracted, project_id)
+
+    # Field lookups ("what's the budget?") are answered from the brief without the LLM
+    if is_question and not is_brief_paste:
+        with span("brief_answer") as lookup:
+            answer = answer_brief_question(
+                user_message,
+                current_brief_dict,
+                project_type=state.get("project_type") or classify_project_type(current_brief_dict.get("budget_amount")),
+                completeness=calculate_completeness(current_brief_dict),
+                missing=[
+                    field for field in scoring_rules().fields_by_priority["critical"]
+                    if not current_brief_dict.get(field)
+                ],
+            )
+            lookup["answered"] = answer is not None
+        if answer:
+            route["route"] = "brief_answer"
+            return {
+                "messages": [ai_message(answer["answer"])],
+                "extracted_brief": current_brief_dict,
+                "current_project_id": project_id,
+            }
+
+    return await run_extraction(
+        state, config, route, prefetch, user_message, current_brief_dict,
+        is_brief_paste=is_brief_paste, tier=tier, model=model,
+    )
+
+
+# Routes of run_extraction that extracted fields from the message
+EXTRACTION_ROUTES = frozenset({"cache_hit", "near_duplicate", "chunked", "revision", "llm"})
+
+
+async def run_extraction(
+    state: "BriefAnalyzerState",
+    config: "RunnableConfig | None",
+    route: dict[str, str],
+    prefetch: ProjectPrefetch,
+    user_message: str,
+    current_brief_dict: dict[str, Any],
+    is_brief_paste: bool,
+    tier: str,
+    model: str,
+) -> dict:
+    """Extraction stage of a turn: cached, reused, chunked or LLM extraction.
+
+    Runs after routing, field commands and brief answers; bulk ingestion
+    calls it directly. Sets route["route"] to one of EXTRACTION_ROUTES, or
+    to "tool_answer", "deadline" or "parse_failure".
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    messages = state.get("messages", [])
+    project_id = prefetch.project_id
+    # Use LLM with tools for answering questions about project data
+    llm = get_llm(with_tools=True, model=model)
+
+    # Identical requests (same message, brief, conversation context and model) reuse
+    # the earlier extraction
+    cache_key = extraction_cache_key(
+        user_message,
+        {"brief": current_brief_dict, "project_type": state.get("project_type")},
+        model,
+        EXTRACTION_PROMPT_VERSION,
+        context=[state.get("history_summary", ""), *truncated_history(messages[:-1])],
+    )
+    cached = await extraction_cache.get(cache_key)
+    if cached is not None:
+        route["route"] = "cache_hit"
+        return {
+            "messages": [ai_message(cached["message"])],
+            "extracted_brief": cached["extracted_brief"],
+            "completeness": cached["completeness"],
+            "project_type": cached["project_type"],
+            "suggestion_chips": cached["suggestion_chips"],
+            "field_updates": cached["field_updates"],
+            "current_project_id": project_id,
+        }
+
+    # Revisions of an already-extracted brief (in the same project or thread) start
+    # from that extraction and only the added lines go to the LLM. A revision that
+    # removes or rewrites lines is extracted in full: the old extraction may hold
+    # values taken from the lines that are gone.
+    llm_text = user_message
+    prompt_brief = current_brief_dict
+    reused_fields: dict[str, Any] = {}
+    scope = brief_scope(project_id, config)
+    # Hashed once per paste, for the lookup and for indexing the result
+    signature = None
+    if is_brief_paste:
+        with span("near_duplicate") as near:
+            signature = await brief_index.signature(user_message, scope)
+            match = await brief_index.lookup(user_message, scope, signature)
+            near["matched"] = match is not None
+            if match:
+                near.update(
+                    similarity=match["similarity"],
+                    changed_chars=len(match["changed_text"]),
+                    removed_lines=match["removed_lines"],
+                )
+                if match["removed_lines"]:
+                    match = None
+        if match:
+            reused_fields = match["extracted_brief"]
+            if not match["changed_text"]:
+                route["route"] = "near_duplicate"
+                extracted = {
+                    **reused_fields,
+                    "summary": "This brief matches one I've already processed, so I reused that extraction.",
+                }
+                result = merge_extracted_fields(state, current_brief_dict, extracted, project_id)
+                await store_extraction(cache_key, result)
+                return result
+            prompt_brief = {**current_brief_dict, **reused_fields}
+            llm_text = revision_message(match["changed_text"])
+
+    # Long briefs are extracted chunk-by-chunk in parallel and merged
+    if is_brief_paste and len(llm_text) > CHUNKED_EXTRACTION_THRESHOLD:
+        route["route"] = "chunked"
         try:
-            fetched_data = json.loads(tool_result)
-            if "error" not in fetched_data:
-                # Merge fetched data into current brief
-                for key, value in fetched_data.items():
-                    if value is not None and key in ALL_FIELDS:
-                        current_brief_dict[key] = value
-                current_brief = json.dumps(current_brief_dict, indent=2)
-                print(f"DEBUG: Fetched and merged {len(fetched_data)} fields from database")
-        except json.JSONDecodeError:
-            print(f"DEBUG: Failed to parse tool result: {tool_result}")
-
-    # Create extraction prompt
-    prompt = EXTRACTION_PROMPT.format(
-        current_brief=current_brief,
-        user_message=user_message
+            async with asyncio.timeout(remaining_budget()):
+                extracted = await extract_chunked(
+                    get_llm(with_tools=False, model=model, json_mode=json_mode_enabled()),
+                    llm_text,
+                    output_model=ExtractionOutput,
+                    repair_llm=get_repair_llm(),
+                )
+        except TimeoutError:
+            route["route"] = "deadline"
+            return deadline_output(state, current_brief_dict, dict(reused_fields), project_id)
+        except (json.JSONDecodeError, KeyError):
+            return parse_failure_output(project_id)
+        extracted = {**reused_fields, **extracted}
+        result = merge_extracted_fields(state, current_brief_dict, extracted, project_id)
+        await store_extraction(cache_key, result)
+        await index_brief(user_message, extracted, scope, signature)
+        return result
+
+    # Static system prefix (cacheable by the provider) + compact per-turn suffix
+    llm_messages = build_extraction_messages(
+        prompt_brief, llm_text, messages[:-1], history_summary=state.get("history_summary", "")
     )
 
-    response = await llm.ainvoke([
-        SystemMessage(content=prompt),
-        HumanMessage(content="Process the user's request. If they're asking about project data and you have it in 'Current extracted data', answer their question. If they're pasting a brief, extract the fields and respond with JSON.")
-    ])
-    
+    route["route"] = "revision" if reused_fields else "llm"
+    streamed_fields: dict[str, Any] = {}
+    try:
+        async with asyncio.timeout(remaining_budget()):
+            with span("llm_call", streaming=EXTRACTION_STREAMING, tier=tier, model=model) as llm_span:
+                llm_started = time.perf_counter()
+                if EXTRACTION_STREAMING:
+                    response, first_field_ms = await stream_extraction(
+                        llm, llm_messages, prompt_brief, config, streamed_fields
+                    )
+                    llm_span["time_to_first_field_ms"] = first_field_ms
+                else:
+                    response = await llm_hedger.ainvoke(llm, llm_messages, hedge_llm=get_hedge_llm(with_tools=True))
+                    # Without streaming the first token arrives with the whole response
+                    TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - llm_started)
+                routing_stats.record_latency(tier, time.perf_counter() - llm_started)
+                llm_span.update(prompt_token_stats.record(llm_messages, response))
+                record_llm_usage(getattr(response, "usage_metadata", None))
+    except TimeoutError:
+        # Hard deadline: answer with whatever fields were streamed before it hit
+        route["route"] = "deadline"
+        logger.info("turn deadline exceeded", extra=log_fields(streamed_fields=list(streamed_fields)))
+        return deadline_output(state, current_brief_dict, {**reused_fields, **streamed_fields}, project_id)
+
     # Check if LLM wants to call a tool
     if hasattr(response, 'tool_calls') and response.tool_calls:
-        print(f"DEBUG: LLM requested tool calls: {response.tool_calls}")
-        # Execute the tool calls
-        for tool_call in response.tool_calls:
-            if tool_call['name'] == 'get_project_data':
-                tool_result = get_project_data.invoke(tool_call['args'])
-                try:
-                    fetched_data = json.loads(tool_result)
-                    if "error" not in fetched_data:
-                        # Merge fetched data into current brief
-                        for key, value in fetched_data.items():
-                            if value is not None and key in ALL_FIELDS:
-                                current_brief_dict[key] = value
-                        # Now answer the question with the data
-                        current_brief = json.dumps(current_brief_dict, indent=2)
-                        print(f"DEBUG: Tool fetched {len(fetched_data)} fields, answering question")
-                        
-                        # Make another call to answer the question with the data
-                        llm_no_tools = get_llm(with_tools=False)
-                        answer_prompt = f"""Based on this project data, answer the user's question concisely and helpfully.
+        logger.debug("llm requested tool calls", extra=log_fields(tools=[c["name"] for c in response.tool_calls]))
+        # Execute all tool calls concurrently; project lookups reuse the prefetch
+        with span("tool_calls", calls=len(response.tool_calls)) as tools_span:
+            results = await asyncio.gather(*(run_tool_call(call, prefetch) for call in response.tool_calls))
+            merged = [
+                name for name, result in results
+                if name == "get_project_data" and result is not None
+                and merge_project_data(current_brief_dict, result) is None
+            ]
+            tools_span["merged"] = len(merged)
+
+        if merged:
+            route["route"] = "tool_answer"
+            # Now answer the question with the data
+            current_brief = compact_json(current_brief_dict)
+            # Make another call to answer the question with the data
+            llm_no_tools = get_llm(with_tools=False, model=model)
+            answer_prompt = f"""Based on this project data, answer the user's question concisely and helpfully.
 
 Project Data:
 {current_brief}
@@ -578,143 +943,123 @@ Project Data:
 User Question: {user_message}
 
 Provide a clear, direct answer."""
-                        
-                        answer_response = await llm_no_tools.ainvoke([
+
+            try:
+                async with asyncio.timeout(remaining_budget()):
+                    with span("llm_call", purpose="answer", tier=tier, model=model):
+                        answer_started = time.perf_counter()
+                        answer_response = await llm_hedger.ainvoke(llm_no_tools, [
                             SystemMessage(content=answer_prompt),
                             HumanMessage(content="Answer the question based on the project data.")
-                        ])
-                        
-                        return {
-                            "messages": [AIMessage(content=answer_response.content)],
-                            "extracted_brief": current_brief_dict,
-                            "current_project_id": project_id,
-                        }
-                except json.JSONDecodeError:
-                    pass
+                        ], hedge_llm=get_hedge_llm())
+                        routing_stats.record_latency(tier, time.perf_counter() - answer_started)
+                        record_llm_usage(getattr(answer_response, "usage_metadata", None))
+            except TimeoutError:
+                route["route"] = "deadline"
+                return deadline_output(state, current_brief_dict, {}, project_id)
+
+            return {
+                "messages": [ai_message(answer_response.content)],
+                "extracted_brief": current_brief_dict,
+                "current_project_id": project_id,
+            }
 
     # Parse the response
     try:
         # Try to extract JSON from the response
-        content = response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-
-        extracted = json.loads(content)
-        summary = extracted.pop("summary", "")
-
-        # Track which fields were updated
-        field_updates = []
-        # Use the current_brief_dict we already built (with CopilotKit context merged)
-        # This was populated earlier from state + readable context
-
-        print(f"DEBUG: Existing brief has {len(current_brief_dict)} fields")
-        print(f"DEBUG: LLM extracted {len(extracted)} fields: {list(extracted.keys())}")
-
-        explicit_project_type = None
-        for key, value in extracted.items():
-            # Check if value is meaningful (not None, not empty string, not empty list)
-            # But allow False and 0 as valid values
-            is_meaningful = value is not None and value != "" and value != []
-
-            if key == "project_type":
-                normalized_type = normalize_project_type(value) if is_meaningful else None
-                if normalized_type and normalized_type != state.get("project_type"):
-                    explicit_project_type = normalized_type
-                    field_updates.append("project_type")
-                    print(f"DEBUG: Updated root project_type to: {normalized_type}")
-                continue
-
-            if is_meaningful and key in ALL_FIELDS:
-                if current_brief_dict.get(key) != value:
-                    field_updates.append(key)
-                    print(f"DEBUG: Updated field '{key}' to: {value}")
-                current_brief_dict[key] = value
-            elif key not in ALL_FIELDS and key != "summary":
-                print(f"DEBUG: Skipping unknown field '{key}'")
-
-        print(f"DEBUG: Merged brief now has {len(current_brief_dict)} fields")
-
-        # Calculate completeness and project type
-        completeness = calculate_completeness(current_brief_dict)
-        project_type = explicit_project_type or classify_project_type(current_brief_dict.get("budget_amount"))
-
-        # Generate suggestion chips
-        suggestion_chips = generate_suggestion_chips(current_brief_dict)
-
-        # Create response message
-        response_parts = []
-        if summary:
-            response_parts.append(summary)
+        with span("json_parse", chars=len(response.content)):
+            # Schema-validated; broken fragments get one cheap repair call
+            parsed = await parse_extraction_output(response.content, ExtractionOutput, repair_llm=get_repair_llm())
+            extracted = {**reused_fields, **parsed}
+        result = merge_extracted_fields(state, current_brief_dict, extracted, project_id)
+        await store_extraction(cache_key, result)
+        if is_brief_paste:
+            await index_brief(user_message, extracted, scope, signature)
+        return result
 
-        if field_updates:
-            response_parts.append(f"\n\n**Extracted {len(field_updates)} fields** from your brief.")
-
-        if completeness < 70:
-            response_parts.append(f"\n\nThe brief is **{completeness}% complete**. I've identified some missing information that would help with the music search.")
-        elif completeness < 90:
-            response_parts.append(f"\n\nThe brief is **{completeness}% complete**. Just a few more details would make it comprehensive.")
-        else:
-            response_parts.append(f"\n\nThe brief is **{completeness}% complete**. This is a solid brief with most key information captured.")
+    except (json.JSONDecodeError, KeyError) as e:
+        # If extraction fails, provide a helpful response
+        route["route"] = "parse_failure"
+        logger.info("could not parse llm response", extra=log_fields(error=str(e)))
+        return parse_failure_output(project_id)
 
-        if explicit_project_type:
-            response_parts.append(f"\n\nProject type has been set to **{project_type}** based on your instruction.")
-        elif project_type:
-            budget = current_brief_dict.get("budget_amount")
-            response_parts.append(f"\n\nBased on the budget of €{budget:,.0f}, this is classified as a **Type {project_type}** project.")
 
-        ai_message = AIMessage(content="".join(response_parts))
+async def extract_pasted_brief(text: str) -> tuple[dict, str]:
+    """Run a brief through the extraction stage as a paste outside any thread or project.
 
-        return {
-            "messages": [ai_message],
-            "extracted_brief": current_brief_dict,
-            "completeness": completeness,
-            "project_type": project_type,
-            "suggestion_chips": suggestion_chips,
-            "field_updates": field_updates,
-            "current_project_id": project_id,
-        }
+    Returns the node output and the route it took (see EXTRACTION_ROUTES).
+    """
+    from langchain_core.messages import HumanMessage
 
-    except (json.JSONDecodeError, KeyError) as e:
-        # If extraction fails, provide a helpful response
-        ai_message = AIMessage(
-            content="I had trouble parsing that brief. Could you paste the raw text from the client email or document? I'll extract the key details like budget, territory, timeline, and creative direction."
+    state = {"messages": [HumanMessage(content=text)], "extracted_brief": {}}
+    with turn() as route, turn_budget():
+        output = await run_extraction(
+            state, None, route, ProjectPrefetch(None), text, {},
+            is_brief_paste=True, tier=TIER_LARGE, model=tier_model(TIER_LARGE),
         )
-        return {
-            "messages": [ai_message],
-            "field_updates": [],
-            "current_project_id": project_id,
-        }
+    return output, route["route"]
 
 
-def should_continue(state: BriefAnalyzerState) -> str:
+def should_continue(state: dict[str, Any]) -> str:
     """Determine if we should continue processing"""
+    from langgraph.graph import END
+
     return END
 
 
 # Build the graph
-def create_brief_analyzer_graph():
+def create_brief_analyzer_graph(checkpointer: "BaseCheckpointSaver | None" = None):
     """Create the brief analyzer LangGraph
 
     Uses Input/Output schemas to properly sync state with the frontend:
     - InputState: what we receive from frontend (messages)
     - OutputState: what we send back (extracted_brief, completeness, etc.)
     """
+    from langgraph.graph import StateGraph
+
+    from .checkpointer import current_checkpointer
+    from .graph_state import BriefAnalyzerState, InputState, OutputState
+    from .history import compact_history
+
     # Specify input and output schemas for proper frontend state sync
     workflow = StateGraph(BriefAnalyzerState, input=InputState, output=OutputState)
 
     # Add nodes
+    workflow.add_node("compact_history", compact_history)
     workflow.add_node("extract", extract_node)
 
     # Add edges
-    workflow.set_entry_point("extract")
+    workflow.set_entry_point("compact_history")
+    workflow.add_edge("compact_history", "extract")
     workflow.add_conditional_edges("extract", should_continue)
 
-    # Add checkpointer for AG-UI state management
-    checkpointer = MemorySaver()
-    return workflow.compile(checkpointer=checkpointer)
+    # Add checkpointer for AG-UI state management; the app lifespan selects
+    # the persistent backend when CHECKPOINTER=sqlite
+    return workflow.compile(checkpointer=checkpointer or current_checkpointer())
+
+
+# Compiled on first use (or when the app warms up) rather than at import
+_graph = None
+
+
+def get_brief_analyzer_graph():
+    """The process-wide compiled graph, built on first call"""
+    global _graph
+    if _graph is None:
+        with span("graph_compile"):
+            _graph = create_brief_analyzer_graph()
+    return _graph
+
 
+def __getattr__(name: str):
+    # ``brief_analyzer_graph`` used to be compiled at import; keep the name working
+    if name == "brief_analyzer_graph":
+        return get_brief_analyzer_graph()
+    # The state schema and tool list used to be defined here at import
+    if name in {"InputState", "OutputState", "BriefAnalyzerState"}:
+        from . import graph_state
 
-# Export the compiled graph
-brief_analyzer_graph = create_brief_analyzer_graph()
+        return getattr(graph_state, name)
+    if name == "agent_tools":
+        return get_agent_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
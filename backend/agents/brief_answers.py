@@ -0,0 +1,247 @@
+"""
+Deterministic answers to simple questions about the brief
+
+Lookups like "what's the budget?", "who is the client?" or "when is the
+deadline?" are answered from the structured brief with templates instead of
+an LLM call. Anything open-ended ("summarize the creative direction", "what
+music would fit?") returns None and the caller escalates to the model, as
+does a question with any word the lookup can't account for ("is the budget
+in USD?") and a yes/no question about a field that isn't a yes/no field
+("is the deadline set?").
+"""
+
+import os
+import re
+from datetime import date
+from typing import Any, Sequence, TypedDict
+
+from .field_commands import BOOLEAN_FIELDS, CURRENCY_SYMBOLS, DATE_FIELDS, FIELD_ALIASES, LIST_FIELDS
+
+# Longer messages are never treated as lookups
+BRIEF_ANSWER_MAX_LENGTH = int(os.getenv("BRIEF_ANSWER_MAX_LENGTH", "160"))
+
+# Pseudo-fields answered from the computed state rather than the brief
+COMPLETENESS = "completeness"
+MISSING = "missing"
+
+# How each field is named in an answer
+FIELD_LABELS = {
+    "client_name": "client",
+    "agency_name": "agency",
+    "brand_name": "brand",
+    "budget_amount": "budget",
+    "budget_currency": "budget currency",
+    "media_types": "media types",
+    "stems_required": "stems requirement",
+    "term_length": "license term",
+    "deadline_date": "deadline",
+    "brief_sender_name": "brief sender",
+    "brief_sender_email": "brief sender's email",
+    "brief_sender_role": "brief sender's role",
+    "vocals_preference": "vocals preference",
+}
+# Labels for a list field holding more than one item
+PLURAL_LABELS = {
+    "territory": "territories",
+}
+
+# Question phrasings that name a field without using one of its aliases
+_QUESTION_PHRASES: list[tuple[re.Pattern, str]] = [
+    (re.compile(r"\bhow much\b"), "budget_amount"),
+    (re.compile(r"\bwho sent\b"), "brief_sender_name"),
+    (re.compile(r"\bwhen\b.*\b(?:due|needed)\b"), "deadline_date"),
+    (re.compile(r"\bwhen\b.*\b(?:air|launch)\w*\b"), "air_date"),
+    (re.compile(r"\bwhere\b.*\b(?:run|air|used|play)\w*\b"), "territory"),
+    (re.compile(r"\bhow long\b.*\blicen[cs]e\b"), "term_length"),
+    (re.compile(r"\bhow complete\b|\bcompleteness\b"), COMPLETENESS),
+    (re.compile(r"\b(?:still\s+)?missing\b"), MISSING),
+]
+
+_YES_NO_START = re.compile(r"^(?:is|are|was|were|does|do|did|has|have|can|will)\b")
+
+_QUESTION_START = re.compile(
+    r"^(?:what|what's|whats|who|who's|whos|when|when's|where|which|how|is|are|does|do|did|has|have"
+    r"|tell me|show me|give me|remind me)\b"
+)
+
+# Requests that need reasoning or prose go to the model
+_OPEN_ENDED = re.compile(
+    r"\b(?:summari[sz]e|summary|overview|explain|describe|why|suggest|recommend|ideas?|compare|think"
+    r"|should|could|would|opinion|elaborate|about|rewrite|draft|write|improve|analy[sz]e|fit|match|feel)\b"
+)
+
+_FILLER = {
+    "what", "whats", "who", "whos", "when", "whens", "where", "which", "how", "much", "long",
+    "is", "are", "was", "were", "the", "a", "an", "our", "this", "that", "these", "those",
+    "project", "brief", "campaign", "job", "for", "of", "in", "on", "do", "does", "did",
+    "we", "they", "you", "i", "it", "its", "there", "have", "has", "got", "me", "tell", "show",
+    "give", "remind", "please", "can", "current", "currently", "set", "s", "any", "again", "so",
+    "far", "yet", "exactly", "to", "by", "be", "will", "need", "needed", "due", "sent", "name",
+    "value", "still", "missing", "complete", "completeness", "air", "airs", "launch", "launches",
+    "run", "used", "license", "licence",
+}
+
+_ALIAS_PATTERN = re.compile(
+    r"\b(?:"
+    + "|".join(
+        sorted(
+            {re.escape(alias) for aliases in FIELD_ALIASES.values() for alias in aliases},
+            key=len,
+            reverse=True,
+        )
+    )
+    + r")\b"
+)
+_ALIAS_TO_FIELD = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+_SYMBOL_FOR_CURRENCY = {code: symbol for symbol, code in CURRENCY_SYMBOLS.items()}
+
+
+class BriefAnswer(TypedDict):
+    """A templated answer and the fields it was built from"""
+    fields: list[str]
+    answer: str
+
+
+def _label(field: str) -> str:
+    return FIELD_LABELS.get(field, field.replace("_", " "))
+
+
+def _has_value(value: Any) -> bool:
+    return value is not None and value != "" and value != []
+
+
+def format_amount(amount: Any, currency: str | None) -> str:
+    """€175,000 / CHF 40,000"""
+    try:
+        number = float(amount)
+    except (TypeError, ValueError):
+        return str(amount)
+    text = f"{number:,.0f}" if number.is_integer() else f"{number:,.2f}"
+    currency = (currency or "EUR").upper()
+    symbol = _SYMBOL_FOR_CURRENCY.get(currency)
+    return f"{symbol}{text}" if symbol else f"{currency} {text}"
+
+
+def format_date(value: Any) -> str:
+    """ISO dates as '13 March 2026', anything else unchanged"""
+    try:
+        parsed = date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return str(value)
+    return f"{parsed.day} {parsed:%B %Y}"
+
+
+def format_list(items: Sequence[Any]) -> str:
+    """'A', 'A and B', 'A, B and C'"""
+    texts = []
+    for item in items:
+        if isinstance(item, dict):
+            title = item.get("title") or item.get("name") or item.get("track")
+            artist = item.get("artist")
+            texts.append(f"{title} by {artist}" if title and artist else str(title or artist or item))
+        else:
+            texts.append(str(item))
+    if len(texts) <= 1:
+        return "".join(texts)
+    return ", ".join(texts[:-1]) + " and " + texts[-1]
+
+
+def _field_answer(field: str, brief: dict[str, Any], project_type: str | None) -> str:
+    value = brief.get(field)
+    label = _label(field)
+    if not _has_value(value):
+        return f"The {label} hasn't been provided yet."
+
+    if field == "budget_amount":
+        answer = f"The budget is {format_amount(value, brief.get('budget_currency'))}"
+        if project_type == "Production":
+            return answer + " (Production)."
+        return answer + (f" (Type {project_type})." if project_type else ".")
+    if field == "project_type":
+        return "This is a Production project." if value == "Production" else f"This is a Type {value} project."
+    if field == "brief_sender_name":
+        email = brief.get("brief_sender_email")
+        return f"The brief was sent by {value}" + (f" ({email})." if email else ".")
+    if field == "exclusivity":
+        if not value:
+            return "No, the license is non-exclusive."
+        details = brief.get("exclusivity_details")
+        return "Yes, the license is exclusive" + (f": {details}." if details else ".")
+    if field == "stems_required":
+        return "Yes, stems are required." if value else "No, stems aren't required."
+    if field in BOOLEAN_FIELDS:
+        return f"The {label} is {'yes' if value else 'no'}."
+    if field in DATE_FIELDS:
+        return f"The {label} is {format_date(value)}."
+    if field in LIST_FIELDS or isinstance(value, list):
+        items = value if isinstance(value, list) else [value]
+        if len(items) > 1:
+            label = PLURAL_LABELS.get(field, label)
+        return f"The {label} {'are' if label.endswith('s') else 'is'} {format_list(items)}."
+    return f"The {label} is {value}."
+
+
+def _requested_fields(text: str) -> list[str]:
+    fields: list[str] = []
+    for match in _ALIAS_PATTERN.finditer(text):
+        field = _ALIAS_TO_FIELD[match.group(0)]
+        if field not in fields:
+            fields.append(field)
+    if not fields:
+        for pattern, field in _QUESTION_PHRASES:
+            if pattern.search(text):
+                fields.append(field)
+                break
+    # "exclusivity details" already covers the yes/no question
+    if "exclusivity_details" in fields and "exclusivity" in fields:
+        fields.remove("exclusivity_details")
+    return fields
+
+
+def answer_brief_question(
+    message: str,
+    brief: dict[str, Any],
+    project_type: str | None = None,
+    completeness: int | None = None,
+    missing: Sequence[str] = (),
+) -> BriefAnswer | None:
+    """Answer a field lookup from the brief, or return None to escalate to the LLM"""
+    text = (message or "").strip().lower()
+    if not text or len(text) > BRIEF_ANSWER_MAX_LENGTH or "\n" in text:
+        return None
+    text = text.replace("’", "'").rstrip("?!. ")
+    if not (_QUESTION_START.match(text) or message.strip().endswith("?")):
+        return None
+    if _OPEN_ENDED.search(text):
+        return None
+
+    text = re.sub(r"'s\b", "", text)
+    fields = _requested_fields(text)
+    if not fields:
+        return None
+
+    # Words we can't account for mean the question is more specific than a lookup
+    leftover = [
+        word for word in re.findall(r"[a-z0-9']+", _ALIAS_PATTERN.sub(" ", text))
+        if word.replace("'", "") not in _FILLER
+    ]
+    if leftover:
+        return None
+    # "is the deadline set?" asks about the value, not for it
+    if _YES_NO_START.match(text) and any(field not in BOOLEAN_FIELDS for field in fields):
+        return None
+
+    answers = []
+    for field in fields:
+        if field == COMPLETENESS:
+            if completeness is None:
+                return None
+            answers.append(f"The brief is {completeness}% complete.")
+        elif field == MISSING:
+            if missing:
+                answers.append(f"Still missing: {format_list([_label(f) for f in missing])}.")
+            else:
+                answers.append("All critical fields are filled in.")
+        else:
+            answers.append(_field_answer(field, brief, project_type))
+    return {"fields": fields, "answer": " ".join(answers)}
@@ -0,0 +1,361 @@
+"""
+Near-duplicate index of previously extracted briefs
+
+Brief revisions ("v2 attached, budget now 60k") are mostly the same text as
+an earlier paste. Each indexed brief gets a MinHash signature over word
+shingles; signatures are split into LSH bands so a lookup only compares
+against briefs that share at least one band. When the best candidate is at
+least BRIEF_INDEX_THRESHOLD similar, the caller starts from that brief's
+extraction and only sends the changed lines to the LLM.
+
+Entries are scoped (to a project, or a thread without one): a lookup only
+matches briefs indexed under the same scope, so one client's extraction is
+never the starting point for another project's paste. A match also reports
+how many of its lines the new paste removed; an extraction can't be reused
+when lines it may have been drawn from are gone.
+
+Entries live in memory and in a local SQLite file (BRIEF_INDEX_DB) so the
+index survives restarts; no outside service is involved.
+
+Hashing a long brief takes a noticeable fraction of a second of pure Python,
+so the signature is computed in a worker thread, once per paste: the caller
+passes the result of signature() to both lookup() and add().
+"""
+
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, NamedTuple, TypedDict
+
+from .extraction_cache import normalize_message
+from .observability import get_logger, log_fields
+
+BRIEF_INDEX = os.getenv("BRIEF_INDEX", "true").lower() in {"1", "true", "yes"}
+BRIEF_INDEX_DB = os.getenv("BRIEF_INDEX_DB", "brief_index.db")
+BRIEF_INDEX_THRESHOLD = float(os.getenv("BRIEF_INDEX_THRESHOLD", "0.8"))
+BRIEF_INDEX_MAX_ENTRIES = int(os.getenv("BRIEF_INDEX_MAX_ENTRIES", "2000"))
+
+# 32 bands of 4 rows: pairs above ~0.5 Jaccard almost always share a bucket
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 4
+# Fewer shingles than this and the signature is mostly noise
+MIN_SHINGLES = 8
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED_B41E)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+_WORD = re.compile(r"[a-z0-9€$£%.,:/'-]+")
+
+logger = get_logger(__name__)
+
+
+def shingles(text: str) -> set[int]:
+    """64-bit hashes of the overlapping word n-grams of a normalized brief"""
+    words = _WORD.findall(normalize_message(text).lower())
+    if len(words) <= SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return {int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big") for gram in grams}
+
+
+def minhash(shingle_hashes: set[int]) -> tuple[int, ...]:
+    """MinHash signature: the minimum of each hash permutation over the shingles"""
+    return tuple(
+        min((a * value + b) % _PRIME for value in shingle_hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def signature_of(text: str) -> tuple[int, ...] | None:
+    """MinHash signature of a brief, or None when it is too short to compare"""
+    shingle_hashes = shingles(text)
+    if len(shingle_hashes) < MIN_SHINGLES:
+        return None
+    return minhash(shingle_hashes)
+
+
+def band_keys(scope: str, signature: tuple[int, ...]) -> list[tuple[str, int, int]]:
+    """(scope, band, bucket) keys of a signature"""
+    return [
+        (scope, band, hash(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+        for band in range(LSH_BANDS)
+    ]
+
+
+def similarity(left: tuple[int, ...], right: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERMUTATIONS
+
+
+def line_diff(previous: str, current: str) -> tuple[str, int]:
+    """Lines of ``current`` added or changed relative to ``previous``, and how many
+    non-blank lines of ``previous`` were removed or replaced"""
+    old_lines = normalize_message(previous).split("\n")
+    new_lines = normalize_message(current).split("\n")
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    changed = []
+    removed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in {"replace", "delete"}:
+            removed += sum(1 for line in old_lines[i1:i2] if line)
+        if tag in {"replace", "insert"}:
+            changed.extend(line for line in new_lines[j1:j2] if line)
+    return "\n".join(changed), removed
+
+
+class IndexedBrief(NamedTuple):
+    scope: str
+    text: str
+    signature: tuple[int, ...]
+    extracted_brief: dict[str, Any]
+
+
+class BriefMatch(TypedDict):
+    """Closest indexed brief for a new paste"""
+    text: str
+    extracted_brief: dict[str, Any]
+    similarity: float
+    changed_text: str
+    removed_lines: int
+
+
+class BriefIndex:
+    """MinHash/LSH index of processed briefs with a SQLite tier"""
+
+    def __init__(
+        self,
+        db_path: str = BRIEF_INDEX_DB,
+        threshold: float = BRIEF_INDEX_THRESHOLD,
+        max_entries: int = BRIEF_INDEX_MAX_ENTRIES,
+        enabled: bool = BRIEF_INDEX,
+    ):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: OrderedDict[str, IndexedBrief] = OrderedDict()
+        self._buckets: dict[tuple[str, int, int], set[str]] = {}
+        self._db: sqlite3.Connection | None = None
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.candidates = 0
+        self.stores = 0
+        self.lookup_seconds = 0.0
+        self.signatures = 0
+        self.signature_seconds = 0.0
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if not self.db_path:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS brief_index ("
+                " key TEXT PRIMARY KEY,"
+                " scope TEXT NOT NULL DEFAULT '',"
+                " text TEXT NOT NULL,"
+                " signature BLOB NOT NULL,"
+                " extracted_brief TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(brief_index)")}
+            if "scope" not in columns:
+                # Unscoped rows from older versions never match a scoped lookup
+                self._db.execute("ALTER TABLE brief_index ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
+            self._db.commit()
+        return self._db
+
+    def _disk_load(self) -> list[tuple[str, str, str, bytes, str]]:
+        db = self._connect()
+        if db is None:
+            return []
+        rows = db.execute(
+            "SELECT key, scope, text, signature, extracted_brief FROM brief_index"
+            " WHERE scope != '' ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        return list(reversed(rows))
+
+    def _disk_put(self, key: str, entry: IndexedBrief, evicted: list[str]) -> None:
+        db = self._connect()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO brief_index (key, scope, text, signature, extracted_brief, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                entry.scope,
+                entry.text,
+                array("Q", entry.signature).tobytes(),
+                json.dumps(entry.extracted_brief, default=str),
+                time.time(),
+            ),
+        )
+        db.executemany("DELETE FROM brief_index WHERE key = ?", [(k,) for k in evicted])
+        db.commit()
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                rows = await asyncio.to_thread(self._disk_load)
+            except sqlite3.Error as e:
+                logger.warning("brief index load failed", extra=log_fields(error=str(e)))
+                rows = []
+            for key, scope, text, signature, extracted_brief in rows:
+                entry = IndexedBrief(scope, text, tuple(array("Q", signature)), json.loads(extracted_brief))
+                self._insert(key, entry)
+            self._loaded = True
+
+    def _insert(self, key: str, entry: IndexedBrief) -> list[str]:
+        """Add an entry to the in-memory index; returns evicted keys"""
+        self._remove(key)
+        self._entries[key] = entry
+        for band_key in band_keys(entry.scope, entry.signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            evicted.append(oldest)
+        return evicted
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in band_keys(entry.scope, entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    async def signature(self, text: str, scope: str | None) -> tuple[int, ...] | None:
+        """Signature of a paste for lookup() and add(), computed off the event loop"""
+        if not self.enabled or not scope:
+            return None
+        started = time.perf_counter()
+        try:
+            return await asyncio.to_thread(signature_of, text)
+        finally:
+            self.signatures += 1
+            self.signature_seconds += time.perf_counter() - started
+
+    async def lookup(
+        self,
+        text: str,
+        scope: str | None,
+        signature: tuple[int, ...] | None = None,
+    ) -> BriefMatch | None:
+        """Most similar brief indexed under ``scope`` at or above the threshold"""
+        if not self.enabled or not scope:
+            return None
+        await self._ensure_loaded()
+        if signature is None:
+            signature = await self.signature(text, scope)
+        started = time.perf_counter()
+        self.lookups += 1
+        try:
+            if signature is None or not self._entries:
+                return None
+            candidates = set()
+            for band_key in band_keys(scope, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            self.candidates += len(candidates)
+
+            best_key, best_score = None, 0.0
+            for key in candidates:
+                score = similarity(signature, self._entries[key].signature)
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is None or best_score < self.threshold:
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            changed, removed = line_diff(entry.text, text)
+            return {
+                "text": entry.text,
+                "extracted_brief": dict(entry.extracted_brief),
+                "similarity": round(best_score, 3),
+                "changed_text": changed,
+                "removed_lines": removed,
+            }
+        finally:
+            self.lookup_seconds += time.perf_counter() - started
+
+    async def add(
+        self,
+        text: str,
+        extracted_brief: dict[str, Any],
+        scope: str | None,
+        signature: tuple[int, ...] | None = None,
+    ) -> None:
+        """Index a processed brief under ``scope`` with the fields extracted from it"""
+        if not self.enabled or not extracted_brief or not scope:
+            return
+        if signature is None:
+            signature = await self.signature(text, scope)
+            if signature is None:
+                return
+        await self._ensure_loaded()
+        normalized = normalize_message(text)
+        key = hashlib.sha256(f"{scope}\n{normalized}".encode("utf-8")).hexdigest()
+        entry = IndexedBrief(scope, normalized, signature, dict(extracted_brief))
+        evicted = self._insert(key, entry)
+        self.stores += 1
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._disk_put, key, entry, evicted)
+            except sqlite3.Error as e:
+                logger.warning("brief index write failed", extra=log_fields(error=str(e)))
+
+    def clear(self) -> None:
+        """Drop the in-memory index (the disk tier is reloaded on next use)"""
+        self._entries.clear()
+        self._buckets.clear()
+        self._loaded = False
+
+    def stats(self) -> dict[str, Any]:
+        """Index size, hit rate and lookup latency"""
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "buckets": len(self._buckets),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.db_path),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "mean_candidates": round(self.candidates / self.lookups, 2) if self.lookups else 0.0,
+            "mean_lookup_ms": round(self.lookup_seconds / self.lookups * 1000, 3) if self.lookups else 0.0,
+            "stores": self.stores,
+            "mean_signature_ms": (
+                round(self.signature_seconds / self.signatures * 1000, 3) if self.signatures else 0.0
+            ),
+        }
+
+
+# Process-wide index instance
+brief_index = BriefIndex()
@@ -0,0 +1,105 @@
+"""
+Bulk brief ingestion
+
+Runs the extraction stage of a chat turn (brief_analyzer.run_extraction) over
+many briefs concurrently, bounded by a semaphore, and yields one result per
+brief as soon as it finishes. Every brief is extracted as a paste: chat
+routing, field commands and brief answers are skipped. A failing brief
+produces an error result instead of aborting the batch; that includes a
+brief whose turn hit its deadline (even if some fields were streamed before
+it did) and one that ended on any route other than an extraction.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator
+
+from pydantic import BaseModel, Field
+
+from .llm_scheduler import llm_priority, PRIORITY_BULK
+
+BULK_INGEST_CONCURRENCY = int(os.getenv("BULK_INGEST_CONCURRENCY", "4"))
+BULK_INGEST_MAX_BRIEFS = int(os.getenv("BULK_INGEST_MAX_BRIEFS", "1000"))
+
+
+class BulkBrief(BaseModel):
+    """One brief in a bulk ingestion request"""
+    id: str | None = None
+    text: str
+
+
+class BulkIngestRequest(BaseModel):
+    """Bulk ingestion request body"""
+    briefs: list[BulkBrief] = Field(..., max_length=BULK_INGEST_MAX_BRIEFS)
+    concurrency: int | None = Field(default=None, ge=1, le=64)
+
+
+async def extract_brief(text: str) -> tuple[dict[str, Any], str]:
+    """Run one brief through the extraction stage; returns (output, route)"""
+    # Deferred so importing the request models doesn't load the graph module
+    from .brief_analyzer import extract_pasted_brief
+
+    return await extract_pasted_brief(text)
+
+
+async def _run_one(
+    index: int,
+    brief: BulkBrief,
+    semaphore: asyncio.Semaphore,
+) -> dict[str, Any]:
+    from .brief_analyzer import DEADLINE_FAILURE, EXTRACTION_FAILURE, EXTRACTION_ROUTES
+
+    # Interactive chat turns are served ahead of bulk extractions
+    llm_priority.set(PRIORITY_BULK)
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            output, route = await extract_brief(brief.text)
+            error = None
+            failure = output.get(EXTRACTION_FAILURE)
+            if failure == DEADLINE_FAILURE:
+                error = "Deadline exceeded before the extraction finished"
+            elif failure is not None:
+                # Parse failures are reported as a chat message
+                messages = output.get("messages") or []
+                error = messages[0].content if messages else "Extraction failed"
+            elif route not in EXTRACTION_ROUTES:
+                error = f"Brief was not extracted (route: {route})"
+        except Exception as e:
+            output = {}
+            error = f"{type(e).__name__}: {e}"
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    result: dict[str, Any] = {
+        "index": index,
+        "id": brief.id,
+        "ok": error is None,
+        "latency_ms": latency_ms,
+    }
+    if error is None:
+        result.update({
+            "extracted_brief": output.get("extracted_brief", {}),
+            "completeness": output.get("completeness"),
+            "project_type": output.get("project_type"),
+            "field_updates": output.get("field_updates", []),
+        })
+    else:
+        result["error"] = error
+    return result
+
+
+async def iter_bulk_extractions(
+    briefs: list[BulkBrief],
+    concurrency: int = BULK_INGEST_CONCURRENCY,
+) -> AsyncIterator[dict[str, Any]]:
+    """Yield extraction results in completion order"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [asyncio.create_task(_run_one(index, brief, semaphore)) for index, brief in enumerate(briefs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: don't keep spending LLM quota
+        for task in tasks:
+            task.cancel()
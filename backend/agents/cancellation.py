@@ -0,0 +1,246 @@
+"""
+Cancellation of abandoned and superseded turns
+
+A turn keeps its LLM calls and project fetches running until the graph run
+finishes, even when nobody will read the output. Two signals now stop it:
+
+- Client disconnect: DisconnectWatchMiddleware keeps listening on the
+  request after its body has been read and sets an event when the client
+  goes away, instead of waiting for the next event write to fail.
+- Superseding turn: runs are registered per thread; a new run on the same
+  thread cancels the previous one, and a run that is no longer the latest
+  refuses to commit its state (ensure_latest) even if it finished first.
+  With several workers the latest run id per thread is also claimed in the
+  shared store, so a run superseded from another worker is stopped at its
+  next commit (it can't be cancelled mid-call from there).
+
+The graph run is iterated in its own task so cancellation is delivered as
+CancelledError at whatever it is awaiting; the hedger, scheduler and
+prefetch already clean up their in-flight work on cancellation.
+"""
+
+import asyncio
+import os
+from contextvars import ContextVar
+from typing import Any, AsyncIterator
+
+from .observability import CANCELLED_RUNS, CANCELLED_WORK, TOKENS_SAVED, get_logger, log_fields
+from .shared_state import shared_state
+
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() in {"1", "true", "yes"}
+CANCEL_SUPERSEDED = os.getenv("CANCEL_SUPERSEDED", "true").lower() in {"1", "true", "yes"}
+
+REASON_DISCONNECT = "disconnect"
+REASON_SUPERSEDED = "superseded"
+
+logger = get_logger(__name__)
+
+# Set by DisconnectWatchMiddleware for the current request
+client_disconnected: ContextVar[asyncio.Event | None] = ContextVar("client_disconnected", default=None)
+
+
+class RunHandle:
+    """One agent run on a thread"""
+
+    def __init__(self, thread_id: str | None):
+        self.thread_id = thread_id
+        # Id claimed in the shared store (several workers only)
+        self.run_id: str | None = None
+        self.task: asyncio.Task | None = None
+        self.cancel_reason: str | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def cancel(self, reason: str) -> None:
+        if self.cancel_reason is not None:
+            return
+        self.cancel_reason = reason
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+# Run whose graph work is executing in the current task
+current_run: ContextVar[RunHandle | None] = ContextVar("current_run", default=None)
+
+
+class RunRegistry:
+    """Latest run per thread, and counters of cancelled work"""
+
+    def __init__(self, cancel_superseded: bool = CANCEL_SUPERSEDED):
+        self.cancel_superseded = cancel_superseded
+        self._latest: dict[str, RunHandle] = {}
+        self.runs = 0
+        self.cancelled_runs = {REASON_DISCONNECT: 0, REASON_SUPERSEDED: 0}
+        self.cancelled_work: dict[str, int] = {}
+        self.commits_blocked = 0
+        self.tokens_saved = 0
+
+    async def start(self, thread_id: str | None) -> RunHandle:
+        """Register a run; an older run on the same thread is cancelled"""
+        self.runs += 1
+        handle = RunHandle(thread_id)
+        if thread_id:
+            previous = self._latest.get(thread_id)
+            if previous is not None and self.cancel_superseded:
+                self.cancel(previous, REASON_SUPERSEDED)
+            self._latest[thread_id] = handle
+            handle.run_id = await shared_state.claim_run(thread_id)
+        return handle
+
+    def finish(self, handle: RunHandle) -> None:
+        if handle.thread_id and self._latest.get(handle.thread_id) is handle:
+            del self._latest[handle.thread_id]
+
+    async def is_latest(self, handle: RunHandle) -> bool:
+        if not handle.thread_id:
+            return True
+        if self._latest.get(handle.thread_id) not in {handle, None}:
+            return False
+        # A newer run may have started on another worker
+        return handle.run_id is None or await shared_state.latest_run(handle.thread_id) in {handle.run_id, None}
+
+    def cancel(self, handle: RunHandle, reason: str) -> None:
+        if handle.cancelled or (handle.task is not None and handle.task.done()):
+            return
+        handle.cancel(reason)
+        self.cancelled_runs[reason] += 1
+        CANCELLED_RUNS.labels(reason=reason).inc()
+        logger.info("run cancelled", extra=log_fields(thread_id=handle.thread_id, reason=reason))
+
+    def record_work(self, kind: str, tokens: int = 0) -> None:
+        self.cancelled_work[kind] = self.cancelled_work.get(kind, 0) + 1
+        self.tokens_saved += tokens
+        CANCELLED_WORK.labels(kind=kind).inc()
+        if tokens:
+            TOKENS_SAVED.inc(tokens)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "active_threads": len(self._latest),
+            **{f"cancelled_{reason}": count for reason, count in self.cancelled_runs.items()},
+            **{f"cancelled_work_{kind}": count for kind, count in self.cancelled_work.items()},
+            "commits_blocked": self.commits_blocked,
+            "estimated_tokens_saved": self.tokens_saved,
+        }
+
+
+# Process-wide run registry
+run_registry = RunRegistry()
+
+
+def record_cancelled_work(kind: str, tokens: int = 0) -> None:
+    """Count work dropped because its run was cancelled (hedge losers etc. don't count)"""
+    handle = current_run.get()
+    if handle is not None and handle.cancelled:
+        run_registry.record_work(kind, tokens)
+
+
+async def ensure_latest() -> None:
+    """Raise CancelledError if a newer run on this thread has started.
+
+    Called before a node returns so a superseded turn never commits state.
+    """
+    handle = current_run.get()
+    if handle is None or (not handle.cancelled and await run_registry.is_latest(handle)):
+        return
+    run_registry.commits_blocked += 1
+    if not handle.cancelled:
+        run_registry.cancel(handle, REASON_SUPERSEDED)
+    raise asyncio.CancelledError()
+
+
+async def _pump(events: AsyncIterator[Any], handle: RunHandle, queue: asyncio.Queue, done: object) -> None:
+    current_run.set(handle)
+    try:
+        async for event in events:
+            queue.put_nowait(event)
+    finally:
+        queue.put_nowait(done)
+
+
+async def run_cancellable(events: AsyncIterator[Any], handle: RunHandle) -> AsyncIterator[Any]:
+    """Yield ``events`` until they end, the run is cancelled or the client disconnects"""
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    handle.task = asyncio.create_task(_pump(events, handle, queue, done))
+    disconnected = client_disconnected.get() if CANCEL_ON_DISCONNECT else None
+    watcher = asyncio.ensure_future(disconnected.wait()) if disconnected is not None else None
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter} | ({watcher} if watcher else set()), return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                run_registry.cancel(handle, REASON_DISCONNECT)
+                break
+            item = getter.result()
+            if item is done:
+                break
+            yield item
+        # Surface errors from the graph run; cancellation just ends the stream
+        await asyncio.gather(handle.task, return_exceptions=handle.cancelled)
+    finally:
+        for task in (handle.task, watcher):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+
+class CancellableRunMixin:
+    """Agent mixin: runs are registered per thread and cancelled when abandoned"""
+
+    async def run(self, input):
+        handle = await run_registry.start(getattr(input, "thread_id", None))
+        try:
+            async for event in run_cancellable(super().run(input), handle):
+                yield event
+        finally:
+            run_registry.finish(handle)
+
+
+class DisconnectWatchMiddleware:
+    """ASGI middleware that notices client disconnects during a streamed run"""
+
+    def __init__(self, app, path: str = "/"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        disconnected = asyncio.Event()
+        watcher: asyncio.Task | None = None
+
+        async def watch() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def watched_receive():
+            nonlocal watcher
+            if watcher is not None:
+                # The watcher owns the channel once the body has been read
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                watcher = asyncio.create_task(watch())
+            return message
+
+        token = client_disconnected.set(disconnected)
+        try:
+            await self.app(scope, watched_receive, send)
+        finally:
+            client_disconnected.reset(token)
+            if watcher is not None and not watcher.done():
+                watcher.cancel()
+                await asyncio.gather(watcher, return_exceptions=True)
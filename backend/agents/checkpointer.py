@@ -0,0 +1,607 @@
+"""
+Pluggable, bounded checkpointer backends for the brief analyzer graph
+
+CHECKPOINTER selects the backend:
+- "memory": in-process MemorySaver (development; lost on restart)
+- "sqlite": SQLite file in WAL mode (CHECKPOINT_DB), no outside service needed
+
+Both backends enforce per-thread retention: threads idle for longer than
+CHECKPOINT_THREAD_TTL are dropped and only the newest
+CHECKPOINT_MAX_PER_THREAD checkpoints are kept per thread (in memory, along
+with the channel values only the trimmed checkpoints pointed to). Retention
+runs as a background compaction task started by the app lifespan.
+
+With CHECKPOINT_SNAPSHOT_EVERY > 1, the large channels (messages,
+extracted_brief, suggestion_chips) are stored as JSON-patch deltas against
+the thread's latest snapshot, and a full snapshot is written every N puts.
+Reads resolve deltas transparently; compaction keeps referenced snapshots.
+Each worker keeps the latest snapshot of at most CHECKPOINT_SNAPSHOT_CACHE_SIZE
+threads; a thread evicted from that LRU gets a full snapshot on its next put,
+and so does a thread whose previous checkpoint this worker didn't write
+(another worker ran the last turn, or the run resumed from an older one), as
+the kept snapshot may have been compacted away since.
+"""
+
+import asyncio
+import copy
+import os
+import resource
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from .json_patch import JSONPatchError, apply_patch, encoded_size, make_patch
+from .observability import get_logger, log_fields
+from .state_sync import STATE_SYNC_MODE
+
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory").lower()
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "checkpoints.db")
+CHECKPOINT_THREAD_TTL = float(os.getenv("CHECKPOINT_THREAD_TTL", str(7 * 24 * 3600)))
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20"))
+CHECKPOINT_COMPACTION_INTERVAL = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "300"))
+# Full snapshot every N puts, deltas in between (0 or 1 = always full); on by default in delta sync mode
+CHECKPOINT_SNAPSHOT_EVERY = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "10" if STATE_SYNC_MODE == "delta" else "0"))
+CHECKPOINT_DELTA_CHANNELS = tuple(
+    channel.strip()
+    for channel in os.getenv("CHECKPOINT_DELTA_CHANNELS", "messages,extracted_brief,suggestion_chips").split(",")
+    if channel.strip()
+)
+# Threads whose latest snapshot a worker keeps in memory to diff against
+CHECKPOINT_SNAPSHOT_CACHE_SIZE = int(os.getenv("CHECKPOINT_SNAPSHOT_CACHE_SIZE", "1024"))
+
+# Marker of a channel value stored as a delta: {DELTA_MARKER: base_checkpoint_id, "ops": [...]}
+DELTA_MARKER = "__tf_delta__"
+
+logger = get_logger(__name__)
+
+
+def _thread_id(config: dict[str, Any]) -> str | None:
+    return (config.get("configurable") or {}).get("thread_id")
+
+
+def _thread_key(config: dict[str, Any]) -> tuple[str, str]:
+    configurable = config.get("configurable") or {}
+    return str(configurable.get("thread_id")), configurable.get("checkpoint_ns", "")
+
+
+def is_delta(value: Any) -> bool:
+    return isinstance(value, dict) and DELTA_MARKER in value
+
+
+class CheckpointDeltaCodec:
+    """Snapshot + delta encoding of large checkpoint channels.
+
+    The latest snapshot of recently active threads is kept in-process to
+    diff against, in an LRU of ``snapshot_cache_size`` threads, so it stays
+    bounded on workers that never run compaction; decoded base checkpoints
+    are cached in a small LRU so a run of reads doesn't re-resolve the same
+    snapshot.
+    """
+
+    def __init__(
+        self,
+        snapshot_every: int = CHECKPOINT_SNAPSHOT_EVERY,
+        channels: Iterable[str] = CHECKPOINT_DELTA_CHANNELS,
+        cache_size: int = 256,
+        snapshot_cache_size: int = CHECKPOINT_SNAPSHOT_CACHE_SIZE,
+    ):
+        self.snapshot_every = snapshot_every
+        self.channels = tuple(channels)
+        self.cache_size = cache_size
+        self.snapshot_cache_size = snapshot_cache_size
+        self._snapshots: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self._bases: OrderedDict[tuple[str, str, str], dict[str, Any]] = OrderedDict()
+        self.snapshots_written = 0
+        self.deltas_written = 0
+        self.full_bytes = 0
+        self.stored_bytes = 0
+        self.missing_bases = 0
+        self.evicted_snapshots = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.snapshot_every > 1 and bool(self.channels)
+
+    def encode(self, config, checkpoint, only: Iterable[str] | None = None):
+        """Checkpoint with delta-encoded channels, or unchanged on a snapshot put"""
+        if not self.enabled:
+            return checkpoint
+        key = _thread_key(config)
+        values = checkpoint.get("channel_values") or {}
+        channels = [c for c in self.channels if c in values and (only is None or c in only)]
+        snapshot = self._snapshots.get(key)
+        parent_id = (config.get("configurable") or {}).get("checkpoint_id")
+        if snapshot is None or snapshot["last"] != parent_id or snapshot["puts"] + 1 >= self.snapshot_every:
+            self._snapshots[key] = {
+                "id": checkpoint["id"],
+                "values": {c: copy.deepcopy(values[c]) for c in self.channels if c in values},
+                "puts": 0,
+                "last": checkpoint["id"],
+            }
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.snapshot_cache_size:
+                self._snapshots.popitem(last=False)
+                self.evicted_snapshots += 1
+            self.snapshots_written += 1
+            for channel in channels:
+                size = encoded_size(values[channel])
+                self.full_bytes += size
+                self.stored_bytes += size
+            return checkpoint
+
+        self._snapshots.move_to_end(key)
+        snapshot["puts"] += 1
+        snapshot["last"] = checkpoint["id"]
+        encoded = dict(values)
+        for channel in channels:
+            full = encoded_size(values[channel])
+            self.full_bytes += full
+            if channel not in snapshot["values"]:
+                self.stored_bytes += full
+                continue
+            try:
+                ops = make_patch(snapshot["values"][channel], values[channel])
+            except JSONPatchError:
+                self.stored_bytes += full
+                continue
+            delta = {DELTA_MARKER: snapshot["id"], "ops": ops}
+            delta_size = encoded_size(delta)
+            if delta_size < full:
+                encoded[channel] = delta
+                self.stored_bytes += delta_size
+                self.deltas_written += 1
+            else:
+                self.stored_bytes += full
+        return {**checkpoint, "channel_values": encoded}
+
+    def bases(self, checkpoint) -> set[str]:
+        """Checkpoint IDs the delta channels of a raw checkpoint refer to"""
+        values = checkpoint.get("channel_values") or {}
+        return {value[DELTA_MARKER] for value in values.values() if is_delta(value)}
+
+    def cached_base(self, key: tuple[str, str], checkpoint_id: str) -> dict[str, Any] | None:
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot["id"] == checkpoint_id:
+            return snapshot["values"]
+        cache_key = (*key, checkpoint_id)
+        values = self._bases.get(cache_key)
+        if values is not None:
+            self._bases.move_to_end(cache_key)
+        return values
+
+    def remember_base(self, key: tuple[str, str], checkpoint_id: str, values: dict[str, Any]) -> None:
+        self._bases[(*key, checkpoint_id)] = values
+        while len(self._bases) > self.cache_size:
+            self._bases.popitem(last=False)
+
+    def decode(self, checkpoint_tuple, bases: dict[str, dict[str, Any] | None]):
+        """Checkpoint tuple with deltas applied to their (decoded) base values"""
+        values = checkpoint_tuple.checkpoint.get("channel_values") or {}
+        decoded = dict(values)
+        for channel, value in values.items():
+            if not is_delta(value):
+                continue
+            base = bases.get(value[DELTA_MARKER]) or {}
+            if channel not in base:
+                # The base checkpoint is gone; drop the channel rather than fail the read
+                self.missing_bases += 1
+                logger.warning("checkpoint delta base missing", extra=log_fields(
+                    channel=channel, base=value[DELTA_MARKER],
+                ))
+                decoded.pop(channel)
+                continue
+            decoded[channel] = apply_patch(base[channel], value["ops"])
+        checkpoint = {**checkpoint_tuple.checkpoint, "channel_values": decoded}
+        return checkpoint_tuple._replace(checkpoint=checkpoint)
+
+    def forget_thread(self, thread_id: str) -> None:
+        for key in [key for key in self._snapshots if key[0] == thread_id]:
+            del self._snapshots[key]
+        for key in [key for key in self._bases if key[0] == thread_id]:
+            del self._bases[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "delta_enabled": self.enabled,
+            "snapshot_every": self.snapshot_every,
+            "snapshots_written": self.snapshots_written,
+            "deltas_written": self.deltas_written,
+            "channel_full_bytes": self.full_bytes,
+            "channel_stored_bytes": self.stored_bytes,
+            "bytes_saved": self.full_bytes - self.stored_bytes,
+            "missing_bases": self.missing_bases,
+            "cached_snapshots": len(self._snapshots),
+            "evicted_snapshots": self.evicted_snapshots,
+        }
+
+
+def _base_config(key: tuple[str, str], checkpoint_id: str) -> dict[str, Any]:
+    thread_id, checkpoint_ns = key
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+def process_rss_bytes() -> int:
+    """Peak resident set size of this worker"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver with per-thread TTL and checkpoint-count retention"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread_activity: dict[str, float] = {}
+        self.codec = CheckpointDeltaCodec()
+        self.compactions = 0
+        self.deleted_threads = 0
+        self.deleted_checkpoints = 0
+        self.deleted_blobs = 0
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        # Only channels with new versions get a new blob; the rest keep theirs
+        checkpoint = self.codec.encode(config, checkpoint, only=new_versions)
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = _thread_id(config)
+        if thread_id:
+            self.thread_activity[thread_id] = time.time()
+        return next_config
+
+    def get_tuple(self, config):
+        return self._decode(super().get_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in super().list(config, filter=filter, before=before, limit=limit):
+            yield self._decode(checkpoint_tuple)
+
+    def _decode(self, checkpoint_tuple):
+        if checkpoint_tuple is None:
+            return None
+        base_ids = self.codec.bases(checkpoint_tuple.checkpoint)
+        if not base_ids:
+            return checkpoint_tuple
+        key = _thread_key(checkpoint_tuple.config)
+        bases = {}
+        for base_id in base_ids:
+            values = self.codec.cached_base(key, base_id)
+            if values is None:
+                # A base's unchanged channels may themselves be deltas; get_tuple resolves them
+                base = self.get_tuple(_base_config(key, base_id))
+                if base is not None:
+                    values = base.checkpoint["channel_values"]
+                    self.codec.remember_base(key, base_id, values)
+            bases[base_id] = values
+        return self.codec.decode(checkpoint_tuple, bases)
+
+    def _referenced_bases(self, key: tuple[str, str], checkpoint_ids: Iterable[str]) -> set[str]:
+        """Snapshots the given checkpoints depend on, transitively"""
+        referenced: set[str] = set()
+        frontier = list(checkpoint_ids)
+        while frontier:
+            raw = MemorySaver.get_tuple(self, _base_config(key, frontier.pop()))
+            if raw is None:
+                continue
+            for base_id in self.codec.bases(raw.checkpoint) - referenced:
+                referenced.add(base_id)
+                frontier.append(base_id)
+        return referenced
+
+    def _drop_unreferenced_blobs(self, key: tuple[str, str], checkpoints: dict[str, Any]) -> int:
+        """Delete the channel values no remaining checkpoint of the namespace points to"""
+        # A checkpoint's channel_versions name the blobs its channel values are loaded from
+        referenced = set()
+        for entry in checkpoints.values():
+            versions = self.serde.loads_typed(entry[0]).get("channel_versions") or {}
+            referenced.update(versions.items())
+        unreferenced = [
+            blob_key for blob_key in self.blobs
+            if blob_key[:2] == key and blob_key[2:] not in referenced
+        ]
+        for blob_key in unreferenced:
+            del self.blobs[blob_key]
+        return len(unreferenced)
+
+    def _drop_thread(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+        for key in [key for key in self.writes if key[0] == thread_id]:
+            del self.writes[key]
+        for key in [key for key in self.blobs if key[0] == thread_id]:
+            del self.blobs[key]
+        self.thread_activity.pop(thread_id, None)
+        self.codec.forget_thread(thread_id)
+
+    async def compact(
+        self,
+        ttl: float = CHECKPOINT_THREAD_TTL,
+        max_per_thread: int = CHECKPOINT_MAX_PER_THREAD,
+    ) -> dict[str, int]:
+        """Drop idle threads, trim old checkpoints and the channel values only they used"""
+        cutoff = time.time() - ttl
+        expired = [tid for tid, seen in self.thread_activity.items() if seen < cutoff]
+        for thread_id in expired:
+            self._drop_thread(thread_id)
+
+        trimmed = 0
+        deleted_blobs = 0
+        for thread_id, namespaces in self.storage.items():
+            for checkpoint_ns, checkpoints in namespaces.items():
+                # Checkpoint IDs are time-ordered, so the smallest are the oldest
+                ordered = sorted(checkpoints)
+                stale = ordered[:-max_per_thread] if max_per_thread > 0 else []
+                if stale and self.codec.enabled:
+                    keep = self._referenced_bases((thread_id, checkpoint_ns), ordered[-max_per_thread:])
+                    stale = [checkpoint_id for checkpoint_id in stale if checkpoint_id not in keep]
+                for checkpoint_id in stale:
+                    del checkpoints[checkpoint_id]
+                    self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                if stale:
+                    deleted_blobs += self._drop_unreferenced_blobs((thread_id, checkpoint_ns), checkpoints)
+                trimmed += len(stale)
+
+        self.compactions += 1
+        self.deleted_threads += len(expired)
+        self.deleted_checkpoints += trimmed
+        self.deleted_blobs += deleted_blobs
+        return {"deleted_threads": len(expired), "deleted_checkpoints": trimmed, "deleted_blobs": deleted_blobs}
+
+    async def report(self) -> dict[str, Any]:
+        """Row counts and approximate payload size (checkpoints and channel values)"""
+        checkpoints = 0
+        payload_bytes = 0
+        for namespaces in self.storage.values():
+            for checkpoints_by_id in namespaces.values():
+                checkpoints += len(checkpoints_by_id)
+                for entry in checkpoints_by_id.values():
+                    payload_bytes += sum(
+                        len(part[1]) for part in entry if isinstance(part, tuple) and isinstance(part[1], bytes)
+                    )
+        blob_bytes = sum(len(blob[1]) for blob in self.blobs.values() if isinstance(blob[1], bytes))
+        return {
+            "backend": "memory",
+            "threads": len(self.storage),
+            "checkpoints": checkpoints,
+            "writes": len(self.writes),
+            "blobs": len(self.blobs),
+            "payload_bytes": payload_bytes + blob_bytes,
+            "compactions": self.compactions,
+            "deleted_threads": self.deleted_threads,
+            "deleted_checkpoints": self.deleted_checkpoints,
+            "deleted_blobs": self.deleted_blobs,
+            **self.codec.stats(),
+            "process_rss_bytes": process_rss_bytes(),
+        }
+
+
+async def open_sqlite_checkpointer(path: str = CHECKPOINT_DB) -> BaseCheckpointSaver:
+    """Open the SQLite (WAL) checkpointer; must run inside the event loop"""
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class BoundedSqliteSaver(AsyncSqliteSaver):
+        """AsyncSqliteSaver with per-thread TTL and checkpoint-count retention"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.codec = CheckpointDeltaCodec()
+            self.compactions = 0
+            self.deleted_threads = 0
+            self.deleted_checkpoints = 0
+
+        async def setup(self) -> None:
+            if self.is_setup:
+                return
+            await super().setup()
+            async with self.lock:
+                await self.conn.execute("PRAGMA journal_mode=WAL")
+                await self.conn.execute("PRAGMA synchronous=NORMAL")
+                await self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS thread_activity ("
+                    " thread_id TEXT PRIMARY KEY,"
+                    " updated_at REAL NOT NULL)"
+                )
+                # Which snapshot each delta-encoded checkpoint refers to, so compaction keeps it
+                await self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS checkpoint_bases ("
+                    " thread_id TEXT NOT NULL,"
+                    " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+                    " checkpoint_id TEXT NOT NULL,"
+                    " base_id TEXT NOT NULL,"
+                    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, base_id))"
+                )
+                await self.conn.commit()
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            encoded = self.codec.encode(config, checkpoint)
+            next_config = await super().aput(config, encoded, metadata, new_versions)
+            thread_id = _thread_id(config)
+            if thread_id:
+                thread_id, checkpoint_ns = _thread_key(config)
+                async with self.lock:
+                    await self.conn.execute(
+                        "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)",
+                        (thread_id, time.time()),
+                    )
+                    for base_id in self.codec.bases(encoded):
+                        await self.conn.execute(
+                            "INSERT OR IGNORE INTO checkpoint_bases"
+                            " (thread_id, checkpoint_ns, checkpoint_id, base_id) VALUES (?, ?, ?, ?)",
+                            (thread_id, checkpoint_ns, checkpoint["id"], base_id),
+                        )
+                    await self.conn.commit()
+            return next_config
+
+        async def aget_tuple(self, config):
+            return await self._decode(await super().aget_tuple(config))
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            # The parent holds the connection lock while iterating; resolve bases afterwards
+            checkpoint_tuples = [
+                checkpoint_tuple
+                async for checkpoint_tuple in super().alist(config, filter=filter, before=before, limit=limit)
+            ]
+            for checkpoint_tuple in checkpoint_tuples:
+                yield await self._decode(checkpoint_tuple)
+
+        async def _decode(self, checkpoint_tuple):
+            if checkpoint_tuple is None:
+                return None
+            base_ids = self.codec.bases(checkpoint_tuple.checkpoint)
+            if not base_ids:
+                return checkpoint_tuple
+            key = _thread_key(checkpoint_tuple.config)
+            bases = {}
+            for base_id in base_ids:
+                values = self.codec.cached_base(key, base_id)
+                if values is None:
+                    # Snapshots are stored in full, so this never recurses more than once
+                    base = await self.aget_tuple(_base_config(key, base_id))
+                    if base is not None:
+                        values = base.checkpoint["channel_values"]
+                        self.codec.remember_base(key, base_id, values)
+                bases[base_id] = values
+            return self.codec.decode(checkpoint_tuple, bases)
+
+        async def compact(
+            self,
+            ttl: float = CHECKPOINT_THREAD_TTL,
+            max_per_thread: int = CHECKPOINT_MAX_PER_THREAD,
+        ) -> dict[str, int]:
+            """Drop idle threads and trim old checkpoints"""
+            await self.setup()
+            async with self.lock:
+                cursor = await self.conn.execute(
+                    "SELECT thread_id FROM thread_activity WHERE updated_at < ?",
+                    (time.time() - ttl,),
+                )
+                expired = [row[0] for row in await cursor.fetchall()]
+                for thread_id in expired:
+                    await self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                    await self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+                    await self.conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+                    await self.conn.execute("DELETE FROM checkpoint_bases WHERE thread_id = ?", (thread_id,))
+                    self.codec.forget_thread(thread_id)
+
+                # Checkpoint IDs are time-ordered, so keep the highest N per thread,
+                # plus any snapshot a remaining delta checkpoint refers to
+                cursor = await self.conn.execute(
+                    "DELETE FROM checkpoints WHERE rowid IN ("
+                    " SELECT rowid FROM ("
+                    "  SELECT rowid, thread_id, checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER ("
+                    "   PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC"
+                    "  ) AS position FROM checkpoints"
+                    " ) AS ranked WHERE position > ?"
+                    " AND NOT EXISTS ("
+                    "  SELECT 1 FROM checkpoint_bases b WHERE b.thread_id = ranked.thread_id"
+                    "  AND b.checkpoint_ns = ranked.checkpoint_ns"
+                    "  AND b.base_id = ranked.checkpoint_id))",
+                    (max_per_thread,),
+                )
+                trimmed = cursor.rowcount
+                await self.conn.execute(
+                    "DELETE FROM writes WHERE NOT EXISTS ("
+                    " SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id"
+                    " AND c.checkpoint_ns = writes.checkpoint_ns"
+                    " AND c.checkpoint_id = writes.checkpoint_id)"
+                )
+                await self.conn.execute(
+                    "DELETE FROM checkpoint_bases WHERE NOT EXISTS ("
+                    " SELECT 1 FROM checkpoints c WHERE c.thread_id = checkpoint_bases.thread_id"
+                    " AND c.checkpoint_ns = checkpoint_bases.checkpoint_ns"
+                    " AND c.checkpoint_id = checkpoint_bases.checkpoint_id)"
+                )
+                await self.conn.commit()
+
+            self.compactions += 1
+            self.deleted_threads += len(expired)
+            self.deleted_checkpoints += trimmed
+            return {"deleted_threads": len(expired), "deleted_checkpoints": trimmed}
+
+        async def report(self) -> dict[str, Any]:
+            """Row counts and on-disk size"""
+            await self.setup()
+            async with self.lock:
+                counts = {}
+                for table in ("checkpoints", "writes", "thread_activity", "checkpoint_bases"):
+                    cursor = await self.conn.execute(f"SELECT COUNT(*) FROM {table}")
+                    counts[table] = (await cursor.fetchone())[0]
+                cursor = await self.conn.execute(
+                    "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+                )
+                payload_bytes = (await cursor.fetchone())[0]
+            return {
+                "backend": "sqlite",
+                "path": path,
+                "threads": counts["thread_activity"],
+                "checkpoints": counts["checkpoints"],
+                "writes": counts["writes"],
+                "payload_bytes": payload_bytes,
+                "file_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+                "compactions": self.compactions,
+                "deleted_threads": self.deleted_threads,
+                "deleted_checkpoints": self.deleted_checkpoints,
+                **self.codec.stats(),
+                "process_rss_bytes": process_rss_bytes(),
+            }
+
+    saver = BoundedSqliteSaver(await aiosqlite.connect(path))
+    await saver.setup()
+    return saver
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """In-memory checkpointer, used until the app lifespan selects a backend"""
+    return BoundedMemorySaver()
+
+
+# Backend the graph is compiled with; chosen by the app lifespan
+_current: BaseCheckpointSaver | None = None
+
+
+def current_checkpointer() -> BaseCheckpointSaver:
+    """The selected backend, or a process-wide in-memory one if none was selected"""
+    global _current
+    if _current is None:
+        _current = create_checkpointer()
+    return _current
+
+
+def use_checkpointer(saver: BaseCheckpointSaver) -> None:
+    """Compile the graph with ``saver`` (an already compiled graph must be updated by the caller)"""
+    global _current
+    _current = saver
+
+
+async def open_checkpointer() -> BaseCheckpointSaver | None:
+    """Open the configured persistent backend, or None to keep the in-memory one"""
+    if CHECKPOINTER == "sqlite":
+        return await open_sqlite_checkpointer()
+    if CHECKPOINTER != "memory":
+        logger.warning("unknown checkpointer backend, using memory", extra=log_fields(backend=CHECKPOINTER))
+    return None
+
+
+async def close_checkpointer(saver: BaseCheckpointSaver) -> None:
+    """Close a backend opened by open_checkpointer"""
+    conn = getattr(saver, "conn", None)
+    if conn is not None:
+        await conn.close()
+
+
+async def run_compaction(saver: BaseCheckpointSaver, interval: float = CHECKPOINT_COMPACTION_INTERVAL) -> None:
+    """Background task: periodically apply retention to the checkpointer"""
+    compact = getattr(saver, "compact", None)
+    if compact is None:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await compact()
+            if result["deleted_threads"] or result["deleted_checkpoints"]:
+                logger.info("checkpoint compaction", extra=log_fields(**result))
+        except Exception as e:
+            logger.warning("checkpoint compaction failed", extra=log_fields(error=str(e)))
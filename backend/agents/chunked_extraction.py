@@ -0,0 +1,201 @@
+"""
+Map-reduce extraction for long briefs
+
+Briefs above CHUNKED_EXTRACTION_THRESHOLD characters (agency decks pasted as
+text, long email threads) are split on email and section boundaries, each
+chunk is extracted concurrently, and the partial results are merged
+deterministically per field:
+- list fields are unioned in chunk order
+- long free-text fields are joined
+- other scalars take the most common value (earliest chunk on a tie), and
+  disagreements are recorded in extraction_notes
+"""
+
+import asyncio
+import json
+import os
+import re
+from collections import Counter
+from typing import Any
+
+from .field_commands import LIST_FIELDS
+from .json_stream import parse_json_object
+from .llm_scheduler import llm_scheduler
+from .observability import get_logger, log_fields
+from .prompts import build_extraction_messages, compact_json
+from .structured_output import parse_extraction_output
+
+CHUNKED_EXTRACTION_THRESHOLD = int(os.getenv("CHUNKED_EXTRACTION_THRESHOLD", "12000"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "6000"))
+
+logger = get_logger(__name__)
+
+MERGED_LIST_FIELDS = LIST_FIELDS | {"reference_tracks"}
+JOINED_TEXT_FIELDS = {
+    "creative_direction",
+    "campaign_context",
+    "target_audience",
+    "sync_points",
+    "must_avoid",
+    "exclusivity_details",
+}
+
+# Lines that start a new email in a thread, or a new section in a document
+_BOUNDARY = re.compile(
+    r"^(?:"
+    r"(?i:-{2,}\s*(?:original message|forwarded message)\s*-{2,})"
+    r"|(?i:from:\s)"
+    r"|(?i:on .{5,120} wrote:)$"
+    r"|#{1,6}\s"
+    r"|[A-Z][A-Z0-9 &/\-]{3,60}:?$"
+    r")",
+    re.MULTILINE,
+)
+
+
+def _split_oversized(segment: str, size: int) -> list[str]:
+    """Split a segment larger than ``size`` on paragraphs, then hard"""
+    pieces: list[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", segment):
+        while len(paragraph) > size:
+            pieces.append(paragraph[:size])
+            paragraph = paragraph[size:]
+        if current and len(current) + len(paragraph) + 2 > size:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_brief(text: str, size: int = CHUNK_SIZE) -> list[str]:
+    """Split a long brief into chunks of at most ``size`` characters on natural boundaries"""
+    starts = sorted({0, *(match.start() for match in _BOUNDARY.finditer(text))})
+    segments = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+    chunks: list[str] = []
+    current = ""
+    for segment in segments:
+        if not segment.strip():
+            continue
+        for piece in _split_oversized(segment, size) if len(segment) > size else [segment]:
+            if current and len(current) + len(piece) > size:
+                chunks.append(current)
+                current = piece
+            else:
+                current += piece
+    if current.strip():
+        chunks.append(current)
+    return [chunk.strip() for chunk in chunks]
+
+
+def _normalized(value: Any) -> str:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return compact_json(value)
+
+
+def _union(values: list[list[Any]]) -> list[Any]:
+    seen: set[str] = set()
+    merged = []
+    for items in values:
+        for item in items if isinstance(items, list) else [items]:
+            key = _normalized(item)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+
+def merge_partials(partials: list[dict[str, Any]]) -> dict[str, Any]:
+    """Deterministically merge per-chunk extractions (in chunk order)"""
+    values: dict[str, list[Any]] = {}
+    for partial in partials:
+        for key, value in partial.items():
+            if value is None or value == "" or value == []:
+                continue
+            values.setdefault(key, []).append(value)
+
+    merged: dict[str, Any] = {}
+    notes: list[str] = []
+    summaries: list[str] = []
+    for key, candidates in values.items():
+        if key == "summary":
+            summaries = [str(value) for value in candidates]
+        elif key == "extraction_notes":
+            notes.extend(str(value) for value in candidates)
+        elif key in MERGED_LIST_FIELDS:
+            merged[key] = _union(candidates)
+        elif key in JOINED_TEXT_FIELDS:
+            merged[key] = " ".join(str(value) for value in _union(candidates))
+        else:
+            counts = Counter(_normalized(value) for value in candidates)
+            winner_key, _ = max(counts.items(), key=lambda item: item[1])
+            # max() keeps the first of equal counts; Counter preserves insertion (chunk) order
+            winner = next(value for value in candidates if _normalized(value) == winner_key)
+            merged[key] = winner
+            if len(counts) > 1:
+                others = ", ".join(
+                    json.dumps(value, default=str)
+                    for value in _union([[v] for v in candidates])
+                    if _normalized(value) != winner_key
+                )
+                notes.append(
+                    f"Sections disagree on {key}: used {json.dumps(winner, default=str)}, also saw {others}"
+                )
+
+    if notes:
+        merged["extraction_notes"] = "\n".join(_union([notes]))
+    if summaries:
+        merged["summary"] = summaries[0] if len(summaries) == 1 else (
+            f"Extracted from {len(partials)} sections of a long brief. " + summaries[0]
+        )
+    return merged
+
+
+async def _extract_chunk(llm, chunk: str, index: int, total: int, output_model=None, repair_llm=None) -> dict[str, Any]:
+    from langchain_core.messages import HumanMessage
+
+    messages = build_extraction_messages({}, chunk)
+    messages[-1] = HumanMessage(
+        content=f"This is part {index + 1} of {total} of one long brief. "
+        f"Extract only what this part states.\n\n{messages[-1].content}"
+    )
+    response = await llm_scheduler.ainvoke(llm, messages)
+    if output_model is None:
+        return parse_json_object(response.content)
+    return await parse_extraction_output(response.content, output_model, repair_llm=repair_llm)
+
+
+async def extract_chunked(llm, text: str, output_model=None, repair_llm=None) -> dict[str, Any]:
+    """Extract a long brief chunk-by-chunk in parallel and merge the results.
+
+    With ``output_model`` each chunk's output is validated against it (and
+    broken fragments repaired with ``repair_llm``). Chunks whose output can't
+    be parsed are skipped; raises json.JSONDecodeError only if every chunk fails.
+    """
+    chunks = split_brief(text)
+    logger.debug("chunked extraction", extra=log_fields(chars=len(text), chunks=len(chunks)))
+    results = await asyncio.gather(
+        *(
+            _extract_chunk(llm, chunk, index, len(chunks), output_model, repair_llm)
+            for index, chunk in enumerate(chunks)
+        ),
+        return_exceptions=True,
+    )
+    partials = [result for result in results if isinstance(result, dict)]
+    failures = [result for result in results if isinstance(result, BaseException)]
+    for failure in failures:
+        if not isinstance(failure, (json.JSONDecodeError, KeyError)):
+            raise failure
+    if not partials:
+        raise json.JSONDecodeError("No chunk produced a JSON object", "", 0)
+
+    merged = merge_partials(partials)
+    if failures:
+        skipped = f"{len(failures)} of {len(chunks)} sections could not be parsed and were skipped."
+        merged["extraction_notes"] = f"{merged.get('extraction_notes', '')}\n{skipped}".strip()
+    return merged
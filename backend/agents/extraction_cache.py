@@ -0,0 +1,197 @@
+"""
+Content-addressed cache of extraction results
+
+The same brief is often pasted several times (forwarded emails, page reloads,
+n8n replays). Results are keyed by a hash of the normalized user message, the
+current brief, the conversation context the prompt includes (history summary
+and recent messages), the model name and the prompt version, so an identical
+request returns the earlier extraction without calling the LLM. A short reply
+("yes, that one") only hits when it follows the same conversation.
+
+Two tiers: a bounded in-memory LRU, and an optional SQLite file
+(EXTRACTION_CACHE_DB) that survives restarts. Entries in both tiers expire
+EXTRACTION_CACHE_TTL seconds after they were stored.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Sequence
+
+from .observability import get_logger, log_fields
+
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "512"))
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "")
+EXTRACTION_CACHE_TTL = float(os.getenv("EXTRACTION_CACHE_TTL", str(7 * 24 * 3600)))
+
+logger = get_logger(__name__)
+
+_WHITESPACE = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_message(text: str) -> str:
+    """Normalize a pasted brief so trivially different pastes hash the same"""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_WHITESPACE.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def extraction_cache_key(
+    user_message: str,
+    current_brief: dict[str, Any],
+    model_name: str,
+    prompt_version: str,
+    context: Sequence[str] = (),
+) -> str:
+    """Hash of everything that determines the extraction output.
+
+    ``context`` is the conversation text the prompt carries besides the
+    message itself (history summary, recent-history lines).
+    """
+    material = json.dumps(
+        {
+            "message": normalize_message(user_message),
+            "context": [normalize_message(part) for part in context],
+            "brief": current_brief,
+            "model": model_name,
+            "prompt": prompt_version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """In-memory LRU with an optional SQLite tier"""
+
+    def __init__(
+        self,
+        max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+        db_path: str = EXTRACTION_CACHE_DB,
+        ttl: float = EXTRACTION_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl = ttl
+        # key -> (created_at, value)
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if not self.db_path:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key: str, value: dict[str, Any], created_at: float) -> None:
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        db = self._connect()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT created_at, value FROM extraction_cache WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.ttl),
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _disk_put(self, key: str, value: dict[str, Any], created_at: float) -> None:
+        db = self._connect()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO extraction_cache (key, value, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, default=str), created_at),
+        )
+        db.commit()
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Look up a result in memory, then on disk"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            created_at, value = entry
+            if created_at >= time.time() - self.ttl:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            # The disk copy has the same created_at, so it is expired too
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        if self.db_path:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                logger.warning("extraction cache read failed", extra=log_fields(error=str(e)))
+                entry = None
+            if entry is not None:
+                created_at, value = entry
+                # Keeps the disk entry's age, so it expires from memory at the same time
+                self._remember(key, value, created_at)
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: dict[str, Any]) -> None:
+        """Store a result in both tiers"""
+        created_at = time.time()
+        self._remember(key, value, created_at)
+        self.stores += 1
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._disk_put, key, value, created_at)
+            except sqlite3.Error as e:
+                logger.warning("extraction cache write failed", extra=log_fields(error=str(e)))
+
+    def clear(self) -> None:
+        """Drop the in-memory tier"""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters per tier"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.db_path),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "expired": self.expired,
+        }
+
+
+# Process-wide cache instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,483 @@
+"""
+Deterministic parser for direct field edit commands
+
+Short commands like "change the budget to 40k" or "set territory to Germany
+and Austria" are parsed with rules instead of a full extraction prompt.
+The parser returns the parsed field values plus a confidence score; the
+caller falls back to the LLM when confidence is low or any clause is not
+understood. The bare "make the X Y" form is ordinary chat as often as an
+edit ("make the client happy"), so it only scores high enough to apply when
+Y parses as a typed value (amount, date, yes/no, fixed option). A clause
+starts at a verb or at "and <field> to" ("set the term to 2 years and stems
+to yes"); a free-text value that still names another field or ends in
+"please"/"thanks" was probably not split right and goes to the LLM.
+"""
+
+import os
+import re
+from datetime import date, timedelta
+from typing import Any, TypedDict
+
+# Commands longer than this are treated as brief pastes, not edits
+FIELD_COMMAND_MAX_LENGTH = int(os.getenv("FIELD_COMMAND_MAX_LENGTH", "200"))
+FIELD_COMMAND_MIN_CONFIDENCE = float(os.getenv("FIELD_COMMAND_MIN_CONFIDENCE", "0.8"))
+
+# Phrases users type for each field, longest first when matched
+FIELD_ALIASES: dict[str, list[str]] = {
+    "project_title": ["project title", "project name", "title", "name of the project"],
+    "client_name": ["client name", "client"],
+    "agency_name": ["agency name", "agency"],
+    "brand_name": ["brand name", "brand"],
+    "budget_amount": ["budget amount", "total budget", "budget"],
+    "budget_currency": ["budget currency", "currency"],
+    "territory": ["territories", "territory", "regions", "region", "countries"],
+    "media_types": ["media types", "media type", "media"],
+    "term_length": ["license term", "licence term", "term length", "license length", "licence length", "term"],
+    "exclusivity_details": ["exclusivity details", "exclusivity scope"],
+    "exclusivity": ["exclusivity", "exclusive"],
+    "creative_direction": ["creative direction", "direction", "creative"],
+    "mood_keywords": ["mood keywords", "keywords", "moods", "mood"],
+    "genre_preferences": ["genre preferences", "genres", "genre"],
+    "must_avoid": ["must avoid", "things to avoid", "avoid"],
+    "vocals_preference": ["vocals preference", "vocal preference", "vocals", "vocal"],
+    "video_lengths": ["video lengths", "spot lengths", "cut lengths", "lengths", "cutdowns"],
+    "stems_required": ["stems required", "stems"],
+    "sync_points": ["sync points", "sync point"],
+    "deadline_date": ["deadline date", "submission deadline", "due date", "deadline"],
+    "air_date": ["air date", "airdate", "on-air date", "launch date"],
+    "deadline_urgency": ["deadline urgency", "urgency"],
+    "first_presentation_date": ["first presentation date", "first presentation", "presentation date"],
+    "kickoff_date": ["kickoff date", "kick-off date", "kickoff", "kick-off", "start date"],
+    "brief_sender_name": ["brief sender name", "sender name", "brief sender", "sender", "contact name"],
+    "brief_sender_email": ["brief sender email", "sender email", "contact email", "email"],
+    "brief_sender_role": ["brief sender role", "sender role", "role"],
+    "campaign_context": ["campaign context", "context", "background"],
+    "target_audience": ["target audience", "audience"],
+    "brand_values": ["brand values", "values"],
+    "extraction_notes": ["extraction notes", "notes"],
+    "project_type": ["project type", "type"],
+}
+
+LIST_FIELDS = {
+    "territory",
+    "media_types",
+    "mood_keywords",
+    "genre_preferences",
+    "video_lengths",
+    "brand_values",
+}
+BOOLEAN_FIELDS = {"exclusivity", "stems_required"}
+DATE_FIELDS = {"deadline_date", "air_date", "first_presentation_date", "kickoff_date"}
+ENUM_FIELDS = {
+    "vocals_preference": {"instrumental", "vocals", "either", "specific"},
+    "deadline_urgency": {"standard", "rush", "urgent"},
+}
+# Fields whose values must parse to be accepted; anything else is free text
+TYPED_FIELDS = (
+    BOOLEAN_FIELDS
+    | DATE_FIELDS
+    | set(ENUM_FIELDS)
+    | {"budget_amount", "budget_currency", "project_type", "brief_sender_email"}
+)
+
+# Confidence of each command form; "make the X Y" without "to" only applies to typed fields
+CONFIDENCE_WITH_TO = 0.95
+CONFIDENCE_WITHOUT_TO = 0.85
+CONFIDENCE_WITHOUT_TO_FREE_TEXT = 0.5
+# Free-text value that names another field or ends in a politeness word
+CONFIDENCE_AMBIGUOUS_VALUE = 0.5
+
+POLITENESS_WORDS = ["please", "pls", "plz", "thanks", "thank you", "thx", "cheers", "ta"]
+
+# List items that contain a separator word ("rock and roll", "R&B")
+COMPOUND_LIST_ITEMS = [
+    "rock and roll",
+    "drum and bass",
+    "rhythm and blues",
+    "r and b",
+    "country and western",
+    "song and dance",
+    "call and response",
+    "bosnia and herzegovina",
+    "trinidad and tobago",
+    "antigua and barbuda",
+    "saint kitts and nevis",
+    "st kitts and nevis",
+    "sao tome and principe",
+    "turks and caicos",
+    "heard island and mcdonald islands",
+]
+
+CURRENCY_SYMBOLS = {"€": "EUR", "$": "USD", "£": "GBP"}
+CURRENCY_CODES = {"EUR", "USD", "GBP", "CHF"}
+CURRENCY_WORDS = {
+    "euro": "EUR",
+    "euros": "EUR",
+    "dollar": "USD",
+    "dollars": "USD",
+    "pound": "GBP",
+    "pounds": "GBP",
+    "franc": "CHF",
+    "francs": "CHF",
+}
+
+MONTHS = {
+    "january": 1, "jan": 1,
+    "february": 2, "feb": 2,
+    "march": 3, "mar": 3,
+    "april": 4, "apr": 4,
+    "may": 5,
+    "june": 6, "jun": 6,
+    "july": 7, "jul": 7,
+    "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9,
+    "october": 10, "oct": 10,
+    "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+TRUE_WORDS = {"yes", "true", "y", "required", "needed", "exclusive", "on", "please", "necessary"}
+FALSE_WORDS = {"no", "false", "n", "not required", "not needed", "non-exclusive", "nonexclusive", "off", "none", "unnecessary"}
+
+_ALIAS_PATTERN = "|".join(
+    sorted(
+        {re.escape(alias) for aliases in FIELD_ALIASES.values() for alias in aliases},
+        key=len,
+        reverse=True,
+    )
+)
+_ALIAS_TO_FIELD = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+_VERB = r"(?:set|change|update|make|put|switch|correct)"
+_COMMAND_WITHOUT_TO = re.compile(
+    rf"^(?:please\s+)?make\s+(?:the\s+)?(?P<field>{_ALIAS_PATTERN})\s+(?P<value>.+)$",
+    re.IGNORECASE,
+)
+_ASSIGN = r"(?:to\s+be|to|=|:|as|into)"
+_COMMAND_WITH_TO = re.compile(
+    rf"^(?:please\s+)?(?:can you\s+|could you\s+)?{_VERB}\s+(?:the\s+|our\s+)?(?P<field>{_ALIAS_PATTERN})"
+    rf"(?:\s+field)?\s*{_ASSIGN}\s+(?P<value>.+)$",
+    re.IGNORECASE,
+)
+# "... and stems to yes": a further field set by the same command
+_CONTINUATION = re.compile(
+    rf"^(?:the\s+)?(?P<field>{_ALIAS_PATTERN})(?:\s+field)?\s*(?:to|=|:)\s+(?P<value>.+)$",
+    re.IGNORECASE,
+)
+_CLAUSE_SPLIT = re.compile(
+    rf"\s*(?:;|\n|,?\s+and\s+(?={_VERB}\b)|\.\s+(?={_VERB}\b)"
+    rf"|,?\s+and\s+(?=(?:the\s+)?(?:{_ALIAS_PATTERN})\s*(?:to\b|=|:)))\s*",
+    re.IGNORECASE,
+)
+_MENTIONS_FIELD = re.compile(rf"(?<!\w)(?:{_ALIAS_PATTERN})(?!\w)", re.IGNORECASE)
+_ENDS_POLITELY = re.compile(
+    r"[\s,]+(?:" + "|".join(re.escape(word) for word in POLITENESS_WORDS) + r")\W*$", re.IGNORECASE
+)
+_LIST_SPLIT = re.compile(r"\s*(?:,|;|/|\s&\s|\band\b|\bplus\b)\s*", re.IGNORECASE)
+_COMPOUND_ITEM = re.compile(
+    r"\b(?:"
+    + "|".join(
+        r"\s*(?:and|&|'n'|n)\s*".join(re.escape(word) for word in item.split(" and "))
+        for item in sorted(COMPOUND_LIST_ITEMS, key=len, reverse=True)
+    )
+    + r")\b",
+    re.IGNORECASE,
+)
+_HELD_ITEM = re.compile(r"\x00(\d+)\x00")
+_AMOUNT = re.compile(
+    r"^(?P<prefix>[€$£]|eur|usd|gbp|chf)?\s*(?P<number>\d[\d.,\s']*)\s*(?P<suffix>k|m|mio|thousand|million)?\s*"
+    r"(?P<currency>[€$£]|eur|usd|gbp|chf|euros?|dollars?|pounds?|francs?)?$",
+    re.IGNORECASE,
+)
+
+
+class FieldCommand(TypedDict):
+    """Result of parsing an edit command"""
+    updates: dict[str, Any]
+    confidence: float
+    summary: str
+
+
+def _clean_value(value: str) -> str:
+    value = value.strip().rstrip(".!")
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in {'"', "'", "`"}:
+        value = value[1:-1]
+    return value.strip()
+
+
+def parse_number(raw: str) -> float | None:
+    """Parse '40,000', '40.000', '1.5' or '40 000' into a float"""
+    cleaned = raw.replace(" ", "").replace("'", "")
+    if not cleaned:
+        return None
+    if "," in cleaned and "." in cleaned:
+        # The later separator is the decimal mark
+        if cleaned.rfind(",") > cleaned.rfind("."):
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            cleaned = cleaned.replace(",", "")
+    elif "," in cleaned:
+        head, _, tail = cleaned.rpartition(",")
+        cleaned = cleaned.replace(",", "") if len(tail) == 3 else f"{head.replace(',', '')}.{tail}"
+    elif cleaned.count(".") == 1:
+        head, _, tail = cleaned.partition(".")
+        # "40.000" is a European thousands separator, "1.5" a decimal
+        if len(tail) == 3 and head != "0":
+            cleaned = head + tail
+    elif cleaned.count(".") > 1:
+        cleaned = cleaned.replace(".", "")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def parse_currency(raw: str) -> str | None:
+    """Map a symbol, ISO code or word to EUR/USD/GBP/CHF"""
+    token = raw.strip()
+    if token in CURRENCY_SYMBOLS:
+        return CURRENCY_SYMBOLS[token]
+    if token.upper() in CURRENCY_CODES:
+        return token.upper()
+    return CURRENCY_WORDS.get(token.lower())
+
+
+def parse_amount(raw: str) -> tuple[float, str | None] | None:
+    """Parse '€40k', '40,000 EUR', '1.5m USD' into (amount, currency)"""
+    match = _AMOUNT.match(raw.strip())
+    if not match:
+        return None
+    amount = parse_number(match.group("number"))
+    if amount is None:
+        return None
+    suffix = (match.group("suffix") or "").lower()
+    if suffix in {"k", "thousand"}:
+        amount *= 1_000
+    elif suffix in {"m", "mio", "million"}:
+        amount *= 1_000_000
+    currency_token = match.group("prefix") or match.group("currency")
+    currency = parse_currency(currency_token) if currency_token else None
+    return amount, currency
+
+
+def _next_occurrence(month: int, day: int, today: date) -> date:
+    candidate = date(today.year, month, day)
+    return candidate if candidate >= today else date(today.year + 1, month, day)
+
+
+def parse_date(raw: str, today: date | None = None) -> str | None:
+    """Parse ISO, numeric, written and relative dates into an ISO date string"""
+    today = today or date.today()
+    text = raw.strip().lower().rstrip(".")
+    text = re.sub(r"^(?:on|by|the)\s+", "", text)
+
+    iso = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    if iso:
+        year, month, day = (int(part) for part in iso.groups())
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            return None
+
+    # European day-first numeric dates: 15/03/2026, 15.03.26
+    numeric = re.fullmatch(r"(\d{1,2})[./](\d{1,2})[./](\d{2,4})", text)
+    if numeric:
+        day, month, year = (int(part) for part in numeric.groups())
+        if year < 100:
+            year += 2000
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            return None
+
+    if text == "today":
+        return today.isoformat()
+    if text == "tomorrow":
+        return (today + timedelta(days=1)).isoformat()
+
+    weekday = re.fullmatch(r"(?:(next|this)\s+)?(" + "|".join(WEEKDAYS) + r")", text)
+    if weekday:
+        days_ahead = WEEKDAYS.index(weekday.group(2)) - today.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        if weekday.group(1) == "next":
+            days_ahead += 7
+        return (today + timedelta(days=days_ahead)).isoformat()
+
+    month_names = "|".join(sorted(MONTHS, key=len, reverse=True))
+    # "early/mid/late March [2026]", matching the frontend's natural date rules
+    modifier = re.fullmatch(
+        rf"(early|mid|late|end of|beginning of|start of)[\s-]+({month_names})(?:\s+(\d{{4}}))?", text
+    )
+    if modifier:
+        day = {"early": 5, "beginning of": 5, "start of": 5, "mid": 15}.get(modifier.group(1), 25)
+        month = MONTHS[modifier.group(2)]
+        if modifier.group(3):
+            return date(int(modifier.group(3)), month, day).isoformat()
+        return _next_occurrence(month, day, today).isoformat()
+
+    # "15 March 2026", "15th of March", "March 15, 2026", "March 15th"
+    day_first = re.fullmatch(
+        rf"(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({month_names})\.?,?(?:\s+(\d{{4}}))?", text
+    )
+    month_first = re.fullmatch(
+        rf"({month_names})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?,?(?:\s+(\d{{4}}))?", text
+    )
+    if day_first or month_first:
+        if day_first:
+            day, month, year = int(day_first.group(1)), MONTHS[day_first.group(2)], day_first.group(3)
+        else:
+            month, day, year = MONTHS[month_first.group(1)], int(month_first.group(2)), month_first.group(3)
+        try:
+            if year:
+                return date(int(year), month, day).isoformat()
+            return _next_occurrence(month, day, today).isoformat()
+        except ValueError:
+            return None
+
+    return None
+
+
+def parse_boolean(raw: str) -> bool | None:
+    """Parse yes/no style answers"""
+    text = raw.strip().lower()
+    if text in TRUE_WORDS:
+        return True
+    if text in FALSE_WORDS:
+        return False
+    return None
+
+
+def parse_list(raw: str) -> list[str]:
+    """Split 'Germany, Austria and Switzerland' into items, keeping 'rock and roll' whole"""
+    held: list[str] = []
+
+    def hold(match: re.Match) -> str:
+        held.append(match.group(0))
+        return f"\x00{len(held) - 1}\x00"
+
+    items = []
+    for item in _LIST_SPLIT.split(_COMPOUND_ITEM.sub(hold, raw)):
+        item = _HELD_ITEM.sub(lambda match: held[int(match.group(1))], item).strip()
+        if item:
+            items.append(item)
+    return items
+
+
+def _normalize_length(item: str) -> str:
+    match = re.fullmatch(r"(\d+)\s*(?:s|sec|secs|second|seconds|\")", item.strip(), re.IGNORECASE)
+    return f"{match.group(1)}s" if match else item.strip()
+
+
+def parse_field_value(field: str, raw: str, today: date | None = None) -> dict[str, Any] | None:
+    """Parse a raw value for a field; returns the fields to update or None"""
+    value = _clean_value(raw)
+    if not value:
+        return None
+
+    if field == "budget_amount":
+        parsed = parse_amount(value)
+        if parsed is None:
+            return None
+        amount, currency = parsed
+        updates: dict[str, Any] = {"budget_amount": amount}
+        if currency:
+            updates["budget_currency"] = currency
+        return updates
+
+    if field == "budget_currency":
+        currency = parse_currency(value)
+        return {field: currency} if currency else None
+
+    if field in LIST_FIELDS:
+        items = parse_list(value)
+        if field == "video_lengths":
+            items = [_normalize_length(item) for item in items]
+        return {field: items} if items else None
+
+    if field in BOOLEAN_FIELDS:
+        flag = parse_boolean(value)
+        return {field: flag} if flag is not None else None
+
+    if field in DATE_FIELDS:
+        parsed_date = parse_date(value, today)
+        return {field: parsed_date} if parsed_date else None
+
+    if field in ENUM_FIELDS:
+        option = value.lower()
+        if option == "instrumental only":
+            option = "instrumental"
+        return {field: option} if option in ENUM_FIELDS[field] else None
+
+    if field == "project_type":
+        label = value.upper().removeprefix("TYPE ").strip()
+        if label in {"A", "B", "C", "D", "E"}:
+            return {field: label}
+        return {field: "Production"} if label in {"PRODUCTION", "PROD"} else None
+
+    if field == "brief_sender_email":
+        return {field: value} if re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", value) else None
+
+    return {field: value}
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, float) and value.is_integer():
+        return f"{value:,.0f}"
+    return str(value)
+
+
+def parse_field_command(message: str, today: date | None = None) -> FieldCommand | None:
+    """Parse a direct edit command, or return None if it isn't one"""
+    text = (message or "").strip()
+    if not text or len(text) > FIELD_COMMAND_MAX_LENGTH or "?" in text:
+        return None
+
+    updates: dict[str, Any] = {}
+    confidence = 1.0
+    for clause in _CLAUSE_SPLIT.split(text):
+        if not clause:
+            continue
+        match = _COMMAND_WITH_TO.match(clause)
+        if not match and updates:
+            match = _CONTINUATION.match(clause)
+        with_to = match is not None
+        if not match:
+            match = _COMMAND_WITHOUT_TO.match(clause)
+        if not match:
+            # Any clause we don't understand sends the whole message to the LLM
+            return None
+
+        field = _ALIAS_TO_FIELD[match.group("field").lower()]
+        if with_to:
+            clause_confidence = CONFIDENCE_WITH_TO
+        elif field in TYPED_FIELDS:
+            clause_confidence = CONFIDENCE_WITHOUT_TO
+        else:
+            # "make the client happy", "make the brand pop more": chat, not an edit
+            clause_confidence = CONFIDENCE_WITHOUT_TO_FREE_TEXT
+        parsed = parse_field_value(field, match.group("value"), today)
+        if parsed is None:
+            return None
+        # Free-text values that look like further instructions are ambiguous
+        raw_value = match.group("value")
+        if field not in LIST_FIELDS and len(raw_value.split()) > 20:
+            clause_confidence -= 0.3
+        if field not in TYPED_FIELDS and (_MENTIONS_FIELD.search(raw_value) or _ENDS_POLITELY.search(raw_value)):
+            # "2 years and stems to yes", "Nike, please": the value swallowed more than the value
+            clause_confidence = min(clause_confidence, CONFIDENCE_AMBIGUOUS_VALUE)
+        updates.update(parsed)
+        confidence = min(confidence, clause_confidence)
+
+    if not updates:
+        return None
+
+    summary = "Updated " + "; ".join(
+        f"{field.replace('_', ' ')} to {_format_value(value)}" for field, value in updates.items()
+    ) + "."
+    return {"updates": updates, "confidence": confidence, "summary": summary}
@@ -0,0 +1,36 @@
+"""
+State schema of the brief analyzer graph
+
+Kept apart from agents.brief_analyzer because the schema subclasses
+CopilotKitState: importing it loads copilotkit and langgraph, which only the
+graph build (create_brief_analyzer_graph) needs.
+"""
+
+from typing import Any
+
+from copilotkit import CopilotKitState
+
+from .brief_analyzer import ExtractedBrief, SuggestionChip
+
+
+class InputState(CopilotKitState):
+    """Input state - what we receive from the frontend"""
+    pass  # CopilotKitState includes messages
+
+
+class OutputState(CopilotKitState):
+    """Output state - what we send back to the frontend for state sync"""
+    extracted_brief: ExtractedBrief
+    completeness: int
+    project_type: str | None
+    suggestion_chips: list[SuggestionChip]
+    field_updates: list[str]
+    brief_patch: list[dict[str, Any]]  # JSON patch of extracted_brief for delta state sync
+    current_project_id: str | None
+
+
+class BriefAnalyzerState(InputState, OutputState):
+    """Full state for the brief analyzer agent (combines input + output)"""
+    current_project_id: str | None  # Track the project being worked on
+    history_summary: str  # Rolling summary of messages folded out of state
+    history_folded: list[str]  # Short ids of folded messages, dropped again if re-sent
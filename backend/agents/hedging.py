@@ -0,0 +1,242 @@
+"""
+Hedged, deadline-bounded LLM calls
+
+Provider latency has a long tail: most calls answer in a second or two, a few
+take 20-30 s. Two mechanisms keep that tail out of the user's turn:
+
+- Hedging: if the primary request hasn't produced its first token (or, for
+  non-streaming calls, its response) by the observed LLM_HEDGE_PERCENTILE of
+  recent latencies, a duplicate request is sent (to LLM_HEDGE_FALLBACK_MODEL
+  if set, otherwise the same model). Whichever answers first wins and the
+  other is cancelled. Hedges go through the scheduler like any other call,
+  and are skipped while the scheduler is saturated or throttled (callers
+  queued, paused after a 429, or out of RPM/TPM budget), where a duplicate
+  would only spend the shared budget twice. A hedge runs with an empty
+  callback list, so only the primary request streams to the frontend.
+- Deadlines: each turn gets an LLM_TURN_DEADLINE budget; callers wrap their
+  LLM work in ``asyncio.timeout(remaining_budget())`` and return a partial
+  response when it expires.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from .llm_scheduler import estimate_tokens, llm_scheduler
+from .observability import get_logger, log_fields
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "true").lower() in {"1", "true", "yes"}
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4.0"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10.0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_FALLBACK_MODEL = os.getenv("LLM_HEDGE_FALLBACK_MODEL", "")
+# Seconds of LLM work allowed per turn (0 = no deadline)
+LLM_TURN_DEADLINE = float(os.getenv("LLM_TURN_DEADLINE", "25"))
+
+LATENCY_WINDOW = 200
+
+# LangChain inherits the run's callbacks from context when a call gets no
+# ``config``; an explicit empty list keeps the hedge out of the AG-UI stream
+HEDGE_CONFIG = {"callbacks": []}
+
+logger = get_logger(__name__)
+
+# Monotonic time at which the current turn's LLM budget runs out
+turn_deadline: ContextVar[float | None] = ContextVar("turn_deadline", default=None)
+
+
+@contextmanager
+def turn_budget(seconds: float = LLM_TURN_DEADLINE) -> Iterator[None]:
+    """Start the LLM budget for a turn (no deadline when ``seconds`` <= 0)"""
+    token = turn_deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+    try:
+        yield
+    finally:
+        turn_deadline.reset(token)
+
+
+def remaining_budget() -> float | None:
+    """Seconds left in the current turn's budget, or None without a deadline"""
+    deadline = turn_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def _model_key(llm, mode: str) -> str:
+    # Tool-bound clients are RunnableBindings around the chat model
+    model = getattr(llm, "model_name", None) or getattr(getattr(llm, "bound", None), "model_name", None)
+    return f"{model or type(llm).__name__}:{mode}"
+
+
+async def _cancel(task: asyncio.Future) -> None:
+    if not task.done():
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+class LLMHedger:
+    """Hedges slow LLM calls and tracks the latency distribution per model"""
+
+    def __init__(self, enabled: bool = LLM_HEDGING, percentile: float = LLM_HEDGE_PERCENTILE):
+        self.enabled = enabled
+        self.percentile = percentile
+        self._latencies: dict[str, deque[float]] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped_saturated = 0
+        self.skipped_throttled = 0
+        self.deadlines_exceeded = 0
+
+    def observe(self, key: str, seconds: float) -> None:
+        self._latencies.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def hedge_delay(self, key: str) -> float:
+        """Seconds to wait before hedging: the percentile of recent latencies, clamped"""
+        samples = self._latencies.get(key)
+        if not samples or len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return min(LLM_HEDGE_MAX_DELAY, max(LLM_HEDGE_MIN_DELAY, value))
+
+    def _may_hedge(self, messages: Sequence[Any]) -> bool:
+        # Duplicates would only queue behind the calls that are already slow
+        if llm_scheduler.active >= llm_scheduler.max_concurrency:
+            self.skipped_saturated += 1
+            return False
+        # ...or wait on the rate-limit budget they would then use up twice as fast
+        if llm_scheduler.throttled(estimate_tokens(messages)):
+            self.skipped_throttled += 1
+            return False
+        return True
+
+    def record_deadline(self) -> None:
+        self.deadlines_exceeded += 1
+
+    async def ainvoke(self, llm, messages: Sequence[Any], hedge_llm=None, **kwargs):
+        """Scheduled ``llm.ainvoke`` with a hedge after the latency percentile"""
+        self.calls += 1
+        key = _model_key(llm, "invoke")
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(llm_scheduler.ainvoke(llm, messages, **kwargs))
+        tasks = [primary]
+        try:
+            if self.enabled:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(key))
+                if not done and self._may_hedge(messages):
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(
+                        llm_scheduler.ainvoke(hedge_llm or llm, messages, **{**kwargs, "config": HEDGE_CONFIG})
+                    ))
+            winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                await _cancel(task)
+
+        if winner is not primary:
+            self.hedge_wins += 1
+        self.observe(key, time.perf_counter() - started)
+        return winner.result()
+
+    async def _first_success(self, tasks: list[asyncio.Future]) -> asyncio.Future:
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # On a tie the primary (tasks[0]) wins
+            for task in sorted(done, key=lambda task: task is not tasks[0]):
+                if task.exception() is None:
+                    return task
+                error = task.exception()
+                logger.info("hedged llm call failed", extra=log_fields(error=str(error)))
+        raise error
+
+    async def astream(self, llm, messages: Sequence[Any], hedge_llm=None, **kwargs) -> AsyncIterator[Any]:
+        """Scheduled ``llm.astream`` that races a hedge for the first chunk.
+
+        Only the winner's chunks are yielded; the caller forwards them (as
+        state updates) to the frontend. The hedge runs with HEDGE_CONFIG (no
+        callbacks), so its tokens never reach the run's event stream; the
+        primary wins ties, and a primary that lost sent none.
+        """
+        self.calls += 1
+        key = _model_key(llm, "stream")
+        started = time.perf_counter()
+        streams: dict[asyncio.Future, AsyncIterator[Any]] = {}
+
+        def start(target, call_kwargs: dict[str, Any]) -> asyncio.Future:
+            iterator = llm_scheduler.astream(target, messages, **call_kwargs).__aiter__()
+            task = asyncio.ensure_future(iterator.__anext__())
+            streams[task] = iterator
+            return task
+
+        primary = start(llm, kwargs)
+        winner: asyncio.Future | None = None
+        try:
+            if self.enabled:
+                done, _ = await asyncio.wait([primary], timeout=self.hedge_delay(key))
+                if not done and self._may_hedge(messages):
+                    self.hedged += 1
+                    start(hedge_llm or llm, {**kwargs, "config": HEDGE_CONFIG})
+            pending = set(streams)
+            error: BaseException | None = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda task: task is not primary):
+                    exception = task.exception()
+                    # An empty stream still counts as an answer
+                    if exception is None or isinstance(exception, StopAsyncIteration):
+                        winner = task
+                        break
+                    error = exception
+            if winner is None:
+                raise error
+        finally:
+            for task, iterator in streams.items():
+                if task is not winner:
+                    await _cancel(task)
+                    await iterator.aclose()
+
+        if winner is not primary:
+            self.hedge_wins += 1
+        self.observe(key, time.perf_counter() - started)
+
+        iterator = streams[winner]
+        if isinstance(winner.exception(), StopAsyncIteration):
+            return
+        try:
+            yield winner.result()
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            await iterator.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        """Hedge rate, wins and current hedge delays"""
+        result: dict[str, Any] = {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "skipped_saturated": self.skipped_saturated,
+            "skipped_throttled": self.skipped_throttled,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "turn_deadline_s": LLM_TURN_DEADLINE,
+        }
+        result["hedge_delay_ms"] = {
+            key: round(self.hedge_delay(key) * 1000, 1) for key in self._latencies
+        }
+        return result
+
+
+# Process-wide hedger instance
+llm_hedger = LLMHedger()
@@ -0,0 +1,145 @@
+"""
+Rolling compaction of thread history
+
+extract_node only reads the last message (plus a couple of clipped prior
+ones) and keeps its real context in extracted_brief, yet the messages
+channel grows every turn and is serialized into every checkpoint. The
+compact_history stage runs before extraction: once the live history is over
+HISTORY_MAX_TOKENS or HISTORY_MAX_BYTES, everything but the last
+HISTORY_KEEP_MESSAGES is removed from state and folded into a short
+extractive summary (history_summary, capped at HISTORY_SUMMARY_MAX_CHARS).
+
+The frontend re-sends its full message list on every run, so the (short)
+ids of folded messages are remembered, bounded, and anything re-sent under
+one of them is dropped again without being re-summarized.
+"""
+
+import hashlib
+import os
+from collections import deque
+from typing import Any, Sequence
+
+from langchain_core.messages import RemoveMessage
+
+from .observability import HISTORY_FOLDED, get_logger, log_fields
+from .prompts import message_text
+
+HISTORY_COMPACTION = os.getenv("HISTORY_COMPACTION", "true").lower() in {"1", "true", "yes"}
+HISTORY_KEEP_MESSAGES = int(os.getenv("HISTORY_KEEP_MESSAGES", "6"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "3000"))
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(64 * 1024)))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "1500"))
+# Folded message ids remembered per thread
+HISTORY_FOLDED_IDS_MAX = int(os.getenv("HISTORY_FOLDED_IDS_MAX", "1000"))
+
+# Longer user messages are brief pastes; their content lives in extracted_brief
+SUMMARY_LINE_MAX_CHARS = 160
+BRIEF_PASTE_CHARS = 600
+
+logger = get_logger(__name__)
+
+
+def short_id(message_id: str) -> str:
+    return hashlib.blake2b(message_id.encode("utf-8"), digest_size=5).hexdigest()
+
+
+def history_size(messages: Sequence[Any]) -> tuple[int, int]:
+    """(estimated tokens, UTF-8 bytes) of the message contents"""
+    size = sum(len(message_text(message)[1].encode("utf-8")) for message in messages)
+    return size // 4, size
+
+
+def summary_line(message: Any) -> str:
+    role, text = message_text(message)
+    text = " ".join(text.split())
+    if role == "user" and len(text) > BRIEF_PASTE_CHARS:
+        return f"user: pasted a brief ({len(text)} chars; extracted into the brief)"
+    if len(text) > SUMMARY_LINE_MAX_CHARS:
+        text = text[:SUMMARY_LINE_MAX_CHARS] + "…"
+    return f"{role}: {text}"
+
+
+def fold_summary(summary: str, messages: Sequence[Any], max_chars: int = HISTORY_SUMMARY_MAX_CHARS) -> str:
+    """Append folded messages to the summary, dropping its oldest lines past ``max_chars``"""
+    lines = [line for line in summary.split("\n") if line and not line.startswith("(")]
+    lines += [summary_line(message) for message in messages if message_text(message)[1].strip()]
+    dropped = 0
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+        dropped += 1
+    omitted = _omitted(summary) + dropped
+    header = [f"({omitted} older messages omitted)"] if omitted else []
+    return "\n".join(header + lines)
+
+
+def _omitted(summary: str) -> int:
+    first = summary.split("\n", 1)[0]
+    if first.startswith("(") and " older messages omitted)" in first:
+        try:
+            return int(first[1:].split(" ", 1)[0])
+        except ValueError:
+            return 0
+    return 0
+
+
+class HistoryStats:
+    """Compaction counters"""
+
+    def __init__(self):
+        self.compactions = 0
+        self.messages_folded = 0
+        self.resent_dropped = 0
+        self.bytes_folded = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": HISTORY_COMPACTION,
+            "keep_messages": HISTORY_KEEP_MESSAGES,
+            "compactions": self.compactions,
+            "messages_folded": self.messages_folded,
+            "resent_dropped": self.resent_dropped,
+            "bytes_folded": self.bytes_folded,
+        }
+
+
+# Process-wide compaction counters
+history_stats = HistoryStats()
+
+
+def compact_history(state: dict[str, Any]) -> dict[str, Any]:
+    """Graph stage: fold old messages into history_summary once over the thresholds"""
+    messages = list(state.get("messages") or [])
+    if not HISTORY_COMPACTION or len(messages) <= 1:
+        return {}
+
+    folded_ids = deque(state.get("history_folded") or [], maxlen=HISTORY_FOLDED_IDS_MAX)
+    known = set(folded_ids)
+    # The newest message is the turn being answered and always stays
+    resent = [m for m in messages[:-1] if getattr(m, "id", None) and short_id(m.id) in known]
+    resent_ids = {m.id for m in resent}
+    live = [m for m in messages if getattr(m, "id", None) not in resent_ids or m is messages[-1]]
+
+    to_fold: list[Any] = []
+    tokens, size = history_size(live)
+    if (tokens > HISTORY_MAX_TOKENS or size > HISTORY_MAX_BYTES) and len(live) > HISTORY_KEEP_MESSAGES + 1:
+        # Messages without ids (not yet checkpointed) can't be removed
+        to_fold = [m for m in live[:-(HISTORY_KEEP_MESSAGES + 1)] if getattr(m, "id", None)]
+
+    if not resent and not to_fold:
+        return {}
+
+    update: dict[str, Any] = {"messages": [RemoveMessage(id=m.id) for m in resent + to_fold]}
+    history_stats.resent_dropped += len(resent)
+    if to_fold:
+        folded_bytes = history_size(to_fold)[1]
+        update["history_summary"] = fold_summary(state.get("history_summary") or "", to_fold)
+        folded_ids.extend(short_id(m.id) for m in to_fold)
+        update["history_folded"] = list(folded_ids)
+        history_stats.compactions += 1
+        history_stats.messages_folded += len(to_fold)
+        history_stats.bytes_folded += folded_bytes
+        HISTORY_FOLDED.inc(len(to_fold))
+        logger.debug("history compacted", extra=log_fields(
+            folded=len(to_fold), resent=len(resent), kept=len(live) - len(to_fold), folded_bytes=folded_bytes,
+        ))
+    return update
@@ -0,0 +1,72 @@
+"""
+Shared HTTP client for calls to the Next.js frontend API
+
+A single httpx.AsyncClient is owned by the FastAPI app lifespan so that
+keep-alive connections are pooled across chat turns instead of opening a
+new connection (and blocking the event loop) on every project lookup.
+"""
+
+import os
+
+import httpx
+
+# Frontend API base URL (Next.js app)
+FRONTEND_API_URL = os.getenv("FRONTEND_API_URL", "http://localhost:3000")
+
+# Pool configuration
+FRONTEND_HTTP_TIMEOUT = float(os.getenv("FRONTEND_HTTP_TIMEOUT", "10"))
+FRONTEND_HTTP_MAX_CONNECTIONS = int(os.getenv("FRONTEND_HTTP_MAX_CONNECTIONS", "100"))
+FRONTEND_HTTP_MAX_KEEPALIVE = int(os.getenv("FRONTEND_HTTP_MAX_KEEPALIVE", "20"))
+FRONTEND_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("FRONTEND_HTTP_KEEPALIVE_EXPIRY", "30"))
+FRONTEND_HTTP2 = os.getenv("FRONTEND_HTTP2", "true").lower() in {"1", "true", "yes"}
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the pooled async client for the frontend API"""
+    limits = httpx.Limits(
+        max_connections=FRONTEND_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=FRONTEND_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=FRONTEND_HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = FRONTEND_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            # httpx raises at construction time without the h2 extra
+            http2 = False
+    return httpx.AsyncClient(
+        base_url=FRONTEND_API_URL,
+        timeout=FRONTEND_HTTP_TIMEOUT,
+        limits=limits,
+        http2=http2,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside the app lifespan"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def install_http_client(client: httpx.AsyncClient) -> None:
+    """Replace the shared client (e.g. with a stub transport for benchmarks)"""
+    global _client
+    _client = client
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """Open the shared client (called from the FastAPI lifespan)"""
+    return get_http_client()
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,284 @@
+"""
+Intent routing and model tiering
+
+Each turn is classified as a brief paste, a field edit, a question or
+chit-chat from a single pass of an Aho-Corasick keyword automaton plus a few
+cheap features (length, line count, leading word, question mark). Each
+intent maps to a model tier, so a small fast model handles Q&A and
+acknowledgements while the large model is kept for real extraction.
+
+Tiers are configured with MODEL_TIER_SMALL / MODEL_TIER_LARGE and the
+intent -> tier mapping with INTENT_TIER_<INTENT> (e.g. INTENT_TIER_QUESTION=large).
+"""
+
+import os
+import re
+from collections import deque
+from typing import Any, Iterator, NamedTuple, TypedDict
+
+from .field_commands import FIELD_ALIASES
+from .llm_registry import current_model_name
+from .observability import INTENT_ROUTES, TIER_LATENCY
+
+INTENT_BRIEF_PASTE = "brief_paste"
+INTENT_FIELD_EDIT = "field_edit"
+INTENT_QUESTION = "question"
+INTENT_CHITCHAT = "chitchat"
+INTENTS = (INTENT_BRIEF_PASTE, INTENT_FIELD_EDIT, INTENT_QUESTION, INTENT_CHITCHAT)
+
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+
+DEFAULT_SMALL_MODEL = "llama-3.1-8b-instant"
+DEFAULT_INTENT_TIERS = {
+    INTENT_BRIEF_PASTE: TIER_LARGE,
+    INTENT_FIELD_EDIT: TIER_LARGE,
+    INTENT_QUESTION: TIER_SMALL,
+    INTENT_CHITCHAT: TIER_SMALL,
+}
+
+# Messages at least this long with brief structure (several lines or headers) are pastes
+BRIEF_PASTE_MIN_LENGTH = int(os.getenv("BRIEF_PASTE_MIN_LENGTH", "200"))
+CHITCHAT_MAX_LENGTH = int(os.getenv("CHITCHAT_MAX_LENGTH", "60"))
+
+# Keyword categories
+QUESTION_WORD = "question_word"
+OPEN_ENDED = "open_ended"
+EDIT_VERB = "edit_verb"
+BRIEF_MARKER = "brief_marker"
+HEADER = "header"
+CHITCHAT = "chitchat"
+FIELD = "field"
+
+KEYWORDS: dict[str, list[str]] = {
+    QUESTION_WORD: [
+        "what", "what's", "whats", "who", "who's", "when", "when's", "where", "which", "how",
+        "is there", "are there", "is it", "are they", "do we", "do they", "does it", "did",
+        "can you tell", "tell me", "show me", "remind me", "give me",
+    ],
+    OPEN_ENDED: [
+        "summarize", "summarise", "summary", "overview", "explain", "why", "suggest",
+        "recommend", "describe", "compare", "ideas",
+    ],
+    EDIT_VERB: [
+        "set", "change", "update", "make", "put", "switch", "correct", "replace", "add",
+        "remove", "use", "rename",
+    ],
+    HEADER: ["from:", "subject:", "to:", "cc:", "sent:", "date:"],
+    BRIEF_MARKER: [
+        "hi team", "dear", "best regards", "kind regards", "many thanks", "cheers,",
+        "deliverables", "usage:", "budget:", "client:", "agency:", "brand:", "campaign:",
+        "territory:", "territories:", "media:", "deadline:", "timeline:", "creative direction",
+        "reference tracks", "we need", "we are looking", "we're looking", "looking for",
+    ],
+    CHITCHAT: [
+        "hi", "hello", "hey", "thanks", "thank you", "thx", "cheers", "ok", "okay", "great",
+        "perfect", "cool", "nice", "awesome", "good morning", "good afternoon", "bye",
+        "got it", "sounds good", "all good", "yes", "no", "yep", "nope", "sure", "lol",
+    ],
+    FIELD: sorted({alias for aliases in FIELD_ALIASES.values() for alias in aliases}),
+}
+
+_POLITE_PREFIX = {"please", "can", "could", "would", "you", "pls", "kindly", "just", "also", "and", "now"}
+
+
+class KeywordMatch(NamedTuple):
+    keyword: str
+    category: str
+    start: int
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: every keyword occurrence in one pass over the text"""
+
+    def __init__(self, keywords: dict[str, list[str]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[str, str]]] = [[]]
+        for category, words in keywords.items():
+            for word in words:
+                self._add(word.lower(), category)
+        self._build()
+
+    def _add(self, word: str, category: str) -> None:
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((word, category))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def scan(self, text: str) -> Iterator[KeywordMatch]:
+        """Whole-word matches of every keyword in ``text`` (lowercased by the caller)"""
+        state = 0
+        length = len(text)
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for word, category in self._out[state]:
+                start = index - len(word) + 1
+                if start > 0 and text[start - 1].isalnum() and word[0].isalnum():
+                    continue
+                if index + 1 < length and text[index + 1].isalnum() and word[-1].isalnum():
+                    continue
+                yield KeywordMatch(word, category, start)
+
+
+_automaton = KeywordAutomaton(KEYWORDS)
+_WORD = re.compile(r"[a-z0-9'’]+")
+
+
+class IntentDecision(TypedDict):
+    """Routing decision for one turn"""
+    intent: str
+    tier: str
+    confidence: float
+    features: dict[str, Any]
+
+
+def intent_tier(intent: str) -> str:
+    """Model tier configured for an intent"""
+    tier = os.getenv(f"INTENT_TIER_{intent.upper()}", DEFAULT_INTENT_TIERS[intent]).lower()
+    return tier if tier in {TIER_SMALL, TIER_LARGE} else DEFAULT_INTENT_TIERS[intent]
+
+
+def tier_model(tier: str) -> str:
+    """Model name for a tier; an empty small tier falls back to the large model"""
+    large = os.getenv("MODEL_TIER_LARGE") or current_model_name()
+    if tier == TIER_SMALL:
+        return os.getenv("MODEL_TIER_SMALL", DEFAULT_SMALL_MODEL) or large
+    return large
+
+
+def tier_models() -> list[str]:
+    """Distinct models across all tiers (for preloading clients)"""
+    return list(dict.fromkeys(tier_model(tier) for tier in (TIER_LARGE, TIER_SMALL)))
+
+
+def extract_features(message: str) -> dict[str, Any]:
+    """Keyword hits and shape features for a message"""
+    text = (message or "").strip()
+    lowered = text.lower()
+    words = _WORD.findall(lowered)
+
+    # The leading word after politeness ("please", "can you") carries the intent
+    lead_start = 0
+    for word in words:
+        if word not in _POLITE_PREFIX:
+            lead_start = lowered.find(word)
+            break
+
+    counts = {category: 0 for category in KEYWORDS}
+    leading: str | None = None
+    line_start_headers = 0
+    chitchat_chars = 0
+    for match in _automaton.scan(lowered):
+        counts[match.category] += 1
+        if match.start == lead_start and match.category in {QUESTION_WORD, EDIT_VERB, CHITCHAT}:
+            # Longest keyword at the lead position wins ("tell me" over "tell")
+            leading = match.category
+        if match.category == HEADER and (match.start == 0 or lowered[match.start - 1] == "\n"):
+            line_start_headers += 1
+        if match.category == CHITCHAT:
+            chitchat_chars += len(match.keyword)
+
+    return {
+        "length": len(text),
+        "lines": text.count("\n") + 1 if text else 0,
+        "words": len(words),
+        "question_mark": "?" in text[-40:],
+        "digits": any(char.isdigit() for char in text),
+        "leading": leading,
+        "headers": line_start_headers,
+        "chitchat_coverage": round(chitchat_chars / max(1, sum(len(w) for w in words)), 2),
+        **{f"{category}_hits": count for category, count in counts.items()},
+    }
+
+
+def classify_intent(features: dict[str, Any]) -> tuple[str, float]:
+    """Intent and a rough confidence from message features"""
+    length = features["length"]
+    markers = features[f"{BRIEF_MARKER}_hits"]
+    fields = features[f"{FIELD}_hits"]
+
+    if features["headers"] >= 1 or markers >= 2 or length >= 3 * BRIEF_PASTE_MIN_LENGTH:
+        return INTENT_BRIEF_PASTE, 0.95
+    if length >= BRIEF_PASTE_MIN_LENGTH and (features["lines"] >= 3 or markers >= 1 or fields >= 3):
+        return INTENT_BRIEF_PASTE, 0.85
+
+    asks = features["question_mark"] or features["leading"] == QUESTION_WORD or features[f"{OPEN_ENDED}_hits"] > 0
+    if features["leading"] == EDIT_VERB and fields and not features["question_mark"]:
+        return INTENT_FIELD_EDIT, 0.9
+    if asks:
+        return INTENT_QUESTION, 0.9 if features["question_mark"] else 0.75
+
+    if (
+        length <= CHITCHAT_MAX_LENGTH
+        and not fields
+        and not features["digits"]
+        and (features["leading"] == CHITCHAT or features["chitchat_coverage"] >= 0.5)
+    ):
+        return INTENT_CHITCHAT, 0.85
+
+    if length >= BRIEF_PASTE_MIN_LENGTH:
+        return INTENT_BRIEF_PASTE, 0.6
+    # Short statements ("budget is 40k", "they want something upbeat") update the brief
+    return INTENT_FIELD_EDIT, 0.8 if fields else 0.6
+
+
+def route_intent(message: str) -> IntentDecision:
+    """Classify a message and pick its model tier"""
+    features = extract_features(message)
+    intent, confidence = classify_intent(features)
+    tier = intent_tier(intent)
+    routing_stats.record_route(intent, tier)
+    return {"intent": intent, "tier": tier, "confidence": confidence, "features": features}
+
+
+class RoutingStats:
+    """Routing decisions per intent and LLM latency per tier"""
+
+    def __init__(self):
+        self.intents = {intent: 0 for intent in INTENTS}
+        self.tier_calls = {TIER_SMALL: 0, TIER_LARGE: 0}
+        self.tier_seconds = {TIER_SMALL: 0.0, TIER_LARGE: 0.0}
+
+    def record_route(self, intent: str, tier: str) -> None:
+        self.intents[intent] = self.intents.get(intent, 0) + 1
+        INTENT_ROUTES.labels(intent=intent, tier=tier).inc()
+
+    def record_latency(self, tier: str, seconds: float) -> None:
+        self.tier_calls[tier] = self.tier_calls.get(tier, 0) + 1
+        self.tier_seconds[tier] = self.tier_seconds.get(tier, 0.0) + seconds
+        TIER_LATENCY.labels(tier=tier).observe(seconds)
+
+    def stats(self) -> dict[str, Any]:
+        """Flat counters: intent_<name>, tier_<name>_calls, tier_<name>_mean_ms"""
+        result: dict[str, Any] = {f"intent_{intent}": count for intent, count in self.intents.items()}
+        for tier, calls in self.tier_calls.items():
+            result[f"tier_{tier}_calls"] = calls
+            result[f"tier_{tier}_mean_ms"] = round(self.tier_seconds[tier] / calls * 1000, 1) if calls else 0.0
+            result[f"tier_{tier}_model"] = tier_model(tier)
+        return result
+
+
+# Process-wide routing counters
+routing_stats = RoutingStats()
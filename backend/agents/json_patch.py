@@ -0,0 +1,129 @@
+"""
+Minimal RFC 6902 JSON Patch support for state sync and checkpoint deltas
+
+Only what the brief analyzer needs: diffs of nested dicts, append-only
+lists (chat history grows at the end) and whole-value replacement for
+anything else, plus an applier for the same operations.
+"""
+
+import copy
+import json
+from typing import Any, Iterable
+
+
+class JSONPatchError(ValueError):
+    """Raised when a patch doesn't apply to the document"""
+
+
+def escape_pointer(token: Any) -> str:
+    """Escape one JSON Pointer reference token (RFC 6901)"""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape_pointer(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(old: Any, new: Any, path: str = "") -> list[dict[str, Any]]:
+    """Operations that turn ``old`` into ``new``"""
+    if old is new or (type(old) is type(new) and old == new):
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: list[dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{escape_pointer(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{escape_pointer(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list) and len(new) > len(old) and new[:len(old)] == old:
+        return [{"op": "add", "path": f"{path}/-", "value": item} for item in new[len(old):]]
+
+    if not path:
+        raise JSONPatchError("Cannot replace the document root")
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def patch_from_field_updates(
+    previous: dict[str, Any],
+    current: dict[str, Any],
+    field_updates: Iterable[str],
+    root: str = "",
+) -> list[dict[str, Any]]:
+    """Add/replace operations for the fields a turn reported as updated"""
+    ops = []
+    for field in dict.fromkeys(field_updates):
+        if field not in current:
+            continue
+        ops.append({
+            "op": "replace" if field in previous else "add",
+            "path": f"{root}/{escape_pointer(field)}",
+            "value": current[field],
+        })
+    return ops
+
+
+def _resolve(document: Any, path: str) -> tuple[Any, str]:
+    """Parent container and final token of a JSON Pointer"""
+    if not path.startswith("/"):
+        raise JSONPatchError(f"Invalid pointer: {path!r}")
+    tokens = [unescape_pointer(token) for token in path[1:].split("/")]
+    parent = document
+    for token in tokens[:-1]:
+        try:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise JSONPatchError(f"Path not found: {path}")
+    return parent, tokens[-1]
+
+
+def apply_patch(document: Any, ops: Iterable[dict[str, Any]], in_place: bool = False) -> Any:
+    """Apply add/remove/replace operations; returns the patched document"""
+    if not in_place:
+        document = copy.deepcopy(document)
+    for op in ops:
+        parent, token = _resolve(document, op["path"])
+        kind = op["op"]
+        if isinstance(parent, list):
+            if token == "-" and kind == "add":
+                parent.append(op["value"])
+                continue
+            try:
+                index = int(token)
+            except ValueError:
+                raise JSONPatchError(f"Invalid list index: {op['path']}")
+            if kind == "add":
+                parent.insert(index, op["value"])
+            elif kind == "replace":
+                parent[index] = op["value"]
+            elif kind == "remove":
+                del parent[index]
+            else:
+                raise JSONPatchError(f"Unsupported op: {kind}")
+        elif isinstance(parent, dict):
+            if kind in {"add", "replace"}:
+                if kind == "replace" and token not in parent:
+                    raise JSONPatchError(f"Path not found: {op['path']}")
+                parent[token] = op["value"]
+            elif kind == "remove":
+                if parent.pop(token, _MISSING) is _MISSING:
+                    raise JSONPatchError(f"Path not found: {op['path']}")
+            else:
+                raise JSONPatchError(f"Unsupported op: {kind}")
+        else:
+            raise JSONPatchError(f"Cannot apply {kind} at {op['path']}")
+    return document
+
+
+_MISSING = object()
+
+
+def encoded_size(value: Any) -> int:
+    """Approximate wire/storage size of a value in bytes"""
+    return len(json.dumps(value, default=str, separators=(",", ":")).encode("utf-8"))
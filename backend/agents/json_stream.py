@@ -0,0 +1,118 @@
+"""
+Incremental parser for a streamed JSON object
+
+Text is fed in as the LLM generates it. Each time a top-level key's value is
+complete, the (key, value) pair is returned so the field can be pushed to the
+frontend before the rest of the object has been generated. Leading prose and
+```json fences before the opening brace are skipped.
+"""
+
+import json
+from typing import Any
+
+
+class StreamingJSONObjectParser:
+    """Yield completed top-level fields of a JSON object from streamed text"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        # Start offset of the current top-level "key": value member
+        self._member_start: int | None = None
+        self.fields: dict[str, Any] = {}
+        # Members that were complete but not valid JSON
+        self.broken: list[str] = []
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def pending(self) -> str:
+        """Text of the member still being generated (what a truncated response cut off)"""
+        if not self._started or self._finished or self._member_start is None:
+            return ""
+        return self._buffer[self._member_start:].strip()
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """Consume more text and return the fields completed by it"""
+        if self._finished or not text:
+            return []
+        self._buffer += text
+        completed: list[tuple[str, Any]] = []
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                self._pos += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_member(self._pos, completed)
+                    self._finished = True
+                    self._pos += 1
+                    break
+            elif char == "," and self._depth == 1:
+                self._complete_member(self._pos, completed)
+                self._member_start = self._pos + 1
+            self._pos += 1
+
+        return completed
+
+    def _complete_member(self, end: int, completed: list[tuple[str, Any]]) -> None:
+        if self._member_start is None:
+            return
+        member = self._buffer[self._member_start:end].strip()
+        if not member:
+            return
+        try:
+            parsed = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            # Malformed member; the final parse of the full response decides
+            self.broken.append(member)
+            return
+        for key, value in parsed.items():
+            self.fields[key] = value
+            completed.append((key, value))
+
+
+def parse_json_object(content: str) -> dict[str, Any]:
+    """Parse a model response that should be a JSON object, ignoring code fences.
+
+    Raises json.JSONDecodeError if no object can be parsed.
+    """
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    parsed = json.loads(content)
+    if not isinstance(parsed, dict):
+        raise json.JSONDecodeError("Expected a JSON object", content, 0)
+    return parsed
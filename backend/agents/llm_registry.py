@@ -0,0 +1,144 @@
+"""
+Process-wide registry of LLM clients
+
+ChatGroq instances own the provider SDK's HTTP connection pool, so building
+one per turn pays a fresh TLS handshake every time. The registry builds each
+(model, temperature, tools) combination once and hands back the same warm
+client on every later turn. Clients are rebuilt when MODEL_NAME changes.
+"""
+
+import os
+import time
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from .observability import get_logger, log_fields
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+DEFAULT_MODEL_NAME = "llama-3.3-70b-versatile"
+DEFAULT_TEMPERATURE = 0.1
+
+# Send a one-token request at startup so the first user turn finds an open connection
+LLM_WARMUP = os.getenv("LLM_WARMUP", "false").lower() in {"1", "true", "yes"}
+
+logger = get_logger(__name__)
+
+
+def current_model_name() -> str:
+    """Model configured for extraction"""
+    return os.getenv("MODEL_NAME", DEFAULT_MODEL_NAME)
+
+
+class LLMRegistry:
+    """Cache of chat model clients keyed by (model, temperature, tools)"""
+
+    def __init__(self, factory: Callable[[str, float], Any] | None = None):
+        self.factory = factory
+        self._base: dict[tuple[str, float], "ChatGroq"] = {}
+        self._bound: dict[tuple[str, float, tuple[str, ...], bool], Any] = {}
+        self._model_name = current_model_name()
+        self.created = 0
+        self.reused = 0
+        self.reloads = 0
+        self.warmup_ms: float | None = None
+
+    def _check_reload(self) -> None:
+        """Drop all clients if MODEL_NAME changed since they were built"""
+        model_name = current_model_name()
+        if model_name != self._model_name:
+            self.reload(model_name)
+
+    def reload(self, model_name: str | None = None) -> None:
+        """Forget every client so the next lookup builds fresh ones"""
+        self._base.clear()
+        self._bound.clear()
+        self._model_name = model_name or current_model_name()
+        self.reloads += 1
+
+    def _get_base(self, model: str, temperature: float) -> "ChatGroq":
+        key = (model, temperature)
+        llm = self._base.get(key)
+        if llm is None:
+            if self.factory is not None:
+                llm = self.factory(model, temperature)
+            else:
+                # The provider SDK is only imported once a real client is needed
+                from langchain_groq import ChatGroq
+
+                llm = ChatGroq(
+                    model=model,
+                    api_key=os.getenv("GROQ_API_KEY"),
+                    temperature=temperature,
+                )
+            self._base[key] = llm
+            self.created += 1
+        return llm
+
+    def get(
+        self,
+        model: str | None = None,
+        temperature: float = DEFAULT_TEMPERATURE,
+        tools: Sequence[Any] = (),
+        json_mode: bool = False,
+    ):
+        """Return a shared client, optionally with tools bound or JSON-object output"""
+        self._check_reload()
+        model = model or self._model_name
+        tool_names = tuple(sorted(getattr(t, "name", str(t)) for t in tools))
+        key = (model, temperature, tool_names, json_mode)
+
+        llm = self._bound.get(key)
+        if llm is not None:
+            self.reused += 1
+            return llm
+
+        base = self._get_base(model, temperature)
+        if tools:
+            llm = base.bind_tools(list(tools))
+        elif json_mode:
+            llm = base.bind(response_format={"type": "json_object"})
+        else:
+            llm = base
+        self._bound[key] = llm
+        return llm
+
+    def set_factory(self, factory: Callable[[str, float], Any] | None) -> None:
+        """Build clients with ``factory(model, temperature)`` instead of ChatGroq"""
+        self.factory = factory
+        self.reload()
+
+    def preload(self, tools: Sequence[Any] = (), models: Sequence[str] = ()) -> None:
+        """Build the default clients (and those of any extra models) up front"""
+        for model in (None, *models):
+            self.get(model=model)
+            if tools:
+                self.get(model=model, tools=tools)
+
+    async def warm_up(self) -> None:
+        """Open the provider connection with a minimal request"""
+        from langchain_core.messages import HumanMessage
+
+        started = time.perf_counter()
+        try:
+            llm = self._get_base(self._model_name, DEFAULT_TEMPERATURE)
+            await llm.ainvoke([HumanMessage(content="ping")], max_tokens=1)
+        except Exception as e:
+            logger.warning("llm warm-up failed", extra=log_fields(error=str(e)))
+            return
+        self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def stats(self) -> dict[str, Any]:
+        """Client reuse counters"""
+        return {
+            "model": self._model_name,
+            "clients": len(self._bound),
+            "created": self.created,
+            "reused": self.reused,
+            "reloads": self.reloads,
+            "warmup_ms": self.warmup_ms,
+        }
+
+
+# Process-wide registry instance
+llm_registry = LLMRegistry()
@@ -0,0 +1,301 @@
+"""
+Rate-limit-aware dispatch for LLM calls
+
+Every model call goes through the scheduler, which:
+- accounts request and token budgets with token buckets (LLM_RPM, LLM_TPM)
+- caps in-flight calls process-wide (LLM_MAX_CONCURRENCY)
+- serves waiters by priority, so interactive chat goes ahead of bulk jobs
+- retries 429 responses after Retry-After (or jittered exponential backoff)
+
+A budget of 0 disables that bucket.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Sequence
+
+from .cancellation import record_cancelled_work
+
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+# Output tokens reserved per call until the real usage is known
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", "1024"))
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_BACKGROUND = 2
+
+# Priority of LLM calls made from the current task (bulk jobs override it)
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def estimate_tokens(messages: Sequence[Any]) -> int:
+    """Rough prompt + completion token estimate (4 characters per token)"""
+    chars = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // 4 + LLM_OUTPUT_TOKENS_ESTIMATE
+
+
+def rate_limit_retry_after(error: Exception) -> float | None:
+    """Seconds to wait if the error is a provider 429, otherwise None"""
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if status != 429 and type(error).__name__ != "RateLimitError":
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after", "")))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be consumed"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMScheduler:
+    """Priority queue in front of the provider with budget accounting"""
+
+    def __init__(
+        self,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.active = 0
+        self._queue: list[tuple[int, int, asyncio.Future, int, float]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._paused_until = 0.0
+        self.granted = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._waits_ms: deque[float] = deque(maxlen=1000)
+        self.max_wait_ms = 0.0
+
+    # -- admission ---------------------------------------------------------
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self._queue and self.active < self.max_concurrency:
+            _, _, future, estimate, enqueued_at = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1),
+                self.tokens.wait_time(estimate),
+            )
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+            heapq.heappop(self._queue)
+            self.active += 1
+            self.granted += 1
+            self.requests.consume(1)
+            self.tokens.consume(estimate)
+            waited_ms = (now - enqueued_at) * 1000
+            self._waits_ms.append(waited_ms)
+            self.max_wait_ms = max(self.max_wait_ms, waited_ms)
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    async def _acquire(self, priority: int, estimate: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future, estimate, time.monotonic()))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before cancellation: give the slot and the budget back
+                self.requests.refund(1)
+                self.tokens.refund(estimate)
+                self._release()
+            else:
+                # Never granted: the whole estimate is saved
+                record_cancelled_work("llm_queued", estimate)
+            raise
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._dispatch()
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for admission"""
+        return sum(1 for entry in self._queue if not entry[2].done())
+
+    def throttled(self, estimate: int = 0) -> bool:
+        """Whether a new call would wait: queued callers, a 429 pause or an exhausted budget"""
+        return (
+            self.queued > 0
+            or self._paused_until > time.monotonic()
+            or self.requests.wait_time(1) > 0
+            or self.tokens.wait_time(estimate) > 0
+        )
+
+    def _settle(self, estimate: int, usage: dict | None) -> None:
+        """Correct the token bucket once the real usage is known"""
+        total = (usage or {}).get("total_tokens")
+        if total is None:
+            return
+        if total < estimate:
+            self.tokens.refund(estimate - total)
+        else:
+            self.tokens.consume(total - estimate)
+
+    def _backoff(self, error: Exception, attempt: int) -> float | None:
+        """Delay before retrying a rate-limited call, or None to give up"""
+        retry_after = rate_limit_retry_after(error)
+        if retry_after is None or attempt >= self.max_retries:
+            return None
+        self.rate_limited += 1
+        self.retries += 1
+        delay = retry_after or LLM_BACKOFF_BASE * (2 ** attempt)
+        delay *= 1 + random.uniform(0, 0.25)
+        # Everyone waits: the provider budget is shared
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    # -- calls -------------------------------------------------------------
+
+    async def ainvoke(self, llm, messages: Sequence[Any], priority: int | None = None, **kwargs):
+        """Scheduled equivalent of ``llm.ainvoke(messages, **kwargs)``"""
+        priority = llm_priority.get() if priority is None else priority
+        estimate = estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await self._acquire(priority, estimate)
+            try:
+                response = await llm.ainvoke(messages, **kwargs)
+            except asyncio.CancelledError:
+                # The connection is closed, so the provider stops generating
+                record_cancelled_work("llm_in_flight", LLM_OUTPUT_TOKENS_ESTIMATE)
+                raise
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._settle(estimate, getattr(response, "usage_metadata", None))
+                return response
+            finally:
+                self._release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def astream(
+        self,
+        llm,
+        messages: Sequence[Any],
+        priority: int | None = None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """Scheduled equivalent of ``llm.astream``; retries only before the first chunk"""
+        priority = llm_priority.get() if priority is None else priority
+        estimate = estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await self._acquire(priority, estimate)
+            streamed = False
+            streamed_chars = 0
+            usage = None
+            try:
+                async for chunk in llm.astream(messages, **kwargs):
+                    streamed = True
+                    streamed_chars += len(chunk.content) if isinstance(getattr(chunk, "content", None), str) else 0
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                record_cancelled_work("llm_in_flight", max(0, LLM_OUTPUT_TOKENS_ESTIMATE - streamed_chars // 4))
+                raise
+            except Exception as e:
+                delay = None if streamed else self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._settle(estimate, usage)
+                return
+            finally:
+                self._release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth and wait-time metrics"""
+        waits = sorted(self._waits_ms)
+        p95 = waits[int(len(waits) * 0.95) - 1] if waits else 0.0
+        return {
+            "queue_depth": self.queued,
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(p95, 1),
+            "wait_ms_max": round(self.max_wait_ms, 1),
+            "rpm_budget": self.requests.capacity,
+            "tpm_budget": self.tokens.capacity,
+        }
+
+
+# Process-wide scheduler instance
+llm_scheduler = LLMScheduler()
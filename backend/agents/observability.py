@@ -0,0 +1,270 @@
+"""
+Instrumentation for the brief analyzer: structured logging, spans and metrics
+
+- Logging is leveled and emitted as one JSON object per line. It is quiet by
+  default (LOG_LEVEL=WARNING); set LOG_LEVEL=DEBUG to trace every turn.
+- span() times a stage of a turn (intent routing, project fetch, LLM call,
+  JSON parsing, scoring) into a per-stage latency histogram and, at DEBUG,
+  logs it with its attributes.
+- render_metrics() returns everything in Prometheus text format for /metrics,
+  including the counters kept by the caches and the LLM scheduler.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    CONTENT_TYPE_LATEST,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+
+# Correlates every log line and span of one graph turn
+turn_id: ContextVar[str | None] = ContextVar("turn_id", default=None)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per log line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        current_turn = turn_id.get()
+        if current_turn:
+            payload["turn"] = current_turn
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def _configure_root() -> logging.Logger:
+    root = logging.getLogger("tf")
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JSONFormatter())
+        root.addHandler(handler)
+        root.propagate = False
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.WARNING))
+    return root
+
+
+_configure_root()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the structured "tf" hierarchy"""
+    return logging.getLogger(f"tf.{name.rsplit('.', 1)[-1]}")
+
+
+def log_fields(**fields: Any) -> dict[str, Any]:
+    """``extra=`` payload for structured fields: logger.info("msg", extra=log_fields(a=1))"""
+    return {"fields": fields}
+
+
+logger = get_logger(__name__)
+
+# =============================================================================
+# Metrics
+# =============================================================================
+
+registry = CollectorRegistry(auto_describe=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+STAGE_LATENCY = Histogram(
+    "tf_stage_duration_seconds",
+    "Latency of each stage of a brief analyzer turn",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+TURN_LATENCY = Histogram(
+    "tf_turn_duration_seconds",
+    "Total latency of a brief analyzer turn by route",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "tf_llm_time_to_first_token_seconds",
+    "Time from sending an LLM request to its first token",
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+TIME_TO_FIRST_FIELD = Histogram(
+    "tf_extraction_time_to_first_field_seconds",
+    "Time from sending an extraction request to the first streamed field",
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+LLM_TOKENS = Counter(
+    "tf_llm_tokens_total",
+    "LLM tokens by kind (prompt, completion, cached_prompt)",
+    ["kind"],
+    registry=registry,
+)
+TURNS = Counter(
+    "tf_turns_total",
+    "Brief analyzer turns by route",
+    ["route"],
+    registry=registry,
+)
+INTENT_ROUTES = Counter(
+    "tf_intent_routes_total",
+    "Turns by classified intent and the model tier it was routed to",
+    ["intent", "tier"],
+    registry=registry,
+)
+TIER_LATENCY = Histogram(
+    "tf_llm_tier_duration_seconds",
+    "LLM call latency by model tier",
+    ["tier"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+EXTRACTION_PARSES = Counter(
+    "tf_extraction_parses_total",
+    "Extraction responses by parse outcome (strict, tolerant, repaired, partial, failed)",
+    ["outcome"],
+    registry=registry,
+)
+CANCELLED_RUNS = Counter(
+    "tf_cancelled_runs_total",
+    "Agent runs cancelled by reason (disconnect, superseded)",
+    ["reason"],
+    registry=registry,
+)
+CANCELLED_WORK = Counter(
+    "tf_cancelled_work_total",
+    "Work dropped by cancelled runs (llm_queued, llm_in_flight, project_fetch)",
+    ["kind"],
+    registry=registry,
+)
+TOKENS_SAVED = Counter(
+    "tf_cancelled_tokens_saved_total",
+    "Estimated LLM tokens not spent because their run was cancelled",
+    registry=registry,
+)
+HISTORY_FOLDED = Counter(
+    "tf_history_folded_messages_total",
+    "Messages folded out of thread state into the rolling history summary",
+    registry=registry,
+)
+EXTRACTION_REPAIRS = Histogram(
+    "tf_extraction_repair_calls",
+    "Repair calls needed per parsed extraction response",
+    buckets=(0, 1, 2, 3),
+    registry=registry,
+)
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+    """Time a stage of the current turn.
+
+    The yielded dict can be filled with attributes known only at the end
+    (token counts, result sizes); they are logged with the span.
+    """
+    started = time.perf_counter()
+    attrs = dict(attributes)
+    try:
+        yield attrs
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "span",
+                extra=log_fields(stage=stage, duration_ms=round(elapsed * 1000, 2), **attrs),
+            )
+
+
+# Recent turn durations for percentile reporting outside Prometheus
+_recent_turns: deque[float] = deque(maxlen=1000)
+
+
+def turn_latency_stats() -> dict[str, Any]:
+    """p50/p95/p99 over the most recent turns, in milliseconds"""
+    ordered = sorted(_recent_turns)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1) if ordered else 0.0
+
+    return {"turns": len(ordered), "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+@contextmanager
+def turn(route_holder: dict[str, str] | None = None) -> Iterator[dict[str, str]]:
+    """Wrap one graph turn: assigns a turn id and records total latency by route"""
+    holder = route_holder if route_holder is not None else {"route": "unknown"}
+    token = turn_id.set(uuid.uuid4().hex[:12])
+    started = time.perf_counter()
+    try:
+        yield holder
+    finally:
+        route = holder.get("route", "unknown")
+        elapsed = time.perf_counter() - started
+        TURNS.labels(route=route).inc()
+        TURN_LATENCY.labels(route=route).observe(elapsed)
+        _recent_turns.append(elapsed)
+        turn_id.reset(token)
+
+
+def record_llm_usage(usage: dict[str, Any] | None) -> None:
+    """Count prompt/completion tokens from a response's usage_metadata"""
+    if not usage:
+        return
+    LLM_TOKENS.labels(kind="prompt").inc(usage.get("input_tokens") or 0)
+    LLM_TOKENS.labels(kind="completion").inc(usage.get("output_tokens") or 0)
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    LLM_TOKENS.labels(kind="cached_prompt").inc(cached)
+
+
+class StatsCollector:
+    """Expose existing ``stats()`` dicts (caches, scheduler) as gauges"""
+
+    def __init__(self):
+        self._sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def add(self, name: str, stats: Callable[[], dict[str, Any]]) -> None:
+        self._sources[name] = stats
+
+    def collect(self):
+        for name, stats in self._sources.items():
+            try:
+                values = stats()
+            except Exception:
+                logger.exception("stats collection failed", extra=log_fields(source=name))
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                yield GaugeMetricFamily(f"tf_{name}_{key}", f"{name} {key.replace('_', ' ')}", value=value)
+
+
+stats_collector = StatsCollector()
+registry.register(stats_collector)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus exposition body and content type"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
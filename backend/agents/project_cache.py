@@ -0,0 +1,172 @@
+"""
+Read-through cache for project data fetched from the frontend API
+
+Entries are keyed by project UUID, expire after a TTL and are evicted in
+LRU order once the cache is full. Concurrent misses for the same project
+are coalesced onto a single upstream request (single-flight).
+
+The upstream request runs in a task owned by the cache, and callers await
+it through asyncio.shield: a caller that is cancelled (a prefetch dropped at
+the end of a turn, a superseded run) stops waiting without cancelling the
+request for everyone else. The request itself is only cancelled once no
+caller is waiting for it.
+
+With several workers an invalidation is also recorded in the shared store;
+each worker polls it (at most once per SHARED_STATE_POLL_INTERVAL, off the
+event loop) and drops a cached project fetched before the latest
+invalidation on its next lookup.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from .shared_state import shared_state
+
+PROJECT_CACHE_TTL = float(os.getenv("PROJECT_CACHE_TTL", "60"))
+PROJECT_CACHE_MAX_ENTRIES = int(os.getenv("PROJECT_CACHE_MAX_ENTRIES", "1024"))
+
+
+class _Flight:
+    """An upstream request and the number of callers waiting for it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class ProjectCache:
+    """In-process TTL + LRU cache with single-flight coalescing"""
+
+    def __init__(self, ttl: float = PROJECT_CACHE_TTL, max_entries: int = PROJECT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # project_id -> (expires_at, fetched_at wall-clock time, value)
+        self._entries: OrderedDict[str, tuple[float, float, dict[str, Any]]] = OrderedDict()
+        self._inflight: dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, project_id: str) -> dict[str, Any] | None:
+        """Return a fresh cached entry, or None"""
+        entry = self._entries.get(project_id)
+        if entry is None:
+            return None
+        expires_at, fetched_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[project_id]
+            return None
+        invalidated_at = shared_state.project_invalidated_at(project_id)
+        if invalidated_at is not None and invalidated_at >= fetched_at:
+            # Invalidated on another worker since it was fetched
+            del self._entries[project_id]
+            return None
+        self._entries.move_to_end(project_id)
+        return value
+
+    def put(self, project_id: str, value: dict[str, Any], fetched_at: float | None = None) -> None:
+        """Store an entry, evicting the least recently used ones if full.
+
+        ``fetched_at`` is when the upstream request started (default: now).
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self._entries[project_id] = (time.monotonic() + self.ttl, fetched_at, value)
+        self._entries.move_to_end(project_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def invalidate(self, project_id: str) -> bool:
+        """Drop a project's entry in this worker and, via the shared store, in the others.
+
+        Returns whether this worker had an entry.
+        """
+        self.invalidations += 1
+        had_entry = self._entries.pop(project_id, None) is not None
+        await shared_state.invalidate_project(project_id)
+        return had_entry
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._entries.clear()
+
+    async def get_or_fetch(
+        self,
+        project_id: str,
+        fetch: Callable[[str], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """Return cached data, or fetch it once for all concurrent callers.
+
+        Exceptions raised by ``fetch`` propagate to every waiter and are not cached.
+        """
+        await shared_state.refresh_invalidations()
+        cached = self.get(project_id)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        flight = self._inflight.get(project_id)
+        if flight is None:
+            self.misses += 1
+            flight = _Flight(asyncio.create_task(self._fetch(project_id, fetch)))
+            flight.task.add_done_callback(lambda task: self._settled(project_id, flight))
+            self._inflight[project_id] = flight
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Nobody else is waiting: stop the request
+                flight.task.cancel()
+                self._forget(project_id, flight)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def _fetch(
+        self,
+        project_id: str,
+        fetch: Callable[[str], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        fetched_at = time.time()
+        value = await fetch(project_id)
+        self.put(project_id, value, fetched_at)
+        return value
+
+    def _forget(self, project_id: str, flight: _Flight) -> None:
+        # A newer request for the project may already have replaced this one
+        if self._inflight.get(project_id) is flight:
+            del self._inflight[project_id]
+
+    def _settled(self, project_id: str, flight: _Flight) -> None:
+        self._forget(project_id, flight)
+        # Mark the error retrieved so a request nobody awaits any more doesn't log it
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for the frontend API load dashboard"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Process-wide cache instance
+project_cache = ProjectCache()
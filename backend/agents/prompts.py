@@ -0,0 +1,225 @@
+"""
+Prompt assembly for brief extraction
+
+The extraction prompt is split into a static system prefix (instructions and
+field schema), identical on every turn so provider-side prompt caching can
+apply, and a compact variable suffix: the minified non-empty brief, a few
+truncated history messages and the user's message.
+
+Per-turn prompt token usage is accounted so the saving can be measured.
+"""
+
+import json
+import os
+from typing import TYPE_CHECKING, Any, Sequence
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+# Bump whenever EXTRACTION_SYSTEM_PROMPT changes so cached extractions are not reused
+EXTRACTION_PROMPT_VERSION = "2"
+
+# Prior messages included for follow-up context, and their length cap
+PROMPT_HISTORY_MESSAGES = int(os.getenv("PROMPT_HISTORY_MESSAGES", "2"))
+PROMPT_HISTORY_MAX_CHARS = int(os.getenv("PROMPT_HISTORY_MAX_CHARS", "280"))
+# Long free-text brief fields are clipped unless the user message mentions them
+PROMPT_FIELD_MAX_CHARS = int(os.getenv("PROMPT_FIELD_MAX_CHARS", "400"))
+
+EXTRACTION_SYSTEM_PROMPT = """You are a music licensing brief analyzer and project assistant. Your job is to:
+1. Extract structured information from raw client briefs (emails, notes, documents)
+2. Update specific fields when the user asks (e.g., "change the budget to X")
+3. Answer questions about the current project data
+
+**TOOLS AVAILABLE**:
+You have access to the `get_project_data` tool. Use it when:
+- The user asks a question about the project (budget, client, timeline, etc.)
+- You need to know the current state of the project data
+- The "Current extracted data" is empty or missing information
+
+**IMPORTANT RULES**:
+- If the user is asking a question about the project and you don't have the data, USE THE TOOL to fetch it first.
+- If the user is asking to change, update, or set a specific field (like "make the title X" or "change the budget to Y"), treat that as a direct update request and return that field with the new value.
+- If you already have the data in "Current extracted data", you can answer directly without using the tool.
+
+Extract the following information if present:
+- project_title: A short descriptive title for this project (e.g., "BMW Electric Launch" or "Nike Summer Campaign")
+- client_name: The client company name
+- agency_name: The agency name (if different from client)
+- brand_name: The specific brand/sub-brand
+- budget_amount: The total budget as a number (extract currency value, convert to number)
+- budget_currency: The currency (EUR, USD, GBP, CHF)
+- territory: List of territories/countries where music will be used
+- media_types: List of media types (TV, Cinema, Online, Social, Radio, etc.)
+- term_length: License duration (e.g., "2 years", "12 months")
+- exclusivity: Whether exclusivity is required (true/false)
+- exclusivity_details: Details about exclusivity scope
+- creative_direction: Description of the creative direction/mood
+- mood_keywords: List of mood/emotion keywords
+- genre_preferences: List of preferred genres
+- reference_tracks: List of reference tracks with artist, title, and notes
+- must_avoid: Things to avoid in the music
+- vocals_preference: "instrumental", "vocals", "either", or "specific"
+- video_lengths: List of video/spot lengths (e.g., ["60s", "30s", "15s"])
+- stems_required: Whether stems are needed (true/false)
+- sync_points: Description of key sync points in the edit
+- deadline_date: When music is needed (ISO date if possible, e.g., "2025-12-15")
+- air_date: When the campaign airs (ISO date if possible)
+- deadline_urgency: "standard", "rush", or "urgent"
+- first_presentation_date: Date of first client presentation
+- kickoff_date: When the project starts
+- brief_sender_name: Name of person who sent the brief
+- brief_sender_email: Email of person who sent the brief
+- brief_sender_role: Role/title of brief sender
+- campaign_context: Background information about the campaign or product launch
+- target_audience: Who the campaign is aimed at (demographics, psychographics)
+- brand_values: List of brand attributes or values mentioned (e.g., ["innovative", "premium", "sustainable"])
+- extraction_notes: Your observations about ambiguous or interpreted information. Use this to note things like:
+  - "Air date was 'mid-March' - interpreted as March 15, 2026"
+  - "Budget described as 'around 18k' - may need confirmation"
+  - "Deadline urgency unclear - client said 'by next Wednesday'"
+  - "Reference track 'cozy Sunday morning vibes' - interpreted as acoustic/indie-folk genre"
+
+**Response Format**:
+- For extractions/updates: Respond with a JSON object containing the fields you extracted/updated and a "summary" field.
+- For questions about the project: Respond with a JSON object containing just a "summary" field with your helpful answer.
+
+The variable part of each request follows in the user message:
+"Current extracted data" (compact JSON of the fields already known), optionally
+"Recent conversation", and the "User message" to process.
+
+Process the user's request. If they're asking about project data and you have it in "Current extracted data", answer their question. If they're pasting a brief, extract the fields and respond with JSON."""
+
+
+def compact_json(value: Any) -> str:
+    """Minified JSON for prompt payloads"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def relevant_brief_fields(brief: dict[str, Any], user_message: str) -> dict[str, Any]:
+    """Drop empty fields and clip long text fields the message doesn't refer to"""
+    message = (user_message or "").lower()
+    relevant = {}
+    for key, value in brief.items():
+        if value is None or value == "" or value == []:
+            continue
+        if (
+            isinstance(value, str)
+            and len(value) > PROMPT_FIELD_MAX_CHARS
+            and key.replace("_", " ") not in message
+        ):
+            value = value[:PROMPT_FIELD_MAX_CHARS] + "…"
+        relevant[key] = value
+    return relevant
+
+
+def message_text(message: Any) -> tuple[str, str]:
+    """(role, text) of a LangChain message or an AG-UI message dict"""
+    if isinstance(message, dict):
+        return message.get("role", "user"), str(message.get("content", ""))
+    role = "assistant" if getattr(message, "type", "") == "ai" else "user"
+    content = getattr(message, "content", "")
+    return role, content if isinstance(content, str) else str(content)
+
+
+def truncated_history(messages: Sequence[Any]) -> list[str]:
+    """The last few prior messages, each clipped"""
+    if PROMPT_HISTORY_MESSAGES <= 0:
+        return []
+    lines = []
+    for message in list(messages)[-PROMPT_HISTORY_MESSAGES:]:
+        role, text = message_text(message)
+        text = " ".join(text.split())
+        if not text:
+            continue
+        if len(text) > PROMPT_HISTORY_MAX_CHARS:
+            text = text[:PROMPT_HISTORY_MAX_CHARS] + "…"
+        lines.append(f"{role}: {text}")
+    return lines
+
+
+def build_extraction_messages(
+    current_brief: dict[str, Any],
+    user_message: str,
+    history: Sequence[Any] = (),
+    history_summary: str = "",
+) -> list["BaseMessage"]:
+    """Static system prefix followed by the compact per-turn suffix"""
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    parts = [f"Current extracted data:\n{compact_json(relevant_brief_fields(current_brief, user_message))}"]
+    if history_summary:
+        parts.append(f"Earlier conversation (summarized):\n{history_summary}")
+    history_lines = truncated_history(history)
+    if history_lines:
+        parts.append("Recent conversation:\n" + "\n".join(history_lines))
+    parts.append(f"User message:\n{user_message}")
+    return [
+        SystemMessage(content=EXTRACTION_SYSTEM_PROMPT),
+        HumanMessage(content="\n\n".join(parts)),
+    ]
+
+
+def revision_message(changed_text: str) -> str:
+    """User message for a revised brief: only the lines that changed since the matched version"""
+    return (
+        "This is a revised version of a brief that was already extracted (see current extracted data). "
+        "Only the new or changed lines are shown; return just the fields they change.\n\n"
+        f"{changed_text}"
+    )
+
+
+def estimate_prompt_tokens(text: str) -> int:
+    """Rough token count (4 characters per token)"""
+    return len(text) // 4
+
+
+class PromptTokenStats:
+    """Per-turn prompt token accounting"""
+
+    def __init__(self):
+        self.turns = 0
+        self.prefix_tokens = 0
+        self.suffix_tokens = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+        self.last_turn: dict[str, Any] = {}
+
+    def record(self, messages: Sequence["BaseMessage"], response: Any) -> dict[str, Any]:
+        """Record one LLM call; returns the turn's figures"""
+        prefix = sum(estimate_prompt_tokens(m.content) for m in messages if m.type == "system")
+        suffix = sum(estimate_prompt_tokens(m.content) for m in messages if m.type != "system")
+        usage = getattr(response, "usage_metadata", None) or {}
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        turn = {
+            "prefix_tokens_est": prefix,
+            "suffix_tokens_est": suffix,
+            "input_tokens": usage.get("input_tokens"),
+            "cached_input_tokens": cached,
+            "output_tokens": usage.get("output_tokens"),
+        }
+        self.turns += 1
+        self.prefix_tokens += prefix
+        self.suffix_tokens += suffix
+        self.input_tokens += usage.get("input_tokens") or 0
+        self.cached_input_tokens += cached
+        self.output_tokens += usage.get("output_tokens") or 0
+        self.last_turn = turn
+        return turn
+
+    def stats(self) -> dict[str, Any]:
+        """Totals and per-turn averages"""
+        turns = self.turns or 1
+        return {
+            "turns": self.turns,
+            "prefix_tokens_est_avg": round(self.prefix_tokens / turns, 1),
+            "suffix_tokens_est_avg": round(self.suffix_tokens / turns, 1),
+            "input_tokens_total": self.input_tokens,
+            "cached_input_tokens_total": self.cached_input_tokens,
+            "output_tokens_total": self.output_tokens,
+            "last_turn": self.last_turn,
+        }
+
+
+# Process-wide accounting instance
+prompt_token_stats = PromptTokenStats()
@@ -0,0 +1,368 @@
+"""
+Brief scoring rules and bulk rescoring
+
+Completeness, project type and suggestion chips all follow one rule set:
+- fields per priority (critical, important, helpful) and their weights
+- how many chips each priority may contribute, and the overall chip limit
+- the minimum budget of each project type tier
+- the question asked for each missing field
+
+The defaults below can be overridden by a JSON file (SCORING_RULES_PATH)
+holding any subset of DEFAULT_RULES' keys. The file is re-read when it
+changes, so the rules can be updated and every project rescored without a
+restart.
+
+Chat turns score one brief at a time. To rescore many briefs, each one is
+reduced to two bitmasks over the scored fields: present (not None, "" or []),
+which drives completeness, and answered (truthy), which drives chips. The
+results come from data built once per rule set: completeness from tables of
+per-byte weight sums, and chips from the lowest missing bits of each
+priority's chip mask. A bulk pass computes each distinct pair of masks only
+once.
+"""
+
+import asyncio
+import bisect
+import copy
+import json
+import os
+from typing import Any, AsyncIterator, Iterable, TypedDict
+
+from pydantic import BaseModel, Field
+
+from .observability import get_logger, log_fields
+
+SCORING_RULES_PATH = os.getenv("SCORING_RULES_PATH", "")
+# Briefs scored between yields to the event loop in a bulk pass
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "500"))
+RESCORE_MAX_BRIEFS = int(os.getenv("RESCORE_MAX_BRIEFS", "20000"))
+
+PRIORITIES = ("critical", "important", "helpful")
+
+DEFAULT_RULES: dict[str, Any] = {
+    "fields": {
+        "critical": [
+            "client_name",
+            "budget_amount",
+            "territory",
+            "deadline_date",
+        ],
+        "important": [
+            "project_title",
+            "media_types",
+            "creative_direction",
+            "video_lengths",
+            "brief_sender_name",
+            "brief_sender_email",
+        ],
+        "helpful": [
+            "agency_name",
+            "brand_name",
+            "mood_keywords",
+            "genre_preferences",
+            "reference_tracks",
+            "sync_points",
+            "stems_required",
+            "vocals_preference",
+            "term_length",
+            "exclusivity",
+            "air_date",
+        ],
+    },
+    "weights": {"critical": 10, "important": 5, "helpful": 2},
+    # None: no limit
+    "chip_limits": {"critical": None, "important": 3, "helpful": 2},
+    "max_chips": 8,
+    # Minimum budget per project type, highest first; anything lower is default_project_type
+    "project_types": [["A", 100000], ["B", 25000], ["C", 10000], ["D", 2500]],
+    "default_project_type": "E",
+    "questions": {
+        "budget_amount": "What's the total budget for this project?",
+        "territory": "What territories will this be used in?",
+        "deadline_date": "When is the music needed by?",
+        "client_name": "Who is the client for this project?",
+        "project_title": "What should this project be called?",
+        "media_types": "What media types will be used?",
+        "creative_direction": "What's the creative direction or mood?",
+        "video_lengths": "What are the video/spot lengths?",
+        "sync_points": "Are there specific sync points in the edit?",
+        "stems_required": "Do they need stems for the music?",
+        "vocals_preference": "Should the music be instrumental, with vocals, or either?",
+        "reference_tracks": "Are there any reference tracks?",
+        "brief_sender_name": "Who sent the brief?",
+        "brief_sender_email": "What's the brief sender's email?",
+        "air_date": "When does the campaign air?",
+    },
+}
+
+logger = get_logger(__name__)
+
+
+class BriefScore(TypedDict):
+    """Rescoring result for one brief"""
+    id: str | None
+    completeness: int
+    project_type: str | None
+    suggestion_chips: list[dict[str, str]]
+
+
+class RescoreBrief(BaseModel):
+    """One stored brief to rescore"""
+    id: str | None = None
+    extracted_brief: dict[str, Any]
+
+
+class RescoreRequest(BaseModel):
+    """Bulk rescoring request body"""
+    briefs: list[RescoreBrief] = Field(..., max_length=RESCORE_MAX_BRIEFS)
+    max_chips: int | None = Field(default=None, ge=0, le=32)
+
+
+def has_value(value: Any) -> bool:
+    """A meaningful value: not None, "" or [] (False and 0 count)"""
+    return value is not None and value != "" and value != []
+
+
+def budget_value(value: Any) -> float | None:
+    """Budget as a number; numeric strings ("45,000") are accepted from stored briefs"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+class ScoringRules:
+    """A validated rule set with its lookup tables"""
+
+    def __init__(self, rules: dict[str, Any]):
+        self.rules = rules
+        fields = rules["fields"]
+        self.fields_by_priority = {priority: list(fields.get(priority) or []) for priority in PRIORITIES}
+        # Bit i of a mask is self.fields[i]
+        self.fields = [field for priority in PRIORITIES for field in self.fields_by_priority[priority]]
+        if len(set(self.fields)) != len(self.fields):
+            raise ValueError("a field is listed under more than one priority")
+        self.priorities = [priority for priority in PRIORITIES for _ in self.fields_by_priority[priority]]
+        self._priority_of = dict(zip(self.fields, self.priorities))
+        self._bits = [(1 << bit, field) for bit, field in enumerate(self.fields)]
+        weights = [float(rules["weights"][priority]) for priority in self.priorities]
+        self.max_score = sum(weights)
+
+        # Completeness: weight sum of each byte of the present mask
+        self._score_tables = [
+            [
+                sum(weights[offset + bit] for bit in range(8) if byte >> bit & 1 and offset + bit < len(weights))
+                for byte in range(256)
+            ]
+            for offset in range(0, len(weights), 8)
+        ]
+
+        # Chips: fields that have a question, in priority order
+        self.questions = dict(rules["questions"])
+        self.chip_limits = {priority: rules["chip_limits"].get(priority) for priority in PRIORITIES}
+        self.max_chips = int(rules["max_chips"])
+        self._chip_masks = {
+            priority: sum(
+                1 << bit
+                for bit, field in enumerate(self.fields)
+                if self.priorities[bit] == priority and field in self.questions
+            )
+            for priority in PRIORITIES
+        }
+
+        tiers = sorted(((float(minimum), label) for label, minimum in rules["project_types"]))
+        self._tier_minimums = [minimum for minimum, _ in tiers]
+        self._tier_labels = [label for _, label in tiers]
+        self.default_project_type = rules["default_project_type"]
+
+    def masks(self, brief: dict[str, Any]) -> tuple[int, int]:
+        """(present, answered) bitmasks of a brief over the scored fields"""
+        present = answered = 0
+        get = brief.get
+        for bit, field in self._bits:
+            value = get(field)
+            if value:
+                # Truthy values are always meaningful
+                answered |= bit
+                present |= bit
+            elif value is not None and value != "" and value != []:
+                present |= bit
+        return present, answered
+
+    def completeness_of(self, present: int) -> int:
+        if not self.max_score:
+            return 0
+        score = 0.0
+        for table in self._score_tables:
+            score += table[present & 0xFF]
+            present >>= 8
+        return int((score / self.max_score) * 100)
+
+    def chip_fields_of(self, answered: int, max_chips: int | None = None) -> list[str]:
+        """Fields to ask about: the first missing ones of each priority, within its limit"""
+        max_chips = self.max_chips if max_chips is None else max_chips
+        chosen: list[str] = []
+        for priority in PRIORITIES:
+            missing = self._chip_masks[priority] & ~answered
+            limit = self.chip_limits[priority]
+            taken = 0
+            while missing and (limit is None or taken < limit) and len(chosen) < max_chips:
+                lowest = missing & -missing
+                chosen.append(self.fields[lowest.bit_length() - 1])
+                missing ^= lowest
+                taken += 1
+        return chosen
+
+    def chips(self, fields: list[str]) -> list[dict[str, str]]:
+        return [
+            {
+                "id": f"chip_{index}",
+                "label": self.questions[field],
+                "field": field,
+                "priority": self._priority_of[field],
+            }
+            for index, field in enumerate(fields)
+        ]
+
+    def project_type(self, budget: Any) -> str | None:
+        budget = budget_value(budget)
+        if budget is None:
+            return None
+        index = bisect.bisect_right(self._tier_minimums, budget) - 1
+        return self._tier_labels[index] if index >= 0 else self.default_project_type
+
+    def completeness(self, brief: dict[str, Any]) -> int:
+        return self.completeness_of(self.masks(brief)[0])
+
+    def suggestion_chips(self, brief: dict[str, Any]) -> list[dict[str, str]]:
+        return self.chips(self.chip_fields_of(self.masks(brief)[1]))
+
+    def score_many(
+        self,
+        briefs: Iterable[tuple[str | None, dict[str, Any]]],
+        max_chips: int | None = None,
+        by_mask: dict[tuple[int, int], tuple[int, list[dict[str, str]]]] | None = None,
+    ) -> list[BriefScore]:
+        """Score a batch, computing each distinct (present, answered) pair once.
+
+        Pass the same ``by_mask`` dict to share results across batches.
+        """
+        by_mask = {} if by_mask is None else by_mask
+        results: list[BriefScore] = []
+        for brief_id, brief in briefs:
+            key = self.masks(brief)
+            scored = by_mask.get(key)
+            if scored is None:
+                scored = (self.completeness_of(key[0]), self.chips(self.chip_fields_of(key[1], max_chips)))
+                by_mask[key] = scored
+            completeness, chips = scored
+            results.append({
+                "id": brief_id,
+                "completeness": completeness,
+                "project_type": self.project_type(brief.get("budget_amount")),
+                "suggestion_chips": chips,
+            })
+        return results
+
+
+def merge_rules(overrides: dict[str, Any]) -> dict[str, Any]:
+    """DEFAULT_RULES with ``overrides`` applied; dict-valued keys merge one level deep"""
+    rules = copy.deepcopy(DEFAULT_RULES)
+    for key, value in overrides.items():
+        if key not in rules:
+            raise ValueError(f"unknown scoring rule {key!r}")
+        if isinstance(rules[key], dict) and isinstance(value, dict):
+            rules[key].update(value)
+        else:
+            rules[key] = value
+    return rules
+
+
+def load_rules(path: str = "") -> ScoringRules:
+    """Rules from a JSON overrides file, or the defaults"""
+    if not path:
+        return ScoringRules(copy.deepcopy(DEFAULT_RULES))
+    with open(path, encoding="utf-8") as f:
+        return ScoringRules(merge_rules(json.load(f)))
+
+
+class RulesLoader:
+    """Current rules, reloaded when the rules file changes"""
+
+    def __init__(self, path: str = SCORING_RULES_PATH):
+        self.path = path
+        self._rules = load_rules()
+        self._mtime: float | None = None
+        self.reloads = 0
+        self.errors = 0
+        self.rescored = 0
+        self.distinct_masks = 0
+
+    def get(self) -> ScoringRules:
+        if not self.path:
+            return self._rules
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._mtime is not None or not self.errors:
+                self.errors += 1
+                logger.warning("scoring rules file unavailable", extra=log_fields(path=self.path, error=str(e)))
+                self._mtime = None
+            return self._rules
+        if mtime != self._mtime:
+            self._mtime = mtime
+            try:
+                self._rules = load_rules(self.path)
+                self.reloads += 1
+                logger.info("scoring rules loaded", extra=log_fields(path=self.path))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Keep scoring with the previous rules
+                self.errors += 1
+                logger.warning("invalid scoring rules", extra=log_fields(path=self.path, error=str(e)))
+        return self._rules
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "custom_rules": bool(self.path),
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "briefs_rescored": self.rescored,
+            "distinct_masks": self.distinct_masks,
+        }
+
+
+# Process-wide rules
+rules_loader = RulesLoader()
+
+
+def scoring_rules() -> ScoringRules:
+    """The rules currently in force"""
+    return rules_loader.get()
+
+
+async def iter_rescored(
+    briefs: Iterable[tuple[str | None, dict[str, Any]]],
+    max_chips: int | None = None,
+    batch_size: int = RESCORE_BATCH_SIZE,
+) -> AsyncIterator[BriefScore]:
+    """Rescore briefs under the current rules, yielding results batch by batch"""
+    rules = scoring_rules()
+    by_mask: dict[tuple[int, int], tuple[int, list[dict[str, str]]]] = {}
+    batch: list[tuple[str | None, dict[str, Any]]] = []
+    for item in briefs:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            for result in rules.score_many(batch, max_chips, by_mask):
+                yield result
+            rules_loader.rescored += len(batch)
+            batch = []
+            # Let other requests run between batches
+            await asyncio.sleep(0)
+    for result in rules.score_many(batch, max_chips, by_mask):
+        yield result
+    rules_loader.rescored += len(batch)
+    rules_loader.distinct_masks += len(by_mask)
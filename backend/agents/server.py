@@ -0,0 +1,224 @@
+"""
+Server launch modes
+
+SERVER_MODE selects how ``python main.py`` serves the app:
+- "dev": one uvicorn process with auto-reload (the default)
+- "prod": SERVER_WORKERS processes (default: one per core) forked from a
+  parent that has already imported the app, so the graph is compiled and the
+  LLM clients are built once, before the fork, instead of in every worker.
+  The workers share one listening socket; the parent restarts workers that
+  die and forwards SIGTERM/SIGINT to them.
+
+On SIGTERM a worker keeps serving but reports not ready on /ready for
+SHUTDOWN_DRAIN_SECONDS so the load balancer stops routing to it, then stops
+accepting connections and gives in-flight runs up to SHUTDOWN_GRACE_SECONDS.
+
+Workers share no memory after the fork, so thread state has to live in a
+cross-process store: with more than one worker the SQLite checkpointer is
+used unless CHECKPOINTER is set explicitly, and project invalidations and the
+latest run per thread go through the shared store (agents.shared_state). The
+remaining per-worker state is listed in backend/README.md.
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+import uvicorn
+
+from . import checkpointer
+from .observability import get_logger, log_fields
+from .shared_state import shared_state
+
+SERVER_MODE = os.getenv("SERVER_MODE", "dev").lower()
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0")) or os.cpu_count() or 1
+# Seconds /ready reports draining before the listener closes
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "5"))
+# Seconds in-flight requests get to finish once the listener is closed
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "30"))
+
+# uvicorn's exit code when the app fails to start
+STARTUP_FAILURE = 3
+# Minimum seconds between restarts of a crashed worker
+RESTART_BACKOFF_SECONDS = 1.0
+
+logger = get_logger(__name__)
+
+# Index of this worker process (None when not forked by serve_prefork)
+WORKER_INDEX: int | None = None
+
+
+def is_primary_worker() -> bool:
+    """True in a single-process server and in worker 0; runs process-wide chores"""
+    return WORKER_INDEX in {None, 0}
+
+
+class Readiness:
+    """Whether this process should receive traffic"""
+
+    def __init__(self):
+        self.started = False
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return self.started and not self.draining
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "started": self.started,
+            "draining": self.draining,
+            "mode": SERVER_MODE,
+            "worker": WORKER_INDEX,
+            "pid": os.getpid(),
+        }
+
+
+# Process-wide readiness flags, set by the app lifespan and the drain
+readiness = Readiness()
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that reports not ready for a while before shutting down"""
+
+    def handle_exit(self, sig: int, frame) -> None:
+        if readiness.draining or SHUTDOWN_DRAIN_SECONDS <= 0:
+            # A second signal (or no drain period) shuts down right away
+            readiness.draining = True
+            super().handle_exit(sig, frame)
+            return
+        readiness.draining = True
+        logger.info("draining", extra=log_fields(worker=WORKER_INDEX, seconds=SHUTDOWN_DRAIN_SECONDS))
+        timer = threading.Timer(SHUTDOWN_DRAIN_SECONDS, super().handle_exit, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+
+def _use_shared_checkpointer(workers: int) -> None:
+    if workers <= 1 or checkpointer.CHECKPOINTER != "memory":
+        return
+    if "CHECKPOINTER" in os.environ:
+        logger.warning(
+            "in-memory checkpointer with several workers: threads need sticky sessions",
+            extra=log_fields(workers=workers),
+        )
+        return
+    checkpointer.CHECKPOINTER = "sqlite"
+    # Inherited by workers that import the app themselves (no fork)
+    os.environ["CHECKPOINTER"] = "sqlite"
+
+
+def _use_shared_state(workers: int) -> None:
+    if workers <= 1:
+        return
+    shared_state.enable()
+    # Inherited by workers that import the app themselves (no fork)
+    os.environ["SHARED_STATE"] = "true"
+
+
+def _run_worker(config: uvicorn.Config, sock: socket.socket, index: int) -> None:
+    """Body of a forked worker; never returns"""
+    global WORKER_INDEX
+    WORKER_INDEX = index
+    code = 1
+    try:
+        # Don't run the parent's forwarding handlers if uvicorn re-raises a signal
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        server = DrainingServer(config)
+        server.run(sockets=[sock])
+        code = 0 if server.started else STARTUP_FAILURE
+    except BaseException:
+        logger.exception("worker failed", extra=log_fields(worker=index))
+    finally:
+        os._exit(code)
+
+
+def serve_prefork(app: Any, host: str, port: int, workers: int) -> int:
+    """Serve ``app`` from ``workers`` forked processes; returns the exit code"""
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        proxy_headers=True,
+        timeout_graceful_shutdown=SHUTDOWN_GRACE_SECONDS,
+    )
+    sock = config.bind_socket()
+    children: dict[int, int] = {}
+    stopping = False
+    exit_code = 0
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(config, sock, index)
+        children[pid] = index
+
+    def stop(sig: int, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for index in range(workers):
+        spawn(index)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("serving", extra=log_fields(mode="prod", workers=workers, host=host, port=port))
+
+    last_restart = 0.0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code == STARTUP_FAILURE:
+            logger.error("worker failed to start, shutting down", extra=log_fields(worker=index))
+            exit_code = STARTUP_FAILURE
+            stop(signal.SIGTERM, None)
+            continue
+        logger.warning("worker exited, restarting", extra=log_fields(worker=index, code=code))
+        time.sleep(max(0.0, last_restart + RESTART_BACKOFF_SECONDS - time.monotonic()))
+        last_restart = time.monotonic()
+        spawn(index)
+
+    sock.close()
+    return exit_code
+
+
+def serve(app: Any, app_path: str, preload: Callable[[], None] | None = None) -> int:
+    """Run the server in the configured mode; ``app_path`` is used for reloads"""
+    port = int(os.getenv("PORT", 8000))
+    if SERVER_MODE != "prod":
+        uvicorn.run(app_path, host=SERVER_HOST, port=port, reload=True)
+        return 0
+
+    workers = max(1, SERVER_WORKERS)
+    _use_shared_checkpointer(workers)
+    _use_shared_state(workers)
+    if preload is not None:
+        preload()
+    if not hasattr(os, "fork"):
+        # No fork on this platform: workers import the app themselves
+        uvicorn.run(
+            app_path,
+            host=SERVER_HOST,
+            port=port,
+            workers=workers,
+            proxy_headers=True,
+            timeout_graceful_shutdown=SHUTDOWN_GRACE_SECONDS,
+        )
+        return 0
+    return serve_prefork(app, SERVER_HOST, port, workers)
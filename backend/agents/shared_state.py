@@ -0,0 +1,220 @@
+"""
+State shared by the workers of a prefork server
+
+Each prefork worker has its own memory, so per-process registries disagree
+as soon as a thread's requests land on different workers. Two kinds of
+state have to be seen by every worker to stay correct:
+
+- Project invalidations: POST /cache/projects/{id}/invalidate reaches one
+  worker, but every worker may hold the project in its ProjectCache. The
+  invalidation time is recorded here; each worker polls for new ones at most
+  every SHARED_STATE_POLL_INTERVAL seconds and drops a cached project
+  fetched before its invalidation on its next lookup.
+- Latest run per thread: a run claims a fresh run id for its thread; a run
+  whose id is no longer the latest refuses to commit its state
+  (cancellation.ensure_latest), whichever worker started the newer run.
+
+The store is a SQLite file in WAL mode (SHARED_STATE_DB). It is off in a
+single process, where the in-process registries are authoritative, and
+turned on by server.serve() when it starts more than one worker. Each
+process opens its own connection, so a connection is never shared across a
+fork. Every query runs in a worker thread (asyncio.to_thread), so a worker
+waiting on another's write lock never stalls its event loop. A failing store
+is logged and treated as empty: the worker falls back to its own view rather
+than failing the request.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, TypeVar
+
+from .observability import get_logger, log_fields
+
+SHARED_STATE = os.getenv("SHARED_STATE", "false").lower() in {"1", "true", "yes"}
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "shared_state.db")
+# Seconds a thread's latest run id is kept after it was claimed
+SHARED_STATE_RUN_TTL = float(os.getenv("SHARED_STATE_RUN_TTL", str(24 * 3600)))
+# Seconds between a worker's polls for project invalidations made by the others
+SHARED_STATE_POLL_INTERVAL = float(os.getenv("SHARED_STATE_POLL_INTERVAL", "1"))
+
+# Expired run ids are pruned every this many claims
+PRUNE_EVERY = 100
+# Each poll re-reads invalidations this many seconds older than the previous poll,
+# so a write committed just after it (with an earlier timestamp) isn't missed
+POLL_OVERLAP = 5.0
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SharedState:
+    """Project invalidations and latest run per thread, in a file all workers open"""
+
+    def __init__(
+        self,
+        db_path: str = SHARED_STATE_DB,
+        enabled: bool = SHARED_STATE,
+        poll_interval: float = SHARED_STATE_POLL_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self._db: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        # One query at a time on the connection, whichever thread runs it
+        self._lock = threading.Lock()
+        # project_id -> invalidated_at, as of the last poll
+        self._invalidated: dict[str, float] = {}
+        self._polled_at: float | None = None
+        self._polled_since = 0.0
+        self.invalidations = 0
+        self.claims = 0
+        self.polls = 0
+        self.errors = 0
+
+    def enable(self) -> None:
+        """Use the shared store in this process and the workers forked from it"""
+        self.enabled = True
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection inherited across fork must not be used by the child
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            self._pid = os.getpid()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS project_invalidations ("
+                " project_id TEXT PRIMARY KEY,"
+                " invalidated_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS thread_runs ("
+                " thread_id TEXT PRIMARY KEY,"
+                " run_id TEXT NOT NULL,"
+                " claimed_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _failed(self, operation: str, error: sqlite3.Error) -> None:
+        self.errors += 1
+        logger.warning("shared state unavailable", extra=log_fields(operation=operation, error=str(error)))
+
+    async def _query(self, operation: str, query: Callable[[sqlite3.Connection], T]) -> T | None:
+        """Run ``query`` on this process's connection in a worker thread; None if it failed"""
+
+        def run() -> T:
+            with self._lock:
+                return query(self._connect())
+
+        try:
+            return await asyncio.to_thread(run)
+        except sqlite3.Error as e:
+            self._failed(operation, e)
+            return None
+
+    async def invalidate_project(self, project_id: str) -> None:
+        """Record that every worker's cached copy of a project is stale as of now"""
+        if not self.enabled:
+            return
+        self.invalidations += 1
+        invalidated_at = time.time()
+        self._invalidated[project_id] = invalidated_at
+
+        def write(db: sqlite3.Connection) -> None:
+            db.execute(
+                "INSERT OR REPLACE INTO project_invalidations (project_id, invalidated_at) VALUES (?, ?)",
+                (project_id, invalidated_at),
+            )
+            db.commit()
+
+        await self._query("invalidate_project", write)
+
+    async def refresh_invalidations(self) -> None:
+        """Pick up invalidations made by other workers, at most once per poll interval"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if self._polled_at is not None and now - self._polled_at < self.poll_interval:
+            return
+        # Set before awaiting so concurrent lookups don't poll too
+        self._polled_at = now
+        self.polls += 1
+        since = self._polled_since
+        self._polled_since = time.time() - POLL_OVERLAP
+
+        def read(db: sqlite3.Connection) -> list[tuple[str, float]]:
+            return db.execute(
+                "SELECT project_id, invalidated_at FROM project_invalidations WHERE invalidated_at >= ?",
+                (since,),
+            ).fetchall()
+
+        rows = await self._query("refresh_invalidations", read)
+        if rows is None:
+            # Read everything again on the next poll
+            self._polled_since = since
+            return
+        for project_id, invalidated_at in rows:
+            if invalidated_at > self._invalidated.get(project_id, 0.0):
+                self._invalidated[project_id] = invalidated_at
+
+    def project_invalidated_at(self, project_id: str) -> float | None:
+        """Wall-clock time of the project's last invalidation by any worker, as of the last poll"""
+        if not self.enabled:
+            return None
+        return self._invalidated.get(project_id)
+
+    async def claim_run(self, thread_id: str) -> str | None:
+        """Make a new run the latest on its thread; returns its run id"""
+        if not self.enabled:
+            return None
+        self.claims += 1
+        run_id = uuid.uuid4().hex
+        now = time.time()
+        prune = self.claims % PRUNE_EVERY == 0
+
+        def write(db: sqlite3.Connection) -> str:
+            # Claims of one worker may reach the store out of order; the later start wins
+            db.execute(
+                "INSERT INTO thread_runs (thread_id, run_id, claimed_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(thread_id) DO UPDATE SET run_id = excluded.run_id, claimed_at = excluded.claimed_at"
+                " WHERE excluded.claimed_at >= thread_runs.claimed_at",
+                (thread_id, run_id, now),
+            )
+            if prune:
+                db.execute("DELETE FROM thread_runs WHERE claimed_at < ?", (now - SHARED_STATE_RUN_TTL,))
+            db.commit()
+            return run_id
+
+        return await self._query("claim_run", write)
+
+    async def latest_run(self, thread_id: str) -> str | None:
+        """Run id of the thread's latest run, on any worker"""
+        if not self.enabled:
+            return None
+
+        def read(db: sqlite3.Connection) -> str | None:
+            row = db.execute("SELECT run_id FROM thread_runs WHERE thread_id = ?", (thread_id,)).fetchone()
+            return row[0] if row else None
+
+        return await self._query("latest_run", read)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "invalidations": self.invalidations,
+            "claims": self.claims,
+            "polls": self.polls,
+            "cached_invalidations": len(self._invalidated),
+            "errors": self.errors,
+        }
+
+
+# Process-wide shared state handle
+shared_state = SharedState()
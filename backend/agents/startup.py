@@ -0,0 +1,105 @@
+"""
+Startup profiling
+
+Cold start on a fresh container is mostly imports. main.py imports the
+modules the served agent needs through import_modules() so each one is
+timed separately, and defers the rest (the graph module and everything it
+pulls in, the provider SDK, graph compilation, LLM clients) to a warm-up
+that runs in the app lifespan with STARTUP_EAGER_WARM=true, before the fork
+in prod mode, or otherwise on the first agent run.
+
+startup_report keeps, per process, the import time of each of those
+modules, the duration of each warm-up stage and the time until the app was
+ready. It is logged once when the app is ready, served on /startup and
+exported on /metrics, so an import that got slower shows up on deploy.
+
+Standard library only: it is imported before anything it measures.
+"""
+
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Iterable, Iterator
+
+# Warm up in the app lifespan (slower start, no first-request penalty)
+STARTUP_EAGER_WARM = os.getenv("STARTUP_EAGER_WARM", "false").lower() in {"1", "true", "yes"}
+
+
+class StartupReport:
+    """Import and warm-up timings of this process"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports: dict[str, float] = {}
+        self.stages: dict[str, float] = {}
+        self.ready_seconds: float | None = None
+        self.warmed = False
+
+    def import_module(self, name: str) -> ModuleType:
+        """Import ``name``, recording its time if this is the first import"""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports[name] = time.perf_counter() - started
+        return module
+
+    def import_modules(self, names: Iterable[str]) -> None:
+        """Import in order, so each time excludes what the earlier ones loaded"""
+        for name in names:
+            self.import_module(name)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a startup stage; only its first run is recorded"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.setdefault(name, time.perf_counter() - started)
+
+    def mark(self, name: str) -> None:
+        """Record a point in time as a stage measured from process start"""
+        self.stages.setdefault(name, time.perf_counter() - self.started)
+
+    def mark_ready(self) -> None:
+        if self.ready_seconds is None:
+            self.ready_seconds = time.perf_counter() - self.started
+
+    def report(self) -> dict[str, Any]:
+        """Per-module import and per-stage times in milliseconds, slowest first"""
+        def ms(values: dict[str, float]) -> dict[str, float]:
+            ordered = sorted(values.items(), key=lambda item: item[1], reverse=True)
+            return {name: round(seconds * 1000, 1) for name, seconds in ordered}
+
+        return {
+            "eager_warm": STARTUP_EAGER_WARM,
+            "warmed": self.warmed,
+            "ready_ms": round(self.ready_seconds * 1000, 1) if self.ready_seconds is not None else None,
+            "imports_ms": ms(self.imports),
+            "stages_ms": ms(self.stages),
+            "modules_loaded": len(sys.modules),
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Flat view of report() for the metrics collector"""
+        report = self.report()
+        return {
+            "ready_ms": report["ready_ms"],
+            "modules_loaded": report["modules_loaded"],
+            **{f"import_{name.replace('.', '_')}_ms": value for name, value in report["imports_ms"].items()},
+            **{f"stage_{name}_ms": value for name, value in report["stages_ms"].items()},
+        }
+
+    def log(self) -> None:
+        from .observability import get_logger, log_fields
+
+        get_logger(__name__).info("startup", extra=log_fields(**self.report()))
+
+
+# Process-wide startup timings
+startup_report = StartupReport()
@@ -0,0 +1,142 @@
+"""
+Delta state sync for the AG-UI endpoint
+
+With STATE_SYNC_MODE=delta, every STATE_SNAPSHOT event the LangGraph agent
+produces (intermediate emits while streaming and the final output state) is
+forwarded as an RFC 6902 STATE_DELTA against the state the client already
+has: the run's input state, then each state sent since. The node's own
+``brief_patch`` (built from ``field_updates``) is used for extracted_brief
+when it reproduces the new brief exactly; otherwise the brief is diffed.
+A snapshot is still sent when there is no baseline or it is smaller.
+
+Bytes per turn for full snapshots and for what was actually sent are
+tracked in /state/stats so the saving can be checked in production.
+"""
+
+import copy
+import os
+from typing import Any
+
+from ag_ui.core import EventType, StateDeltaEvent
+from copilotkit import LangGraphAGUIAgent
+
+from .json_patch import JSONPatchError, apply_patch, encoded_size, make_patch
+from .observability import get_logger, log_fields
+
+# "full" sends a STATE_SNAPSHOT per update (default), "delta" sends STATE_DELTA patches
+STATE_SYNC_MODE = os.getenv("STATE_SYNC_MODE", "full").lower()
+
+# Node output key carrying the turn's patch of extracted_brief
+BRIEF_PATCH_KEY = "brief_patch"
+BRIEF_PATH = "/extracted_brief"
+
+logger = get_logger(__name__)
+
+
+class SyncStats:
+    """State event bytes: what full snapshots would cost vs what was sent"""
+
+    def __init__(self):
+        self.runs = 0
+        self.snapshots = 0
+        self.deltas = 0
+        self.node_patches = 0
+        self.full_bytes = 0
+        self.sent_bytes = 0
+
+    def record(self, full_bytes: int, sent_bytes: int, delta: bool) -> None:
+        self.full_bytes += full_bytes
+        self.sent_bytes += sent_bytes
+        if delta:
+            self.deltas += 1
+        else:
+            self.snapshots += 1
+
+    def stats(self) -> dict[str, Any]:
+        runs = max(1, self.runs)
+        return {
+            "mode": STATE_SYNC_MODE,
+            "runs": self.runs,
+            "snapshots_sent": self.snapshots,
+            "deltas_sent": self.deltas,
+            "node_patches_used": self.node_patches,
+            "full_bytes": self.full_bytes,
+            "sent_bytes": self.sent_bytes,
+            "full_bytes_per_turn": round(self.full_bytes / runs, 1),
+            "sent_bytes_per_turn": round(self.sent_bytes / runs, 1),
+            "saving_ratio": round(1 - self.sent_bytes / self.full_bytes, 4) if self.full_bytes else 0.0,
+        }
+
+
+# Process-wide state sync counters
+sync_stats = SyncStats()
+
+
+def state_delta(baseline: dict[str, Any], snapshot: dict[str, Any]) -> tuple[list[dict[str, Any]], bool]:
+    """Operations turning ``baseline`` into ``snapshot`` and whether the node's patch was used"""
+    node_patch = snapshot.get(BRIEF_PATCH_KEY)
+    if node_patch == baseline.get(BRIEF_PATCH_KEY):
+        # Left over from an earlier turn; this update didn't produce one
+        node_patch = None
+    old = {key: value for key, value in baseline.items() if key != BRIEF_PATCH_KEY}
+    new = {key: value for key, value in snapshot.items() if key != BRIEF_PATCH_KEY}
+
+    old_brief, new_brief = old.get("extracted_brief"), new.get("extracted_brief")
+    if node_patch and isinstance(old_brief, dict) and isinstance(new_brief, dict):
+        try:
+            patched = apply_patch({"extracted_brief": old_brief}, node_patch)["extracted_brief"]
+        except (JSONPatchError, KeyError, TypeError):
+            patched = None
+        if patched == new_brief:
+            rest = make_patch(
+                {key: value for key, value in old.items() if key != "extracted_brief"},
+                {key: value for key, value in new.items() if key != "extracted_brief"},
+            )
+            return list(node_patch) + rest, True
+    return make_patch(old, new), False
+
+
+class DeltaStateAgent(LangGraphAGUIAgent):
+    """LangGraphAGUIAgent that forwards state updates as JSON-patch deltas"""
+
+    async def run(self, input):
+        if STATE_SYNC_MODE != "delta":
+            async for event in super().run(input):
+                if getattr(event, "type", None) == EventType.STATE_SNAPSHOT:
+                    size = encoded_size(event.snapshot)
+                    sync_stats.record(size, size, delta=False)
+                yield event
+            sync_stats.runs += 1
+            return
+
+        baseline = getattr(input, "state", None)
+        baseline = copy.deepcopy(baseline) if isinstance(baseline, dict) and baseline else None
+        async for event in super().run(input):
+            if getattr(event, "type", None) == EventType.STATE_SNAPSHOT and isinstance(event.snapshot, dict):
+                snapshot = event.snapshot
+                event = self._delta_event(baseline, event)
+                baseline = copy.deepcopy(snapshot)
+            yield event
+        sync_stats.runs += 1
+
+    def _delta_event(self, baseline: dict[str, Any] | None, event):
+        """STATE_DELTA for a snapshot event, or the snapshot itself if that is smaller"""
+        full_size = encoded_size(event.snapshot)
+        if baseline is None:
+            sync_stats.record(full_size, full_size, delta=False)
+            return event
+        try:
+            ops, used_node_patch = state_delta(baseline, event.snapshot)
+        except JSONPatchError as e:
+            logger.debug("state delta failed", extra=log_fields(error=str(e)))
+            sync_stats.record(full_size, full_size, delta=False)
+            return event
+
+        delta_size = encoded_size(ops)
+        if delta_size >= full_size:
+            sync_stats.record(full_size, full_size, delta=False)
+            return event
+        if used_node_patch:
+            sync_stats.node_patches += 1
+        sync_stats.record(full_size, delta_size, delta=True)
+        return StateDeltaEvent(type=EventType.STATE_DELTA, delta=ops)
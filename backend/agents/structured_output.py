@@ -0,0 +1,267 @@
+"""
+Schema-constrained extraction output
+
+The extraction schema is a Pydantic model derived from ExtractedBrief (every
+field optional, plus summary and project_type). A model response is parsed
+in up to three steps:
+
+1. strict: the bare or fenced JSON object
+2. tolerant: common defects are fixed (prose around the object, trailing
+   commas, comments, Python literals, truncation); members that still don't
+   parse and values that fail validation are kept aside as broken fragments
+3. repair: at most EXTRACTION_REPAIR_ATTEMPTS cheap JSON-mode calls that
+   resend only the broken fragments, never the whole brief
+
+Non-streaming calls without tools use the provider's JSON mode
+(STRUCTURED_OUTPUT=json_mode); the streaming, tool-enabled extraction call
+relies on the tolerant parser and the repair pass.
+"""
+
+import asyncio
+import json
+import os
+import re
+from typing import Any, TypedDict, get_type_hints
+
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+
+from .hedging import remaining_budget
+from .json_stream import StreamingJSONObjectParser, parse_json_object
+from .llm_scheduler import llm_scheduler
+from .observability import EXTRACTION_PARSES, EXTRACTION_REPAIRS, get_logger, log_fields
+
+# "json_mode" asks the provider for a JSON object where the call allows it; "off" disables it
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "json_mode").lower()
+EXTRACTION_REPAIR_ATTEMPTS = int(os.getenv("EXTRACTION_REPAIR_ATTEMPTS", "1"))
+# Longest broken fragment sent to the repair call
+REPAIR_FRAGMENT_MAX_CHARS = int(os.getenv("REPAIR_FRAGMENT_MAX_CHARS", "2000"))
+
+OUTCOMES = ("strict", "tolerant", "repaired", "partial", "failed")
+
+logger = get_logger(__name__)
+
+_FRAGMENT_KEY = re.compile(r'^\s*"([^"\\]+)"\s*:')
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def json_mode_enabled() -> bool:
+    return STRUCTURED_OUTPUT == "json_mode"
+
+
+def build_extraction_model(brief_type: type, exclude: tuple[str, ...] = ("completeness",)) -> type[BaseModel]:
+    """Pydantic model of an extraction response: every brief field optional.
+
+    Fields computed by the backend rather than extracted are left out.
+    """
+    fields: dict[str, Any] = {
+        name: (annotation | None, None)
+        for name, annotation in get_type_hints(brief_type).items()
+        if name not in exclude
+    }
+    fields["summary"] = (str | None, None)
+    fields["project_type"] = (str | None, None)
+    return create_model("ExtractionOutput", __config__=ConfigDict(extra="ignore"), **fields)
+
+
+class ParsedExtraction(TypedDict):
+    """Fields that parsed and validated, and what still needs repair"""
+    fields: dict[str, Any]
+    fragments: list[str]
+    invalid: dict[str, Any]
+    outcome: str
+
+
+def _clean_json(text: str) -> str:
+    """Drop comments and trailing commas and fix Python literals outside strings"""
+    out: list[str] = []
+    i, length = 0, len(text)
+    in_string = escaped = False
+    while i < length:
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            i += 1
+            continue
+        if char == '"':
+            in_string = True
+        elif text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+        elif char == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in {"}", "]"}:
+                i += 1
+                continue
+        elif char.isascii() and char.isalpha():
+            match = re.match(r"[A-Za-z]+", text[i:])
+            word = match.group(0)
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def _tolerant_object(content: str) -> tuple[dict[str, Any], list[str]]:
+    """Best-effort object from a malformed response, plus unparseable fragments"""
+    text = content
+    if "```" in text:
+        # Take the fenced block, even if the closing fence was cut off
+        text = text.split("```", 1)[1]
+        text = text[4:] if text.startswith("json") else text
+        text = text.split("```", 1)[0]
+    start = text.find("{")
+    if start == -1:
+        return {}, []
+    cleaned = _clean_json(text[start:])
+    try:
+        parsed, _ = json.JSONDecoder().raw_decode(cleaned)
+        if isinstance(parsed, dict):
+            return parsed, []
+    except json.JSONDecodeError:
+        pass
+
+    # Keep every member that parses; the rest (and a truncated tail) need repair
+    parser = StreamingJSONObjectParser()
+    parser.feed(cleaned)
+    fragments = list(parser.broken)
+    if parser.pending:
+        fragments.append(parser.pending)
+    return dict(parser.fields), fragments
+
+
+def validate_fields(raw: dict[str, Any], model: type[BaseModel]) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Schema-valid fields, and the raw values of fields that failed validation"""
+    known = {key: value for key, value in raw.items() if key in model.model_fields}
+    try:
+        return model.model_validate(known).model_dump(exclude_unset=True), {}
+    except ValidationError as e:
+        bad = {error["loc"][0] for error in e.errors() if error["loc"]}
+    good = {key: value for key, value in known.items() if key not in bad}
+    return model.model_validate(good).model_dump(exclude_unset=True), {key: known[key] for key in bad}
+
+
+def parse_extraction(content: str, model: type[BaseModel]) -> ParsedExtraction:
+    """Parse and validate one response without calling the LLM"""
+    outcome = "strict"
+    fragments: list[str] = []
+    try:
+        raw = parse_json_object(content)
+    except json.JSONDecodeError:
+        outcome = "tolerant"
+        raw, fragments = _tolerant_object(content)
+    fields, invalid = validate_fields(raw, model)
+    if not fields and not fragments and not invalid:
+        outcome = "failed"
+    return {"fields": fields, "fragments": fragments, "invalid": invalid, "outcome": outcome}
+
+
+def repair_messages(parsed: ParsedExtraction, model: type[BaseModel]) -> list[Any]:
+    """Prompt that resends only the broken fragments, with their field types"""
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    properties = model.model_json_schema().get("properties", {})
+    keys = list(parsed["invalid"])
+    for fragment in parsed["fragments"]:
+        match = _FRAGMENT_KEY.match(fragment)
+        if match:
+            keys.append(match.group(1))
+    # Unidentifiable fragments get the list of field names instead
+    schema = {key: properties[key] for key in dict.fromkeys(keys) if key in properties} or list(properties)
+
+    broken = [fragment[:REPAIR_FRAGMENT_MAX_CHARS] for fragment in parsed["fragments"]]
+    broken += [
+        f"{json.dumps(key)}: {json.dumps(value, default=str)}" for key, value in parsed["invalid"].items()
+    ]
+    return [
+        SystemMessage(content=(
+            "You fix broken JSON. Return one valid JSON object containing only the fields in the "
+            "fragments below, with values converted to the given JSON schema types. Drop a field "
+            "if its value can't be recovered. Output JSON only.\n\n"
+            f"Field schema:\n{json.dumps(schema, separators=(',', ':'))}"
+        )),
+        HumanMessage(content="Fragments:\n" + "\n".join(broken)),
+    ]
+
+
+class ParseStats:
+    """Parse outcomes and repair calls per extraction response"""
+
+    def __init__(self):
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self.repair_calls = 0
+        self.repair_errors = 0
+
+    def record(self, outcome: str, repair_calls: int) -> None:
+        self.outcomes[outcome] += 1
+        self.repair_calls += repair_calls
+        EXTRACTION_PARSES.labels(outcome=outcome).inc()
+        EXTRACTION_REPAIRS.observe(repair_calls)
+
+    def stats(self) -> dict[str, Any]:
+        parses = sum(self.outcomes.values())
+        return {
+            "parses": parses,
+            **{f"outcome_{outcome}": count for outcome, count in self.outcomes.items()},
+            "parse_failure_rate": round(self.outcomes["failed"] / parses, 4) if parses else 0.0,
+            "repair_calls": self.repair_calls,
+            "repair_errors": self.repair_errors,
+            "repairs_per_parse": round(self.repair_calls / parses, 4) if parses else 0.0,
+        }
+
+
+# Process-wide parse counters
+parse_stats = ParseStats()
+
+
+async def parse_extraction_output(content: str, model: type[BaseModel], repair_llm=None) -> dict[str, Any]:
+    """Validated extraction fields, repairing broken fragments with ``repair_llm``.
+
+    Raises json.JSONDecodeError if nothing usable could be recovered.
+    """
+    parsed = parse_extraction(content, model)
+    fields = parsed["fields"]
+    pending = parsed
+    outcome = parsed["outcome"]
+    repair_calls = 0
+
+    while (
+        repair_llm is not None
+        and (pending["fragments"] or pending["invalid"])
+        and repair_calls < EXTRACTION_REPAIR_ATTEMPTS
+    ):
+        repair_calls += 1
+        try:
+            async with asyncio.timeout(remaining_budget()):
+                response = await llm_scheduler.ainvoke(repair_llm, repair_messages(pending, model))
+        except Exception as e:
+            # Includes the turn deadline; keep whatever already parsed
+            parse_stats.repair_errors += 1
+            logger.info("extraction repair failed", extra=log_fields(error=str(e)))
+            break
+        pending = parse_extraction(response.content, model)
+        # The repair only fills in fields that were broken, never overrides good ones
+        fields = {**pending["fields"], **fields}
+
+    if not fields:
+        outcome = "failed"
+    elif pending["fragments"] or pending["invalid"]:
+        outcome = "partial"
+    elif repair_calls:
+        outcome = "repaired"
+    parse_stats.record(outcome, repair_calls)
+    logger.debug("parsed extraction", extra=log_fields(
+        outcome=outcome, fields=len(fields), repair_calls=repair_calls,
+    ))
+
+    if outcome == "failed":
+        raise json.JSONDecodeError("No extraction fields could be parsed", content, 0)
+    return fields
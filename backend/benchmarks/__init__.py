@@ -0,0 +1 @@
+"""Offline benchmarks for the brief analyzer backend (no provider quota, no frontend)."""
@@ -0,0 +1,167 @@
+"""
+Deterministic stand-in for ChatGroq
+
+Produces plausible extraction JSON from simple regexes over the brief text,
+with configurable latency to the first token and a fixed token rate, so the
+backend can be load-tested without spending provider quota.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CHARS_PER_TOKEN = 4
+
+MEDIA_KEYWORDS = ["TV", "Cinema", "Online", "Social", "Radio", "OOH", "POS"]
+COUNTRIES = [
+    "Germany", "Austria", "Switzerland", "France", "Spain", "Italy", "UK",
+    "United Kingdom", "USA", "US", "Netherlands", "Belgium", "Nordics", "Europe",
+    "DACH", "Global", "Worldwide",
+]
+
+
+def _first(pattern: str, text: str, flags: int = re.IGNORECASE | re.MULTILINE) -> str | None:
+    match = re.search(pattern, text, flags)
+    return match.group(1).strip() if match else None
+
+
+def _amount(text: str) -> tuple[float | None, str | None]:
+    match = re.search(
+        r"(€|EUR|\$|USD|£|GBP|CHF)\s?(\d[\d.,]*)\s?(k|K)?|(\d[\d.,]*)\s?(k|K)?\s?(EUR|USD|GBP|CHF|euros?)",
+        text,
+    )
+    if not match:
+        return None, None
+    symbol = match.group(1) or match.group(6) or ""
+    number = (match.group(2) or match.group(4) or "").replace(",", "").replace(".", "")
+    if not number:
+        return None, None
+    amount = float(number) * (1000 if (match.group(3) or match.group(5)) else 1)
+    currency = {"€": "EUR", "$": "USD", "£": "GBP"}.get(symbol, symbol.upper()[:3] or "EUR")
+    return amount, "EUR" if currency == "EUR" or currency.startswith("EUR") else currency
+
+
+def extract_fields(text: str) -> dict[str, Any]:
+    """Regex extraction of the main brief fields"""
+    fields: dict[str, Any] = {}
+    budget, currency = _amount(text)
+    if budget:
+        fields["budget_amount"] = budget
+        fields["budget_currency"] = currency
+    for key, label in (
+        ("client_name", "client"),
+        ("agency_name", "agency"),
+        ("brand_name", "brand"),
+        ("project_title", "campaign"),
+    ):
+        value = _first(rf"^\s*{label}:\s*(.+)$", text)
+        if value:
+            fields[key] = value.strip('"')
+    sender = re.search(r"^From:\s*([^<\n]+?)\s*<([^>\s]+@[^>\s]+)>", text, re.MULTILINE)
+    if sender:
+        fields["brief_sender_name"] = sender.group(1).strip()
+        fields["brief_sender_email"] = sender.group(2).strip()
+    territory = [country for country in COUNTRIES if re.search(rf"\b{re.escape(country)}\b", text)]
+    if territory:
+        fields["territory"] = territory[:6]
+    media = [media for media in MEDIA_KEYWORDS if re.search(rf"\b{media}\b", text)]
+    if media:
+        fields["media_types"] = media
+    lengths = sorted({int(n) for n in re.findall(r"\b(\d{1,3})(?:\"|''|s\b| sec)", text)}, reverse=True)
+    if lengths:
+        fields["video_lengths"] = [f"{n}s" for n in lengths[:5]]
+    term = _first(r"(\d+\s*(?:year|month)s?)\s*licen[cs]e", text)
+    if term:
+        fields["term_length"] = term
+    if re.search(r"exclusiv", text, re.IGNORECASE):
+        fields["exclusivity"] = not re.search(r"non-exclusiv|no exclusiv", text, re.IGNORECASE)
+    deadline = _first(r"(?:deadline|needed by|due)[^\n\d]*(\d{4}-\d{2}-\d{2})", text)
+    if deadline:
+        fields["deadline_date"] = deadline
+    creative = _first(r"CREATIVE DIRECTION:?\s*\n(.+?)(?:\n\s*\n|$)", text, re.IGNORECASE | re.DOTALL)
+    if creative:
+        fields["creative_direction"] = " ".join(creative.split())[:300]
+    return fields
+
+
+def respond(messages: list[BaseMessage]) -> str:
+    """Deterministic response for the backend's prompts"""
+    last = messages[-1].content if messages else ""
+    last = last if isinstance(last, str) else str(last)
+    system = messages[0].content if messages and isinstance(messages[0].content, str) else ""
+
+    if "Answer the question based on the project data" in last:
+        data = _first(r"Project Data:\s*\n(.+?)\n\nUser Question", system, re.DOTALL) or "{}"
+        return f"Here is what I have on file: {data[:300]}"
+
+    user_message = last.rsplit("User message:\n", 1)[-1]
+    if len(user_message) < 200 and "?" in user_message:
+        current = _first(r"Current extracted data:\n(.+?)\n", last, re.DOTALL) or "{}"
+        return json.dumps({"summary": f"Based on the current brief: {current[:200]}"})
+
+    fields = extract_fields(user_message)
+    fields["summary"] = f"I extracted {len(fields)} fields from the brief."
+    return "```json\n" + json.dumps(fields, indent=2) + "\n```"
+
+
+def _usage(messages: list[BaseMessage], text: str) -> dict[str, int]:
+    prompt_tokens = sum(len(str(m.content)) for m in messages) // CHARS_PER_TOKEN
+    completion_tokens = len(text) // CHARS_PER_TOKEN
+    return {
+        "input_tokens": prompt_tokens,
+        "output_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class FakeBriefChatModel(BaseChatModel):
+    """Chat model with configurable latency and token rate"""
+
+    latency: float = 0.3
+    tokens_per_second: float = 250.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-brief"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeBriefChatModel":
+        # Never emits tool calls, so binding is a no-op
+        return self
+
+    def _duration(self, text: str) -> float:
+        tokens = max(1, len(text) // CHARS_PER_TOKEN)
+        return self.latency + tokens / self.tokens_per_second
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = respond(messages)
+        time.sleep(self._duration(text))
+        message = AIMessage(content=text, usage_metadata=_usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = respond(messages)
+        await asyncio.sleep(self._duration(text))
+        message = AIMessage(content=text, usage_metadata=_usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        text = respond(messages)
+        time.sleep(self.latency)
+        for start in range(0, len(text), CHARS_PER_TOKEN):
+            time.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + CHARS_PER_TOKEN]))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        text = respond(messages)
+        await asyncio.sleep(self.latency)
+        pieces = [text[start:start + CHARS_PER_TOKEN] for start in range(0, len(text), CHARS_PER_TOKEN)]
+        for index, piece in enumerate(pieces):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            usage = _usage(messages, text) if index == len(pieces) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
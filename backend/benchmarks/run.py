@@ -0,0 +1,315 @@
+"""
+Offline benchmark for the brief analyzer
+
+Replays the sample briefs in reference/sample-briefs plus scripted follow-up
+turns against a stub LLM (benchmarks.fake_llm) and a stub frontend API
+(benchmarks.stub_frontend), at one or more concurrency levels. Reports
+p50/p95/p99 turn latency, turns/sec and peak RSS, and can save a JSON
+baseline and compare later runs against it.
+
+Usage (from backend/):
+    python -m benchmarks.run --concurrency 1,8,32
+    python -m benchmarks.run --workers 1,2,4 --skip-bulk
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_BRIEFS_DIR = BACKEND_DIR.parent / "reference" / "sample-briefs"
+
+# Follow-up turns replayed after each brief paste
+FOLLOW_UPS = [
+    "change the budget to 45k",
+    "set territory to Germany and Austria",
+    "what's the budget?",
+    "who is the client?",
+]
+
+# Opening turn on an empty brief, which goes through the project lookup
+OPENING_QUESTION = "what do we know about this project so far?"
+
+_RAW_BRIEF = re.compile(r"## Raw Brief Text\s*```[^\n]*\n(.*?)```", re.DOTALL)
+
+
+def load_sample_briefs(directory: Path = SAMPLE_BRIEFS_DIR) -> list[str]:
+    """Raw brief text from each sample markdown file"""
+    briefs = []
+    for path in sorted(directory.glob("*.md")):
+        match = _RAW_BRIEF.search(path.read_text(encoding="utf-8"))
+        if match:
+            briefs.append(match.group(1).strip())
+    return briefs
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies_ms: list[float], elapsed: float, errors: int) -> dict[str, Any]:
+    return {
+        "turns": len(latencies_ms),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies_ms, 50), 1),
+        "p95_ms": round(percentile(latencies_ms, 95), 1),
+        "p99_ms": round(percentile(latencies_ms, 99), 1),
+        "mean_ms": round(statistics.fmean(latencies_ms), 1) if latencies_ms else 0.0,
+        "turns_per_sec": round(len(latencies_ms) / elapsed, 2) if elapsed else 0.0,
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+def reset_caches() -> None:
+    """Start every run cold so results don't depend on run order"""
+    from agents.brief_index import brief_index
+    from agents.extraction_cache import extraction_cache
+    from agents.project_cache import project_cache
+
+    extraction_cache.clear()
+    project_cache.clear()
+    brief_index.clear()
+
+
+async def run_conversation(graph, brief: str) -> tuple[list[float], int]:
+    """One thread: an opening question, the brief paste, then follow-ups"""
+    from langchain_core.messages import HumanMessage
+
+    thread_id = f"project:{uuid.uuid4()}"
+    config = {"configurable": {"thread_id": thread_id}}
+    latencies, errors = [], 0
+    for message in [OPENING_QUESTION, brief, *FOLLOW_UPS]:
+        started = time.perf_counter()
+        try:
+            await graph.ainvoke(
+                {"messages": [HumanMessage(content=message)], "copilotkit": {"threadId": thread_id}},
+                config=config,
+            )
+        except Exception as e:
+            errors += 1
+            print(f"turn failed: {e!r}", file=sys.stderr)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, errors
+
+
+async def run_conversations(graph, briefs: list[str], concurrency: int) -> tuple[list[float], int]:
+    """Every brief's conversation with at most ``concurrency`` threads active"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(brief: str):
+        async with semaphore:
+            return await run_conversation(graph, brief)
+
+    results = await asyncio.gather(*(one(brief) for brief in briefs))
+    latencies = [ms for turn_latencies, _ in results for ms in turn_latencies]
+    return latencies, sum(errors for _, errors in results)
+
+
+def _worker_conversations(job: tuple[list[str], int]) -> tuple[list[float], int]:
+    """Pool worker: runs its share of conversations on the graph imported before the fork"""
+    from agents.brief_analyzer import get_brief_analyzer_graph
+
+    briefs, concurrency = job
+    return asyncio.run(run_conversations(get_brief_analyzer_graph(), briefs, concurrency))
+
+
+async def run_graph_level(
+    graph, briefs: list[str], concurrency: int, repeat: int, workers: int = 1
+) -> dict[str, Any]:
+    """Replay ``repeat`` copies of every brief with at most ``concurrency`` threads active per worker.
+
+    With several workers, conversations are split across forked processes the
+    way SERVER_MODE=prod splits them, each keeping a whole thread.
+    """
+    reset_caches()
+    conversations = briefs * repeat
+    if workers <= 1:
+        started = time.perf_counter()
+        latencies, errors = await run_conversations(graph, conversations, concurrency)
+        elapsed = time.perf_counter() - started
+        return {"workers": 1, "concurrency": concurrency, **summarize(latencies, elapsed, errors)}
+
+    jobs = [(conversations[index::workers], concurrency) for index in range(workers)]
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        started = time.perf_counter()
+        results = await asyncio.to_thread(pool.map, _worker_conversations, jobs)
+        elapsed = time.perf_counter() - started
+    latencies = [ms for worker_latencies, _ in results for ms in worker_latencies]
+    errors = sum(errors for _, errors in results)
+    return {"workers": workers, "concurrency": concurrency, **summarize(latencies, elapsed, errors)}
+
+
+async def run_bulk_level(app, briefs: list[str], concurrency: int, repeat: int) -> dict[str, Any]:
+    """Drive POST /briefs/bulk through the FastAPI app in-process"""
+    import httpx
+
+    reset_caches()
+    payload = {
+        "briefs": [{"id": str(i), "text": text} for i, text in enumerate(briefs * repeat)],
+        "concurrency": concurrency,
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        health = await client.get("/health")
+        health.raise_for_status()
+
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        async with client.stream("POST", "/briefs/bulk", json=payload, timeout=None) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("ok"):
+                    latencies.append(float(item.get("latency_ms", 0)))
+                else:
+                    errors += 1
+        elapsed = time.perf_counter() - started
+    return {"concurrency": concurrency, **summarize(latencies, elapsed, errors)}
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Regressions of p95 latency or throughput beyond ``tolerance``"""
+    regressions = []
+    for suite in ("graph", "bulk"):
+        previous = {(run.get("workers", 1), run["concurrency"]): run for run in baseline.get(suite, [])}
+        for run in current.get(suite, []):
+            before = previous.get((run.get("workers", 1), run["concurrency"]))
+            if not before:
+                continue
+            label = f"{suite} w={run.get('workers', 1)} c={run['concurrency']}"
+            if before["p95_ms"] and run["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{label}: p95 {before['p95_ms']} -> {run['p95_ms']} ms")
+            if before["turns_per_sec"] and run["turns_per_sec"] < before["turns_per_sec"] * (1 - tolerance):
+                regressions.append(
+                    f"{label}: throughput {before['turns_per_sec']} -> {run['turns_per_sec']} turns/s"
+                )
+    return regressions
+
+
+def print_table(title: str, runs: list[dict[str, Any]]) -> None:
+    print(f"\n{title}")
+    print(f"{'wrk':>4} {'conc':>5} {'turns':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'turns/s':>8}")
+    for run in runs:
+        print(
+            f"{run.get('workers', 1):>4} {run['concurrency']:>5} {run['turns']:>6} {run['errors']:>4} "
+            f"{run['p50_ms']:>8} {run['p95_ms']:>8} {run['p99_ms']:>8} {run['turns_per_sec']:>8}"
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument(
+        "--workers", default="1", help="comma-separated worker process counts for the graph suite"
+    )
+    parser.add_argument("--repeat", type=int, default=2, help="copies of each sample brief per level")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="stub LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="stub LLM output rate")
+    parser.add_argument("--frontend-latency", type=float, default=0.02, help="stub project API latency (s)")
+    parser.add_argument("--briefs-dir", type=Path, default=SAMPLE_BRIEFS_DIR)
+    parser.add_argument("--skip-bulk", action="store_true", help="skip the /briefs/bulk suite")
+    parser.add_argument("--baseline", type=Path, help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", type=Path, help="write results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed regression fraction")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    # Keep provider keys and a local frontend out of the measurement
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.setdefault("BRIEF_INDEX_DB", "")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from agents.http_client import FRONTEND_API_URL, install_http_client
+    from agents.llm_registry import llm_registry
+
+    from .fake_llm import FakeBriefChatModel
+    from .stub_frontend import stub_client
+
+    llm_registry.set_factory(
+        lambda model, temperature: FakeBriefChatModel(
+            latency=args.llm_latency, tokens_per_second=args.tokens_per_second
+        )
+    )
+    install_http_client(stub_client(FRONTEND_API_URL, args.frontend_latency))
+
+    from agents.brief_analyzer import get_brief_analyzer_graph
+    from agents.checkpointer import process_rss_bytes
+
+    brief_analyzer_graph = get_brief_analyzer_graph()
+
+    briefs = load_sample_briefs(args.briefs_dir)
+    if not briefs:
+        print(f"no sample briefs found in {args.briefs_dir}", file=sys.stderr)
+        return 2
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+
+    results: dict[str, Any] = {
+        "config": {
+            "briefs": len(briefs),
+            "repeat": args.repeat,
+            "llm_latency": args.llm_latency,
+            "tokens_per_second": args.tokens_per_second,
+            "frontend_latency": args.frontend_latency,
+            "workers": worker_counts,
+        },
+        "graph": [],
+        "bulk": [],
+    }
+    for workers in worker_counts:
+        for level in levels:
+            results["graph"].append(
+                await run_graph_level(brief_analyzer_graph, briefs, level, args.repeat, workers)
+            )
+    print_table("graph turns (ms)", results["graph"])
+
+    if not args.skip_bulk:
+        from main import app
+
+        for level in levels:
+            results["bulk"].append(await run_bulk_level(app, briefs, level, args.repeat))
+        print_table("POST /briefs/bulk items (ms)", results["bulk"])
+
+    results["peak_rss_bytes"] = process_rss_bytes()
+    print(f"\npeak RSS: {results['peak_rss_bytes'] / 1024 / 1024:.1f} MiB")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nregressions vs baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nno regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,62 @@
+"""
+Stub of the Next.js /api/projects/{id} endpoint
+
+Served through httpx.MockTransport so project lookups exercise the real
+pooled client, cache and response parsing without a running frontend.
+"""
+
+import asyncio
+import hashlib
+import re
+
+import httpx
+
+CLIENTS = ["BMW AG", "Lufthansa", "Netflix", "Aldi Süd", "Moncler", "Brewdog"]
+TERRITORIES = [["Global"], ["Germany", "Austria"], ["UK"], ["France", "Spain"]]
+
+_PROJECT_PATH = re.compile(r"^/api/projects/([^/]+)$")
+
+
+def stub_project(project_id: str) -> dict:
+    """Deterministic project row in the tf_cases/tf_briefs shape"""
+    seed = int(hashlib.sha256(project_id.encode()).hexdigest()[:8], 16)
+    client = CLIENTS[seed % len(CLIENTS)]
+    return {
+        "id": project_id,
+        "case_number": 1000 + seed % 9000,
+        "project_type": "A" if seed % 3 == 0 else "B",
+        "status": "brief_received",
+        "tf_briefs": [
+            {
+                "project_title": f"{client} Campaign",
+                "client": client,
+                "agency": "Serviceplan",
+                "brand": client.split()[0],
+                "budget_min": float(25_000 + (seed % 20) * 5_000),
+                "territory": TERRITORIES[seed % len(TERRITORIES)],
+                "media": ["TV", "Online"],
+                "term": "1 year",
+                "exclusivity": bool(seed % 2),
+                "mood": "Uplifting, modern",
+                "lengths": ["30s", "15s"],
+            }
+        ],
+    }
+
+
+def stub_transport(latency: float = 0.02) -> httpx.MockTransport:
+    """Transport answering project lookups after ``latency`` seconds"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        match = _PROJECT_PATH.match(request.url.path)
+        if request.method != "GET" or not match:
+            return httpx.Response(404, json={"error": "Not found"})
+        return httpx.Response(200, json=stub_project(match.group(1)))
+
+    return httpx.MockTransport(handler)
+
+
+def stub_client(base_url: str, latency: float = 0.02) -> httpx.AsyncClient:
+    """AsyncClient wired to the stub transport"""
+    return httpx.AsyncClient(base_url=base_url, transport=stub_transport(latency))
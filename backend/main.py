@@ -4,8 +4,11 @@ TF Project Builder Backend
 FastAPI server with CopilotKit AG-UI integration for the brief analyzer agent.
 """
 
+import asyncio
+import json
 import os
 import warnings
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Suppress Pydantic warnings
@@ -14,20 +17,148 @@ warnings.filterwarnings("ignore", message="Valid config keys have changed in V2"
 # Load environment variables
 load_dotenv()
 
+from agents.startup import STARTUP_EAGER_WARM, startup_report
+
+# What serving the agent needs, timed one by one (later imports are cache hits).
+# The graph module, the provider SDK and the compiled graph load in warm_up().
+startup_report.import_modules((
+    "fastapi",
+    "prometheus_client",
+    "langchain_core",
+    "langgraph",
+    "copilotkit",
+    "ag_ui_langgraph",
+))
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 
-from copilotkit import LangGraphAGUIAgent
 from ag_ui_langgraph import add_langgraph_fastapi_endpoint
 
-from agents import brief_analyzer_graph
+from agents.http_client import open_http_client, close_http_client
+from agents.project_cache import project_cache
+from agents.extraction_cache import extraction_cache
+from agents.brief_index import brief_index
+from agents.llm_registry import llm_registry, LLM_WARMUP
+from agents.llm_scheduler import llm_scheduler
+from agents.prompts import prompt_token_stats
+from agents.intent_router import routing_stats, tier_models
+from agents.observability import render_metrics, stats_collector, turn_latency_stats
+from agents.hedging import llm_hedger
+from agents.structured_output import parse_stats
+from agents.state_sync import DeltaStateAgent, sync_stats
+from agents.cancellation import CancellableRunMixin, DisconnectWatchMiddleware, run_registry
+from agents.history import history_stats
+from agents.server import is_primary_worker, readiness, serve
+from agents.shared_state import shared_state
+from agents.bulk import BulkIngestRequest, iter_bulk_extractions, BULK_INGEST_CONCURRENCY
+from agents.scoring import RescoreRequest, iter_rescored, rules_loader
+from agents.checkpointer import (
+    close_checkpointer,
+    create_checkpointer,
+    current_checkpointer,
+    open_checkpointer,
+    run_compaction,
+    use_checkpointer,
+)
+
+# Cache and scheduler counters are exported on /metrics as gauges
+stats_collector.add("project_cache", project_cache.stats)
+stats_collector.add("extraction_cache", extraction_cache.stats)
+stats_collector.add("brief_index", brief_index.stats)
+stats_collector.add("llm_clients", llm_registry.stats)
+stats_collector.add("llm_scheduler", llm_scheduler.stats)
+stats_collector.add("prompt_tokens", prompt_token_stats.stats)
+stats_collector.add("intent_router", routing_stats.stats)
+stats_collector.add("llm_hedging", llm_hedger.stats)
+stats_collector.add("extraction_parsing", parse_stats.stats)
+stats_collector.add("turn_latency", turn_latency_stats)
+stats_collector.add("state_sync", sync_stats.stats)
+stats_collector.add("cancellation", run_registry.stats)
+stats_collector.add("history", history_stats.stats)
+stats_collector.add("startup", startup_report.stats)
+stats_collector.add("scoring", rules_loader.stats)
+stats_collector.add("shared_state", shared_state.stats)
+
+
+def load_graph():
+    """The compiled graph; imports the graph module on first call"""
+    from agents.brief_analyzer import get_brief_analyzer_graph
+
+    return get_brief_analyzer_graph()
+
+
+def warm_up() -> None:
+    """Load the graph module, compile the graph and build the LLM clients.
+
+    Runs in the lifespan (STARTUP_EAGER_WARM), before the fork in prod mode,
+    or on the first agent run; later calls are cheap.
+    """
+    startup_report.import_modules(("langchain_groq", "agents.brief_analyzer", "agents.graph_state"))
+    from agents.brief_analyzer import get_agent_tools
+
+    with startup_report.stage("graph_compile"):
+        load_graph()
+    with startup_report.stage("llm_clients"):
+        llm_registry.preload(tools=get_agent_tools(), models=tier_models())
+    startup_report.warmed = True
+
+
+_warm_lock = asyncio.Lock()
+
+
+async def ensure_warm() -> None:
+    """Warm up once, off the event loop"""
+    if startup_report.warmed:
+        return
+    async with _warm_lock:
+        if not startup_report.warmed:
+            await asyncio.to_thread(warm_up)
+
+
+startup_report.mark("main_import")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own shared resources for the lifetime of the server process"""
+    await open_http_client()
+
+    # Select the persistent checkpointer (if configured) and start retention
+    persistent_checkpointer = await open_checkpointer()
+    checkpointer = persistent_checkpointer or create_checkpointer()
+    use_checkpointer(checkpointer)
+    if startup_report.warmed:
+        # Compiled before the fork with the default backend
+        load_graph().checkpointer = checkpointer
+
+    if STARTUP_EAGER_WARM:
+        await ensure_warm()
+    if LLM_WARMUP:
+        await llm_registry.warm_up()
+    # Workers share the store, so one of them runs retention for all
+    compaction_task = asyncio.create_task(run_compaction(checkpointer)) if is_primary_worker() else None
+    readiness.started = True
+    startup_report.mark_ready()
+    startup_report.log()
+    try:
+        yield
+    finally:
+        readiness.draining = True
+        if compaction_task is not None:
+            compaction_task.cancel()
+        if persistent_checkpointer is not None:
+            await close_checkpointer(persistent_checkpointer)
+        await close_http_client()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="TF Project Builder API",
     description="Backend API for Brief Extraction with CopilotKit",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -45,11 +176,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create the agent using LangGraphAGUIAgent
-agent = LangGraphAGUIAgent(
+# Notice client disconnects mid-run so the agent can cancel its in-flight work
+app.add_middleware(DisconnectWatchMiddleware, path="/")
+
+
+class BriefAnalyzerAgent(CancellableRunMixin, DeltaStateAgent):
+    """AG-UI agent: one live run per thread, cancelled when abandoned or superseded.
+
+    The graph is resolved on use, so creating the agent doesn't compile it.
+    """
+
+    _graph = None
+
+    @property
+    def graph(self):
+        return self._graph if self._graph is not None else load_graph()
+
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+
+    async def run(self, input):
+        await ensure_warm()
+        async for event in super().run(input):
+            yield event
+
+
+# Create the agent (a LangGraphAGUIAgent with cancellable runs and delta state sync)
+agent = BriefAnalyzerAgent(
     name="brief_analyzer",
     description="An AI agent that extracts structured data from raw client briefs for music licensing projects.",
-    graph=brief_analyzer_graph,
+    graph=None,
 )
 
 # Add the LangGraph endpoint at root path (AG-UI protocol)
@@ -63,14 +220,113 @@ async def health_check():
     return {
         "status": "healthy",
         "model": os.getenv("MODEL_NAME", "openai/gpt-oss-20b"),
+        "llm_warmup_ms": llm_registry.warmup_ms,
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until startup has finished and while draining for shutdown"""
+    status = readiness.stats()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/startup")
+async def startup_stats():
+    """Import time per module and warm-up stage timings of this worker"""
+    return startup_report.report()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, tokens and counters"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/cache/projects/{project_id}/invalidate")
+async def invalidate_project(project_id: str):
+    """Drop a cached project after the frontend writes to it"""
+    return {
+        "project_id": project_id,
+        "invalidated": await project_cache.invalidate(project_id),
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Project cache hit/miss/coalesced counters"""
+    return {
+        "projects": project_cache.stats(),
+        "llm_clients": llm_registry.stats(),
+        "extractions": extraction_cache.stats(),
+        "near_duplicates": brief_index.stats(),
+    }
+
+
+@app.get("/checkpoints/stats")
+async def checkpoint_stats():
+    """Checkpointer row counts, payload size and worker memory"""
+    report = getattr(current_checkpointer(), "report", None)
+    if report is None:
+        return {"backend": type(current_checkpointer()).__name__}
+    return await report()
+
+
+@app.get("/state/stats")
+async def state_stats():
+    """State sync bytes per turn, checkpoint delta savings and history compaction"""
+    report = getattr(current_checkpointer(), "report", None)
+    codec = getattr(current_checkpointer(), "codec", None)
+    return {
+        "sync": sync_stats.stats(),
+        "history": history_stats.stats(),
+        "checkpoints": codec.stats() if codec is not None else None,
+        "checkpoint_payload_bytes": (await report())["payload_bytes"] if report is not None else None,
+    }
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """LLM scheduler queue depth, wait times and rate-limit counters"""
+    return {
+        "scheduler": llm_scheduler.stats(),
+        "prompt_tokens": prompt_token_stats.stats(),
+        "routing": routing_stats.stats(),
+        "hedging": llm_hedger.stats(),
+        "parsing": parse_stats.stats(),
+        "cancellation": run_registry.stats(),
+        "turn_latency": turn_latency_stats(),
+    }
+
+
+@app.post("/briefs/bulk")
+async def bulk_ingest(request: BulkIngestRequest):
+    """Extract many briefs concurrently, streaming one NDJSON line per brief"""
+    concurrency = request.concurrency or BULK_INGEST_CONCURRENCY
+    await ensure_warm()
+
+    async def results():
+        async for result in iter_bulk_extractions(request.briefs, concurrency):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/briefs/rescore")
+async def rescore_briefs(request: RescoreRequest):
+    """Recompute completeness, project type and chips under the current scoring rules (NDJSON)"""
+    briefs = ((brief.id, brief.extracted_brief) for brief in request.briefs)
+
+    async def results():
+        async for result in iter_rescored(briefs, request.max_chips):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True,
-    )
+    # SERVER_MODE=dev: single process with reload; SERVER_MODE=prod: pre-forked workers
+    raise SystemExit(serve(app, "main:app", preload=warm_up))
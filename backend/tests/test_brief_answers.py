@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from agents.brief_analyzer import format_project_info, merge_project_data
+from agents.brief_answers import answer_brief_question
+
+PROJECT = {
+    "id": "6f1c",
+    "case_number": "TF-0042",
+    "project_type": "B",
+    "status": "draft",
+    "tf_briefs": [{
+        "project_title": "Acme EV Launch",
+        "client": "Acme Motors",
+        "agency": "Bright & Co",
+        "brand": "Acme EV",
+        "budget_min": 45000,
+        "territory": ["Germany", "Austria"],
+        "submission_deadline": "2026-03-15",
+    }],
+}
+
+
+def fetched_brief() -> dict:
+    """The brief a turn works with after fetching PROJECT"""
+    brief: dict = {}
+    assert merge_project_data(brief, json.dumps(format_project_info(PROJECT))) is None
+    return brief
+
+
+def answer(question: str, brief: dict) -> str | None:
+    result = answer_brief_question(question, brief, project_type="B")
+    return result["answer"] if result else None
+
+
+def test_fetched_project_keeps_client_agency_and_brand():
+    brief = fetched_brief()
+    assert brief["client_name"] == "Acme Motors"
+    assert brief["agency_name"] == "Bright & Co"
+    assert brief["brand_name"] == "Acme EV"
+    assert "client" not in brief
+
+
+def test_questions_on_a_fetched_project():
+    brief = fetched_brief()
+    assert answer("who is the client?", brief) == "The client is Acme Motors."
+    assert answer("what's the agency?", brief) == "The agency is Bright & Co."
+    assert answer("what's the budget?", brief) == "The budget is €45,000 (Type B)."
+    assert answer("when is the deadline?", brief) == "The deadline is 15 March 2026."
+
+
+def test_missing_field_and_open_questions():
+    brief = fetched_brief()
+    assert answer("who sent the brief?", brief) == "The brief sender hasn't been provided yet."
+    assert answer("what music would fit the creative direction?", brief) is None
+
+
+@pytest.mark.parametrize("question", [
+    "Is the budget in USD?",
+    "is the deadline flexible?",
+    "does the client want vocals?",
+    "is the deadline set?",
+    "what's the client's industry?",
+])
+def test_questions_that_are_more_than_a_lookup_go_to_the_llm(question):
+    brief = {**fetched_brief(), "budget_currency": "EUR"}
+    assert answer(question, brief) is None
+
+
+def test_yes_no_question_about_a_yes_no_field():
+    assert answer("are stems required?", {"stems_required": True}) == "Yes, stems are required."
+
+
+def test_list_answers_agree_with_their_label():
+    brief = fetched_brief()
+    assert answer("what's the territory?", brief) == "The territories are Germany and Austria."
+    assert answer("what's the territory?", {"territory": ["Germany"]}) == "The territory is Germany."
+    assert answer("what are the media types?", {"media_types": ["TV"]}) == "The media types are TV."
+
+
+def test_fetch_error_is_reported():
+    assert merge_project_data({}, json.dumps({"error": "Project not found"})) == "Project not found"
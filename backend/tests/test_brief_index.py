@@ -0,0 +1,86 @@
+import asyncio
+
+from agents import brief_index as brief_index_module
+from agents.brief_index import BriefIndex, line_diff
+
+BRIEF = """Hi team,
+Client: Acme Motors
+Brand: Acme EV
+Budget: 50k EUR
+Territory: Germany, Austria
+Media: TV, Online
+Deadline: 15 March 2026
+Looking for an uplifting electronic track with a big build into the final shot.
+Reference: Daft Punk - One More Time
+Best regards, Jane"""
+
+FIELDS = {"client_name": "Acme Motors", "budget_amount": 50000, "territory": ["Germany", "Austria"]}
+
+
+def make_index() -> BriefIndex:
+    return BriefIndex(db_path="", threshold=0.8, max_entries=100, enabled=True)
+
+
+def test_identical_paste_matches_without_changes():
+    index = make_index()
+    asyncio.run(index.add(BRIEF, FIELDS, "project:a"))
+    match = asyncio.run(index.lookup(BRIEF, "project:a"))
+    assert match is not None
+    assert match["extracted_brief"] == FIELDS
+    assert match["changed_text"] == ""
+    assert match["removed_lines"] == 0
+
+
+def test_lookup_never_crosses_scopes():
+    index = make_index()
+    asyncio.run(index.add(BRIEF, FIELDS, "project:a"))
+    assert asyncio.run(index.lookup(BRIEF, "project:b")) is None
+    assert asyncio.run(index.lookup(BRIEF, None)) is None
+
+
+def test_unscoped_briefs_are_not_indexed():
+    index = make_index()
+    asyncio.run(index.add(BRIEF, FIELDS, None))
+    assert index.stats()["entries"] == 0
+
+
+def test_removed_line_is_reported():
+    index = make_index()
+    asyncio.run(index.add(BRIEF, FIELDS, "project:a"))
+    revised = BRIEF.replace("Budget: 50k EUR\n", "")
+    match = asyncio.run(index.lookup(revised, "project:a"))
+    assert match is not None
+    assert match["changed_text"] == ""
+    assert match["removed_lines"] == 1
+
+
+def test_added_line_is_the_only_change():
+    index = make_index()
+    asyncio.run(index.add(BRIEF, FIELDS, "project:a"))
+    revised = BRIEF + "\nStems: required"
+    match = asyncio.run(index.lookup(revised, "project:a"))
+    assert match is not None
+    assert match["changed_text"] == "Stems: required"
+    assert match["removed_lines"] == 0
+
+
+def test_a_paste_is_hashed_once_for_lookup_and_add(monkeypatch):
+    hashed = []
+    signature_of = brief_index_module.signature_of
+    monkeypatch.setattr(brief_index_module, "signature_of", lambda text: hashed.append(text) or signature_of(text))
+    index = make_index()
+
+    async def paste():
+        signature = await index.signature(BRIEF, "project:a")
+        assert await index.lookup(BRIEF, "project:a", signature) is None
+        await index.add(BRIEF, FIELDS, "project:a", signature)
+
+    asyncio.run(paste())
+    assert hashed == [BRIEF]
+    assert index.stats()["entries"] == 1
+
+
+def test_line_diff_counts_replaced_lines_as_removed():
+    changed, removed = line_diff("a\nBudget: 50k\nc", "a\nBudget: 60k\nc")
+    assert changed == "Budget: 60k"
+    assert removed == 1
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from agents import brief_analyzer, bulk
+from agents.brief_analyzer import DEADLINE_FAILURE, EXTRACTION_FAILURE, PARSE_FAILURE
+from agents.bulk import BulkBrief, iter_bulk_extractions
+
+
+async def collect(briefs: list[BulkBrief]) -> list[dict]:
+    return [result async for result in iter_bulk_extractions(briefs, concurrency=2)]
+
+
+def run_with_output(monkeypatch, output: dict, route: str = "llm") -> dict:
+    async def extract_brief(text: str) -> tuple[dict, str]:
+        return output, route
+
+    monkeypatch.setattr(bulk, "extract_brief", extract_brief)
+    [result] = asyncio.run(collect([BulkBrief(id="a", text="brief")]))
+    return result
+
+
+def test_extracted_brief_is_ok(monkeypatch):
+    result = run_with_output(monkeypatch, {
+        "extracted_brief": {"client_name": "Acme"},
+        "completeness": 10,
+        "field_updates": ["client_name"],
+    })
+    assert result["ok"]
+    assert result["extracted_brief"] == {"client_name": "Acme"}
+
+
+@pytest.mark.parametrize("streamed", [{}, {"client_name": "Acme"}])
+def test_deadline_is_an_error_even_with_streamed_fields(monkeypatch, streamed):
+    result = run_with_output(monkeypatch, {
+        "extracted_brief": streamed,
+        "field_updates": list(streamed),
+        EXTRACTION_FAILURE: DEADLINE_FAILURE,
+    })
+    assert not result["ok"]
+    assert "Deadline" in result["error"]
+    assert "extracted_brief" not in result
+
+
+def test_parse_failure_is_an_error(monkeypatch):
+    from langchain_core.messages import AIMessage
+
+    result = run_with_output(monkeypatch, {
+        "messages": [AIMessage(content="I had trouble parsing that brief.")],
+        "field_updates": [],
+        EXTRACTION_FAILURE: PARSE_FAILURE,
+    })
+    assert not result["ok"]
+    assert result["error"] == "I had trouble parsing that brief."
+
+
+@pytest.mark.parametrize("route", ["tool_answer", "field_command", "brief_answer"])
+def test_non_extraction_route_is_an_error(monkeypatch, route):
+    result = run_with_output(monkeypatch, {
+        "extracted_brief": {"client_name": "Acme"},
+        "field_updates": [],
+    }, route=route)
+    assert not result["ok"]
+    assert route in result["error"]
+
+
+def test_briefs_skip_chat_routing(monkeypatch):
+    calls = []
+
+    async def run_extraction(state, config, route, prefetch, user_message, current_brief_dict, **kwargs):
+        calls.append((user_message, current_brief_dict, kwargs))
+        route["route"] = "llm"
+        return {"extracted_brief": {"budget": "40k"}, "field_updates": ["budget"]}
+
+    monkeypatch.setattr(brief_analyzer, "run_extraction", run_extraction)
+    # Would be a field command or a question in a chat turn
+    [result] = asyncio.run(collect([BulkBrief(id="a", text="change the budget to 40k?")]))
+    assert result["ok"]
+    [(user_message, current_brief_dict, kwargs)] = calls
+    assert user_message == "change the budget to 40k?"
+    assert current_brief_dict == {}
+    assert kwargs["is_brief_paste"]
@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agents import cancellation
+from agents.cancellation import (
+    REASON_DISCONNECT,
+    REASON_SUPERSEDED,
+    CancellableRunMixin,
+    DisconnectWatchMiddleware,
+    RunRegistry,
+    client_disconnected,
+    ensure_latest,
+)
+from agents.llm_scheduler import LLMScheduler
+
+
+class SlowLLM:
+    """Model call that takes longer than any test waits"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def ainvoke(self, messages, **kwargs):
+        self.started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "done"
+
+
+class InstantLLM:
+    async def ainvoke(self, messages, **kwargs):
+        return "done"
+
+
+class GatedLLM:
+    """Model call that returns once the gate opens"""
+
+    def __init__(self, gate: asyncio.Event):
+        self.gate = gate
+
+    async def ainvoke(self, messages, **kwargs):
+        await self.gate.wait()
+        return "done"
+
+
+class BaseAgent:
+    """Agent whose run makes one scheduled LLM call, then commits"""
+
+    def __init__(self, llm, scheduler: LLMScheduler):
+        self.llm = llm
+        self.scheduler = scheduler
+
+    async def run(self, input):
+        yield "started"
+        yield await self.scheduler.ainvoke(self.llm, ["hi"])
+        await ensure_latest()
+        yield "committed"
+
+
+class Agent(CancellableRunMixin, BaseAgent):
+    pass
+
+
+@pytest.fixture
+def registry(monkeypatch) -> RunRegistry:
+    registry = RunRegistry(cancel_superseded=True)
+    monkeypatch.setattr(cancellation, "run_registry", registry)
+    return registry
+
+
+async def collect(agent: Agent, thread_id: str) -> list:
+    return [event async for event in agent.run(SimpleNamespace(thread_id=thread_id))]
+
+
+def test_newer_message_cancels_the_running_turn(registry):
+    async def scenario():
+        scheduler = LLMScheduler()
+        slow = SlowLLM()
+        older = asyncio.create_task(collect(Agent(slow, scheduler), "thread-1"))
+        await slow.started.wait()
+
+        newer = await collect(Agent(InstantLLM(), scheduler), "thread-1")
+        return await older, newer, slow, scheduler
+
+    older_events, newer_events, slow, scheduler = asyncio.run(scenario())
+    assert older_events == ["started"]
+    assert newer_events == ["started", "done", "committed"]
+    assert slow.cancelled
+    assert scheduler.active == 0
+    assert registry.cancelled_runs[REASON_SUPERSEDED] == 1
+    assert registry.cancelled_work == {"llm_in_flight": 1}
+    assert registry.tokens_saved > 0
+
+
+def test_client_disconnect_cancels_the_turn(registry):
+    async def scenario():
+        disconnected = asyncio.Event()
+        client_disconnected.set(disconnected)
+        slow = SlowLLM()
+        run = asyncio.create_task(collect(Agent(slow, LLMScheduler()), "thread-1"))
+        await slow.started.wait()
+        disconnected.set()
+        return await run, slow
+
+    events, slow = asyncio.run(scenario())
+    assert events == ["started"]
+    assert slow.cancelled
+    assert registry.cancelled_runs[REASON_DISCONNECT] == 1
+    assert registry.cancelled_work == {"llm_in_flight": 1}
+
+
+def test_superseded_turn_never_commits(registry):
+    registry.cancel_superseded = False
+
+    async def scenario():
+        gate = asyncio.Event()
+        older = asyncio.create_task(collect(Agent(GatedLLM(gate), LLMScheduler()), "thread-1"))
+        await asyncio.sleep(0.01)
+        newer = asyncio.create_task(collect(Agent(GatedLLM(gate), LLMScheduler()), "thread-1"))
+        await asyncio.sleep(0.01)
+        gate.set()
+        return await older, await newer
+
+    older_events, newer_events = asyncio.run(scenario())
+    assert older_events == ["started", "done"]
+    assert newer_events == ["started", "done", "committed"]
+    assert registry.commits_blocked == 1
+    assert registry.cancelled_runs[REASON_SUPERSEDED] == 1
+
+
+def test_middleware_flags_a_disconnect_after_the_body():
+    seen = {}
+
+    async def app(scope, receive, send):
+        await receive()
+        event = client_disconnected.get()
+        await asyncio.wait_for(event.wait(), timeout=1)
+        seen["disconnected"] = event.is_set()
+
+    async def scenario():
+        messages = asyncio.Queue()
+        messages.put_nowait({"type": "http.request", "body": b"{}", "more_body": False})
+        middleware = DisconnectWatchMiddleware(app, path="/")
+        scope = {"type": "http", "method": "POST", "path": "/"}
+        handled = asyncio.create_task(middleware(scope, messages.get, None))
+        await asyncio.sleep(0.01)
+        messages.put_nowait({"type": "http.disconnect"})
+        await handled
+
+    asyncio.run(scenario())
+    assert seen == {"disconnected": True}
+
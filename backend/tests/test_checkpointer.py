@@ -0,0 +1,107 @@
+import asyncio
+from typing import TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from agents.checkpointer import BoundedMemorySaver, CheckpointDeltaCodec, is_delta
+
+
+class TurnState(TypedDict):
+    turn: int
+    draft: str
+
+
+def build_graph(saver: BoundedMemorySaver):
+    def respond(state: TurnState) -> dict:
+        turn = state.get("turn", 0) + 1
+        # A large value rewritten every turn, like the extracted brief
+        return {"turn": turn, "draft": f"{turn:06d}" * 500}
+
+    builder = StateGraph(TurnState)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "respond")
+    builder.add_edge("respond", END)
+    return builder.compile(checkpointer=saver)
+
+
+async def run_turns(graph, saver: BoundedMemorySaver, turns: int, thread_id: str = "t") -> None:
+    config = {"configurable": {"thread_id": thread_id}}
+    for _ in range(turns):
+        await graph.ainvoke({}, config)
+        await saver.compact(max_per_thread=5)
+
+
+def test_compaction_keeps_size_flat_over_many_turns():
+    saver = BoundedMemorySaver()
+    graph = build_graph(saver)
+
+    asyncio.run(run_turns(graph, saver, 20))
+    early = asyncio.run(saver.report())
+    asyncio.run(run_turns(graph, saver, 200))
+    late = asyncio.run(saver.report())
+
+    assert late["checkpoints"] == early["checkpoints"] == 5
+    assert late["blobs"] == early["blobs"]
+    # Only the counters and version strings in each checkpoint grow
+    assert late["payload_bytes"] < early["payload_bytes"] * 1.01
+    assert late["deleted_blobs"] > 0
+
+
+def test_compaction_keeps_the_values_of_remaining_checkpoints():
+    saver = BoundedMemorySaver()
+    graph = build_graph(saver)
+    asyncio.run(run_turns(graph, saver, 30))
+
+    config = {"configurable": {"thread_id": "t"}}
+    history = list(graph.get_state_history(config))
+    assert len(history) == 5
+    for snapshot in history:
+        assert snapshot.values["draft"] == f"{snapshot.values['turn']:06d}" * 500
+    assert graph.get_state(config).values["turn"] == 30
+
+
+def test_expired_thread_drops_its_blobs():
+    saver = BoundedMemorySaver()
+    graph = build_graph(saver)
+    asyncio.run(run_turns(graph, saver, 3, thread_id="old"))
+    asyncio.run(saver.compact(ttl=-1))
+    assert not saver.storage.get("old")
+    assert not any(key[0] == "old" for key in saver.blobs)
+
+
+def test_snapshot_cache_is_bounded_and_evicted_threads_restart_with_a_snapshot():
+    codec = CheckpointDeltaCodec(snapshot_every=10, channels=["draft"], snapshot_cache_size=2)
+    last: dict[str, str] = {}
+
+    def put(thread_id: str, checkpoint_id: str):
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": last.get(thread_id)}}
+        last[thread_id] = checkpoint_id
+        checkpoint = {"id": checkpoint_id, "channel_values": {"draft": {"body": "line " * 200, "rev": checkpoint_id}}}
+        return codec.encode(config, checkpoint)
+
+    put("a", "1")
+    assert is_delta(put("a", "2")["channel_values"]["draft"])
+    put("b", "3")
+    put("a", "4")  # "a" is now the most recently used
+    put("c", "5")
+
+    assert codec.stats()["cached_snapshots"] == 2
+    assert codec.evicted_snapshots == 1
+    assert is_delta(put("a", "6")["channel_values"]["draft"])
+    # "b" was evicted, so its next put is a full snapshot rather than a delta
+    assert not is_delta(put("b", "7")["channel_values"]["draft"])
+
+
+def test_put_after_a_checkpoint_written_elsewhere_is_a_snapshot():
+    codec = CheckpointDeltaCodec(snapshot_every=10, channels=["draft"])
+
+    def put(checkpoint_id: str, parent_id: str | None):
+        config = {"configurable": {"thread_id": "t", "checkpoint_ns": "", "checkpoint_id": parent_id}}
+        checkpoint = {"id": checkpoint_id, "channel_values": {"draft": {"body": "line " * 200, "rev": checkpoint_id}}}
+        return codec.encode(config, checkpoint)
+
+    put("1", None)
+    assert is_delta(put("2", "1")["channel_values"]["draft"])
+    # Checkpoint "3" was written by another worker: this worker's snapshot may be gone
+    assert not is_delta(put("4", "3")["channel_values"]["draft"])
+    assert is_delta(put("5", "4")["channel_values"]["draft"])
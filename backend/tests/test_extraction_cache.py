@@ -0,0 +1,50 @@
+import asyncio
+
+from agents import extraction_cache as cache_module
+from agents.extraction_cache import ExtractionCache, extraction_cache_key
+
+BRIEF = {"brief": {"client_name": "Acme"}, "project_type": None}
+
+
+def key(message: str = "yes, go with that", context: list[str] = ()) -> str:
+    return extraction_cache_key(message, BRIEF, "model", "v1", context=context)
+
+
+def test_same_message_in_a_different_conversation_misses():
+    first = key(context=["", "assistant: Is the budget 40k or 50k?"])
+    second = key(context=["", "assistant: Should the territory be UK or EU?"])
+    assert first != second
+
+
+def test_history_summary_is_part_of_the_key():
+    assert key(context=["Client is Acme", "user: hi"]) != key(context=["Client is Globex", "user: hi"])
+
+
+def test_whitespace_differences_hash_the_same():
+    assert key("Budget  40k\r\n", ["", "user:  hi"]) == key("Budget 40k", ["", "user: hi"])
+
+
+def test_memory_entries_expire_after_the_ttl(monkeypatch):
+    cache = ExtractionCache(db_path="", ttl=60)
+    now = 1000.0
+    monkeypatch.setattr(cache_module.time, "time", lambda: now)
+    asyncio.run(cache.put("k", {"extracted_brief": {}}))
+    now += 59
+    assert asyncio.run(cache.get("k")) == {"extracted_brief": {}}
+    now += 2
+    assert asyncio.run(cache.get("k")) is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_hit_keeps_its_stored_age(monkeypatch, tmp_path):
+    writer = ExtractionCache(db_path=str(tmp_path / "cache.db"), ttl=60)
+    now = 1000.0
+    monkeypatch.setattr(cache_module.time, "time", lambda: now)
+    asyncio.run(writer.put("k", {"extracted_brief": {}}))
+    reader = ExtractionCache(db_path=writer.db_path, ttl=60)
+    now += 50
+    assert asyncio.run(reader.get("k")) is not None
+    assert reader.disk_hits == 1
+    now += 20
+    assert asyncio.run(reader.get("k")) is None
@@ -0,0 +1,113 @@
+from datetime import date
+
+import pytest
+
+from agents.field_commands import (
+    FIELD_COMMAND_MIN_CONFIDENCE,
+    parse_amount,
+    parse_date,
+    parse_field_command,
+    parse_list,
+)
+
+TODAY = date(2026, 3, 2)
+
+
+def applied(message: str) -> dict | None:
+    """Updates the caller would apply without the LLM"""
+    command = parse_field_command(message, TODAY)
+    if command is None or command["confidence"] < FIELD_COMMAND_MIN_CONFIDENCE:
+        return None
+    return command["updates"]
+
+
+def test_command_with_to():
+    assert applied("change the budget to 40k") == {"budget_amount": 40000.0}
+    assert applied("set territory to Germany and Austria") == {"territory": ["Germany", "Austria"]}
+
+
+def test_several_clauses():
+    assert applied("change the budget to €40k and set the deadline to 15 March") == {
+        "budget_amount": 40000.0,
+        "budget_currency": "EUR",
+        "deadline_date": "2026-03-15",
+    }
+
+
+def test_clause_starting_at_a_field_alias():
+    assert applied("set the term to 2 years and stems to yes") == {
+        "term_length": "2 years",
+        "stems_required": True,
+    }
+    assert applied("set the client to Nike and the brand to Air Max") == {
+        "client_name": "Nike",
+        "brand_name": "Air Max",
+    }
+
+
+@pytest.mark.parametrize("message", [
+    "update the client to Nike, please",
+    "update the client to Nike thanks",
+    "set the client to Nike, brand to Air Max",
+])
+def test_free_text_value_that_swallowed_more_goes_to_the_llm(message):
+    assert applied(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "make the client happy",
+    "make the brand pop more",
+    "make the title something catchier",
+    "make the mood darker",
+])
+def test_bare_make_with_free_text_is_not_applied(message):
+    assert applied(message) is None
+
+
+@pytest.mark.parametrize("message, updates", [
+    ("make the budget 40k", {"budget_amount": 40000.0}),
+    ("make the deadline 15 March", {"deadline_date": "2026-03-15"}),
+    ("make the vocals instrumental", {"vocals_preference": "instrumental"}),
+    ("make the stems required", {"stems_required": True}),
+])
+def test_bare_make_with_typed_value_is_applied(message, updates):
+    assert applied(message) == updates
+
+
+def test_questions_and_unknown_clauses_are_not_commands():
+    assert parse_field_command("what's the budget?", TODAY) is None
+    assert parse_field_command("change the budget to 40k and tell me a joke", TODAY) is None
+    assert parse_field_command("set the budget to a lot", TODAY) is None
+
+
+@pytest.mark.parametrize("raw, items", [
+    ("Germany, Austria and Switzerland", ["Germany", "Austria", "Switzerland"]),
+    ("rock and roll", ["rock and roll"]),
+    ("rock and roll, R&B and jazz", ["rock and roll", "R&B", "jazz"]),
+    ("drum & bass / techno", ["drum & bass", "techno"]),
+    ("Germany & Austria", ["Germany", "Austria"]),
+    ("Trinidad and Tobago plus Jamaica", ["Trinidad and Tobago", "Jamaica"]),
+])
+def test_parse_list(raw, items):
+    assert parse_list(raw) == items
+
+
+@pytest.mark.parametrize("raw, parsed", [
+    ("40k", (40000.0, None)),
+    ("€40.000", (40000.0, "EUR")),
+    ("1.5m USD", (1500000.0, "USD")),
+    ("40,000 pounds", (40000.0, "GBP")),
+])
+def test_parse_amount(raw, parsed):
+    assert parse_amount(raw) == parsed
+
+
+@pytest.mark.parametrize("raw, parsed", [
+    ("2026-04-01", "2026-04-01"),
+    ("15/03/2026", "2026-03-15"),
+    ("mid April", "2026-04-15"),
+    ("next friday", "2026-03-13"),
+    ("1 February", "2027-02-01"),
+])
+def test_parse_date(raw, parsed):
+    assert parse_date(raw, TODAY) == parsed
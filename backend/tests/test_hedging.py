@@ -0,0 +1,68 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from agents.hedging import LLMHedger
+from agents.llm_scheduler import llm_scheduler
+
+
+class DelayedModel(GenericFakeChatModel):
+    """Fake chat model that waits before its first chunk"""
+
+    delay: float = 0.0
+
+    async def _astream(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+def model(content: str, delay: float) -> DelayedModel:
+    return DelayedModel(messages=iter([AIMessage(content=content)]), delay=delay)
+
+
+def hedger() -> LLMHedger:
+    hedger = LLMHedger(enabled=True)
+    hedger.hedge_delay = lambda key: 0.02
+    return hedger
+
+
+async def stream_events(hedger: LLMHedger, primary, hedge) -> tuple[str, list[str]]:
+    async def node(_):
+        chunks = [chunk.content async for chunk in hedger.astream(primary, "hi", hedge_llm=hedge)]
+        return "".join(chunks)
+
+    result, streamed = None, []
+    async for event in RunnableLambda(node).astream_events("x", version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            streamed.append(event["data"]["chunk"].content)
+        elif event["event"] == "on_chain_end":
+            result = event["data"]["output"]
+    return result, streamed
+
+
+def test_winning_hedge_stays_out_of_the_event_stream():
+    hedger_ = hedger()
+    result, streamed = asyncio.run(stream_events(hedger_, model("primary", 1.0), model("hedge", 0.0)))
+    assert result == "hedge"
+    assert hedger_.hedge_wins == 1
+    assert streamed == []
+
+
+def test_primary_streams_when_no_hedge_is_sent():
+    hedger_ = hedger()
+    result, streamed = asyncio.run(stream_events(hedger_, model("primary", 0.0), model("hedge", 0.0)))
+    assert result == "primary"
+    assert hedger_.hedged == 0
+    assert "".join(streamed) == "primary"
+
+
+def test_no_hedge_while_the_scheduler_is_throttled(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "throttled", lambda estimate=0: True)
+    hedger_ = hedger()
+    result, _ = asyncio.run(stream_events(hedger_, model("primary", 0.1), model("hedge", 0.0)))
+    assert result == "primary"
+    assert hedger_.hedged == 0
+    assert hedger_.skipped_throttled == 1
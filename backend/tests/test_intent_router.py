@@ -0,0 +1,94 @@
+import pytest
+
+from agents.intent_router import (
+    INTENT_BRIEF_PASTE,
+    INTENT_CHITCHAT,
+    INTENT_FIELD_EDIT,
+    INTENT_QUESTION,
+    KEYWORDS,
+    TIER_LARGE,
+    TIER_SMALL,
+    KeywordAutomaton,
+    intent_tier,
+    route_intent,
+    tier_model,
+)
+
+EMAIL_BRIEF = """From: jane@brightco.com
+Subject: Acme EV launch - music brief
+
+Hi team,
+Client: Acme Motors
+Budget: 50k EUR
+Territory: Germany, Austria
+Deadline: 15 March 2026
+Best regards, Jane"""
+
+PLAIN_BRIEF = (
+    "We are working on the launch film for a new electric car and need an uplifting electronic track "
+    "with a big build into the final shot. The budget is around fifty thousand euros for Germany and "
+    "Austria, online and TV, one year. Vocals are fine but instrumental is preferred."
+)
+
+
+@pytest.fixture(autouse=True)
+def default_tiers(monkeypatch):
+    for intent in (INTENT_BRIEF_PASTE, INTENT_FIELD_EDIT, INTENT_QUESTION, INTENT_CHITCHAT):
+        monkeypatch.delenv(f"INTENT_TIER_{intent.upper()}", raising=False)
+
+
+@pytest.mark.parametrize("message, intent, tier", [
+    # Questions go to the small model
+    ("what's the budget?", INTENT_QUESTION, TIER_SMALL),
+    ("who is the client", INTENT_QUESTION, TIER_SMALL),
+    ("can you tell me the deadline", INTENT_QUESTION, TIER_SMALL),
+    ("summarize the creative direction", INTENT_QUESTION, TIER_SMALL),
+    ("the budget went up?", INTENT_QUESTION, TIER_SMALL),
+    # Edits and statements about fields update the brief with the large model
+    ("budget is 40k", INTENT_FIELD_EDIT, TIER_LARGE),
+    ("change the budget to 40k", INTENT_FIELD_EDIT, TIER_LARGE),
+    ("please set the territory to Germany", INTENT_FIELD_EDIT, TIER_LARGE),
+    ("they want something upbeat", INTENT_FIELD_EDIT, TIER_LARGE),
+    # Acknowledgements
+    ("thanks!", INTENT_CHITCHAT, TIER_SMALL),
+    ("ok sounds good", INTENT_CHITCHAT, TIER_SMALL),
+    ("hello", INTENT_CHITCHAT, TIER_SMALL),
+    # Pasted briefs
+    (EMAIL_BRIEF, INTENT_BRIEF_PASTE, TIER_LARGE),
+    (PLAIN_BRIEF, INTENT_BRIEF_PASTE, TIER_LARGE),
+])
+def test_routing(message, intent, tier):
+    decision = route_intent(message)
+    assert (decision["intent"], decision["tier"]) == (intent, tier)
+
+
+def test_edit_phrased_as_a_question_is_a_question():
+    assert route_intent("can you change the budget to 40k?")["intent"] == INTENT_QUESTION
+
+
+@pytest.mark.parametrize("text, keywords", [
+    ("what's the budget", ["what", "what's", "budget"]),
+    # Whole words only: "hi" in "this", "set" in "asset"
+    ("this asset", []),
+    ("tell me the budget: 40k", ["tell me", "budget", "budget:"]),
+])
+def test_automaton_finds_whole_word_keywords(text, keywords):
+    automaton = KeywordAutomaton(KEYWORDS)
+    assert sorted(match.keyword for match in automaton.scan(text)) == sorted(keywords)
+
+
+def test_tier_mapping_is_configurable(monkeypatch):
+    monkeypatch.setenv("INTENT_TIER_QUESTION", "large")
+    monkeypatch.setenv("INTENT_TIER_CHITCHAT", "huge")
+    assert intent_tier(INTENT_QUESTION) == TIER_LARGE
+    # Unknown tiers fall back to the default
+    assert intent_tier(INTENT_CHITCHAT) == TIER_SMALL
+    assert route_intent("what's the budget?")["tier"] == TIER_LARGE
+
+
+def test_empty_small_tier_uses_the_large_model(monkeypatch):
+    monkeypatch.setenv("MODEL_TIER_LARGE", "big-model")
+    monkeypatch.setenv("MODEL_TIER_SMALL", "small-model")
+    assert (tier_model(TIER_SMALL), tier_model(TIER_LARGE)) == ("small-model", "big-model")
+    monkeypatch.setenv("MODEL_TIER_SMALL", "")
+    assert tier_model(TIER_SMALL) == "big-model"
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+HEAVY = ("langchain_core", "langgraph", "copilotkit", "langchain_groq")
+
+
+def loaded_after_import(module: str) -> list[str]:
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def test_graph_module_imports_without_langchain_langgraph_or_copilotkit():
+    assert loaded_after_import("agents.brief_analyzer") == []
+
+
+def test_compiled_graph_passes_config_to_the_extract_node():
+    from agents.brief_analyzer import create_brief_analyzer_graph
+
+    graph = create_brief_analyzer_graph()
+    assert "config" in graph.builder.nodes["extract"].runnable.func_accepts
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from agents import llm_scheduler as llm_scheduler_module
+from agents.llm_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, LLMScheduler
+
+
+class RateLimitError(Exception):
+    """Provider 429 with a Retry-After header"""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": str(retry_after)}})()
+
+
+class FakeLLM:
+    """Records when each call was sent; fails with the queued errors first"""
+
+    def __init__(self, name: str = "llm", errors: list[Exception] = (), gate: asyncio.Event | None = None):
+        self.name = name
+        self.errors = list(errors)
+        self.gate = gate
+        self.calls: list[float] = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.gate is not None:
+            await self.gate.wait()
+        return self.name
+
+
+@pytest.fixture
+def cancelled_work(monkeypatch) -> list[tuple[str, int]]:
+    recorded: list[tuple[str, int]] = []
+    monkeypatch.setattr(
+        llm_scheduler_module, "record_cancelled_work", lambda kind, tokens=0: recorded.append((kind, tokens))
+    )
+    return recorded
+
+
+def test_interactive_calls_go_ahead_of_bulk():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=1)
+        gate = asyncio.Event()
+        served: list[str] = []
+
+        async def call(name: str, priority: int):
+            served.append(await scheduler.ainvoke(FakeLLM(name, gate=gate), ["hi"], priority=priority))
+
+        holder = asyncio.create_task(call("holder", PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(call("bulk-1", PRIORITY_BULK)),
+            asyncio.create_task(call("bulk-2", PRIORITY_BULK)),
+            asyncio.create_task(call("chat", PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queued == 3
+        gate.set()
+        await asyncio.gather(holder, *waiters)
+        return served
+
+    assert asyncio.run(scenario()) == ["holder", "chat", "bulk-1", "bulk-2"]
+
+
+def test_retry_after_pauses_every_caller():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=4)
+        flaky = FakeLLM("flaky", errors=[RateLimitError(0.1)])
+        other = FakeLLM("other")
+        first = asyncio.create_task(scheduler.ainvoke(flaky, ["hi"]))
+        await asyncio.sleep(0.02)
+        # The 429 pauses the whole scheduler, not just the call that got it
+        assert scheduler.throttled()
+        assert await scheduler.ainvoke(other, ["hi"]) == "other"
+        assert await first == "flaky"
+        return scheduler, flaky, other
+
+    scheduler, flaky, other = asyncio.run(scenario())
+    assert len(flaky.calls) == 2
+    assert flaky.calls[1] - flaky.calls[0] >= 0.1
+    assert other.calls[0] - flaky.calls[0] >= 0.1
+    assert scheduler.rate_limited == 1 and scheduler.retries == 1
+
+
+def test_cancelled_waiter_is_counted_as_saved_work(cancelled_work):
+    async def scenario():
+        scheduler = LLMScheduler(tpm=60_000, max_concurrency=1)
+        await scheduler._acquire(PRIORITY_INTERACTIVE, 100)
+        tokens = scheduler.tokens.tokens
+        waiter = asyncio.create_task(scheduler._acquire(PRIORITY_INTERACTIVE, 500))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return scheduler, tokens
+
+    scheduler, tokens = asyncio.run(scenario())
+    assert cancelled_work == [("llm_queued", 500)]
+    # Nothing was taken from the budget for the waiter
+    assert scheduler.tokens.tokens >= tokens
+    assert scheduler.active == 1
+
+
+def test_waiter_cancelled_after_its_grant_refunds_the_budget(cancelled_work):
+    async def scenario():
+        scheduler = LLMScheduler(rpm=60, tpm=60_000, max_concurrency=1)
+        await scheduler._acquire(PRIORITY_INTERACTIVE, 100)
+        requests, tokens = scheduler.requests.tokens, scheduler.tokens.tokens
+        waiter = asyncio.create_task(scheduler._acquire(PRIORITY_INTERACTIVE, 500))
+        await asyncio.sleep(0)
+        # The holder finishes and the waiter is granted, then cancelled before it runs
+        scheduler._release()
+        assert scheduler.active == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return scheduler, requests, tokens
+
+    scheduler, requests, tokens = asyncio.run(scenario())
+    assert scheduler.active == 0
+    assert scheduler.requests.tokens >= requests
+    assert scheduler.tokens.tokens >= tokens
+    # The grant means the call wasn't saved by waiting in the queue
+    assert cancelled_work == []
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from agents.project_cache import ProjectCache
+
+
+class SlowFetch:
+    """Fetch stub that blocks until released and counts upstream calls"""
+
+    def __init__(self, error: Exception | None = None):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def __call__(self, project_id: str) -> dict:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return {"project_id": project_id}
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def scenario():
+        cache = ProjectCache(ttl=60, max_entries=10)
+        fetch = SlowFetch()
+        waiters = [asyncio.create_task(cache.get_or_fetch("p1", fetch)) for _ in range(5)]
+        await settle()
+        fetch.release.set()
+        results = await asyncio.gather(*waiters)
+        assert results == [{"project_id": "p1"}] * 5
+        assert fetch.calls == 1
+        assert cache.stats()["coalesced"] == 4
+        # Served from the cache afterwards
+        assert await cache.get_or_fetch("p1", fetch) == {"project_id": "p1"}
+        assert fetch.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        cache = ProjectCache(ttl=60, max_entries=10)
+        fetch = SlowFetch()
+        first = asyncio.create_task(cache.get_or_fetch("p1", fetch))
+        second = asyncio.create_task(cache.get_or_fetch("p1", fetch))
+        await settle()
+        first.cancel()
+        await settle()
+        fetch.release.set()
+        assert await second == {"project_id": "p1"}
+        assert first.cancelled()
+        assert fetch.calls == 1
+        assert fetch.cancelled == 0
+
+    asyncio.run(scenario())
+
+
+def test_last_caller_cancelling_stops_the_fetch():
+    async def scenario():
+        cache = ProjectCache(ttl=60, max_entries=10)
+        fetch = SlowFetch()
+        only = asyncio.create_task(cache.get_or_fetch("p1", fetch))
+        await settle()
+        only.cancel()
+        await settle()
+        assert fetch.cancelled == 1
+        assert cache.get("p1") is None
+        # The next lookup starts a new request
+        fetch.release.set()
+        assert await cache.get_or_fetch("p1", fetch) == {"project_id": "p1"}
+        assert fetch.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        cache = ProjectCache(ttl=60, max_entries=10)
+        fetch = SlowFetch(error=RuntimeError("upstream down"))
+        waiters = [asyncio.create_task(cache.get_or_fetch("p1", fetch)) for _ in range(3)]
+        await settle()
+        fetch.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert fetch.calls == 1
+        assert cache.get("p1") is None
+
+    asyncio.run(scenario())
+
+
+def test_ttl_lru_and_invalidation(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("agents.project_cache.time.monotonic", lambda: now[0])
+    cache = ProjectCache(ttl=10, max_entries=2)
+    cache.put("a", {"id": "a"})
+    cache.put("b", {"id": "b"})
+    assert cache.get("a") == {"id": "a"}
+    cache.put("c", {"id": "c"})
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert asyncio.run(cache.invalidate("a")) is True
+    assert cache.get("a") is None
+    now[0] += 11
+    assert cache.get("c") is None
+
+
+@pytest.mark.parametrize("waiters", [1, 3])
+def test_fetch_runs_once_per_miss(waiters):
+    async def scenario():
+        cache = ProjectCache(ttl=60, max_entries=10)
+        fetch = SlowFetch()
+        fetch.release.set()
+        await asyncio.gather(*(cache.get_or_fetch("p1", fetch) for _ in range(waiters)))
+        assert fetch.calls == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import random
+
+from agents.brief_analyzer import calculate_completeness, classify_project_type, generate_suggestion_chips
+from agents.scoring import DEFAULT_RULES, RulesLoader, iter_rescored, load_rules
+
+FIELDS = DEFAULT_RULES["fields"]
+QUESTIONS = DEFAULT_RULES["questions"]
+VALUES = [None, "", [], False, 0, "x", ["a"], True, 5, 50000.0]
+BUDGETS = [None, 0, 100, 2500, 9999.9, 10000, 25000, 99999, 100000, 1e6]
+
+
+# Per-brief scoring as it was before the bitmask engine
+def reference_completeness(brief: dict) -> int:
+    score = max_score = 0
+    for priority, weight in (("critical", 10), ("important", 5), ("helpful", 2)):
+        for field in FIELDS[priority]:
+            max_score += weight
+            value = brief.get(field)
+            if value is not None and value != "" and value != []:
+                score += weight
+    return int((score / max_score) * 100)
+
+
+def reference_project_type(budget: float | None) -> str | None:
+    if budget is None:
+        return None
+    for label, minimum in (("A", 100000), ("B", 25000), ("C", 10000), ("D", 2500)):
+        if budget >= minimum:
+            return label
+    return "E"
+
+
+def reference_chips(brief: dict) -> list[dict]:
+    chips = []
+    for priority, limit in (("critical", None), ("important", 3), ("helpful", 2)):
+        for field in FIELDS[priority]:
+            taken = len([c for c in chips if c["priority"] == priority])
+            if not brief.get(field) and field in QUESTIONS and (limit is None or taken < limit):
+                chips.append({
+                    "id": f"chip_{len(chips)}",
+                    "label": QUESTIONS[field],
+                    "field": field,
+                    "priority": priority,
+                })
+    return chips[:8]
+
+
+def random_briefs(count: int) -> list[tuple[str, dict]]:
+    rng = random.Random(1)
+    fields = [field for priority in ("critical", "important", "helpful") for field in FIELDS[priority]]
+    briefs = []
+    for i in range(count):
+        brief = {field: rng.choice(VALUES) for field in fields if rng.random() < 0.7}
+        brief["budget_amount"] = rng.choice(BUDGETS)
+        briefs.append((str(i), brief))
+    return briefs
+
+
+def test_chat_scoring_matches_the_per_brief_rules():
+    for _, brief in random_briefs(2000):
+        assert calculate_completeness(brief) == reference_completeness(brief)
+        assert generate_suggestion_chips(brief) == reference_chips(brief)
+        assert classify_project_type(brief["budget_amount"]) == reference_project_type(brief["budget_amount"])
+
+
+def test_bulk_scoring_matches_chat_scoring():
+    briefs = random_briefs(2000)
+
+    async def collect():
+        return [result async for result in iter_rescored(briefs, batch_size=300)]
+
+    results = asyncio.run(collect())
+    assert [result["id"] for result in results] == [brief_id for brief_id, _ in briefs]
+    for (_, brief), result in zip(briefs, results):
+        assert result["completeness"] == calculate_completeness(brief)
+        assert result["suggestion_chips"] == generate_suggestion_chips(brief)
+        assert result["project_type"] == classify_project_type(brief["budget_amount"])
+
+
+def test_max_chips_caps_bulk_chips():
+    rules = load_rules()
+    [result] = rules.score_many([("a", {})], max_chips=3)
+    assert [chip["field"] for chip in result["suggestion_chips"]] == FIELDS["critical"][:3]
+
+
+def test_rules_file_overrides_weights_and_tiers(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"weights": {"critical": 20}, "project_types": [["A", 50000]]}))
+    rules = RulesLoader(str(path)).get()
+    assert rules.project_type(60000) == "A"
+    assert rules.project_type(40000) == DEFAULT_RULES["default_project_type"]
+    assert rules.completeness({"client_name": "Acme"}) == int(20 / rules.max_score * 100)
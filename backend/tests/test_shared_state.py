@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from agents import cancellation, project_cache as project_cache_module, shared_state as shared_state_module
+from agents.cancellation import RunRegistry
+from agents.project_cache import ProjectCache
+from agents.shared_state import SharedState
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch) -> SharedState:
+    """One shared store, as every prefork worker opens it (polled on every lookup)"""
+    state = SharedState(str(tmp_path / "shared_state.db"), enabled=True, poll_interval=0)
+    monkeypatch.setattr(cancellation, "shared_state", state)
+    monkeypatch.setattr(project_cache_module, "shared_state", state)
+    return state
+
+
+def worker_view(shared: SharedState, monkeypatch, poll_interval: float = 0) -> SharedState:
+    """Another worker's handle on the same store file"""
+    state = SharedState(shared.db_path, enabled=True, poll_interval=poll_interval)
+    monkeypatch.setattr(project_cache_module, "shared_state", state)
+    return state
+
+
+async def fetch(project_id: str) -> dict:
+    return {"project_id": project_id}
+
+
+def test_invalidation_reaches_other_workers(shared, monkeypatch):
+    worker_a, worker_b = ProjectCache(), ProjectCache()
+    asyncio.run(worker_a.get_or_fetch("p1", fetch))
+    asyncio.run(worker_b.get_or_fetch("p1", fetch))
+
+    asyncio.run(worker_a.invalidate("p1"))
+
+    worker_view(shared, monkeypatch)
+    fetched = []
+
+    async def counting_fetch(project_id: str) -> dict:
+        fetched.append(project_id)
+        return await fetch(project_id)
+
+    asyncio.run(worker_b.get_or_fetch("p1", counting_fetch))
+    assert fetched == ["p1"]
+    # Fetched after the invalidation, so it is kept
+    assert worker_b.get("p1") == {"project_id": "p1"}
+
+
+def test_invalidations_are_polled_once_per_interval(shared, monkeypatch):
+    worker_b = ProjectCache()
+    asyncio.run(worker_b.get_or_fetch("p1", fetch))
+    view = worker_view(shared, monkeypatch, poll_interval=3600)
+    asyncio.run(worker_b.get_or_fetch("p1", fetch))
+    asyncio.run(shared.invalidate_project("p1"))
+
+    # Not seen until the next poll is due
+    asyncio.run(worker_b.get_or_fetch("p1", fetch))
+    assert worker_b.hits == 2
+    assert view.polls == 1
+    view.poll_interval = 0
+    asyncio.run(view.refresh_invalidations())
+    assert worker_b.get("p1") is None
+
+
+def test_invalidation_is_local_when_disabled():
+    worker_a, worker_b = ProjectCache(), ProjectCache()
+    asyncio.run(worker_b.get_or_fetch("p1", fetch))
+    asyncio.run(worker_a.invalidate("p1"))
+    assert worker_b.get("p1") == {"project_id": "p1"}
+
+
+def test_run_superseded_on_another_worker_is_not_latest(shared):
+    worker_a, worker_b = RunRegistry(), RunRegistry()
+
+    async def scenario():
+        older = await worker_a.start("thread-1")
+        assert await worker_a.is_latest(older)
+
+        newer = await worker_b.start("thread-1")
+
+        assert not await worker_a.is_latest(older)
+        assert await worker_b.is_latest(newer)
+        # Other threads are unaffected
+        assert await worker_a.is_latest(await worker_a.start("thread-2"))
+
+    asyncio.run(scenario())
+
+
+def test_an_older_claim_never_replaces_a_newer_one(shared, monkeypatch):
+    now = [2000.0]
+    monkeypatch.setattr(shared_state_module.time, "time", lambda: now[0])
+
+    async def scenario():
+        newer = await shared.claim_run("thread-1")
+        # A run that started earlier but whose claim reached the store later
+        now[0] = 1000.0
+        await shared.claim_run("thread-1")
+        assert await shared.latest_run("thread-1") == newer
+
+    asyncio.run(scenario())
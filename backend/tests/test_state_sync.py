@@ -0,0 +1,126 @@
+import asyncio
+import copy
+from types import SimpleNamespace
+
+import pytest
+from ag_ui.core import EventType, StateSnapshotEvent
+
+from agents import state_sync
+from agents.json_patch import JSONPatchError, apply_patch, make_patch, patch_from_field_updates
+from agents.state_sync import BRIEF_PATCH_KEY, DeltaStateAgent, state_delta
+
+BRIEF = {
+    "client_name": "Acme",
+    "territory": ["Germany"],
+    "budget": {"amount": 40000, "currency": "EUR"},
+}
+
+
+@pytest.mark.parametrize("old, new", [
+    # Nested dict: changed, added and removed keys
+    (BRIEF, {**BRIEF, "budget": {"amount": 50000, "currency": "EUR", "note": "net"}}),
+    (BRIEF, {key: value for key, value in BRIEF.items() if key != "budget"}),
+    # Appended list items
+    (BRIEF, {**BRIEF, "territory": ["Germany", "Austria", "Switzerland"]}),
+    # Shortened or reordered lists are replaced
+    ({**BRIEF, "territory": ["Germany", "Austria"]}, BRIEF),
+    ({**BRIEF, "territory": ["Germany", "Austria"]}, {**BRIEF, "territory": ["Austria", "Germany"]}),
+    # Type changes and keys that need escaping
+    ({"a/b": 1, "c~d": [1]}, {"a/b": "1", "c~d": {"x": 1}}),
+    ({"messages": [{"id": "1", "content": "hi"}]}, {"messages": [{"id": "1", "content": "hi"}, {"id": "2"}]}),
+])
+def test_patch_round_trip(old, new):
+    before = copy.deepcopy(old)
+    ops = make_patch(old, new)
+    assert apply_patch(old, ops) == new
+    # The source document is left untouched
+    assert old == before
+    assert make_patch(old, copy.deepcopy(old)) == []
+
+
+def test_list_append_is_sent_as_additions_only():
+    ops = make_patch({"messages": [1, 2]}, {"messages": [1, 2, 3]})
+    assert ops == [{"op": "add", "path": "/messages/-", "value": 3}]
+
+
+def test_invalid_patches_are_rejected():
+    with pytest.raises(JSONPatchError):
+        make_patch([1], {"a": 1})
+    with pytest.raises(JSONPatchError):
+        apply_patch({"a": {}}, [{"op": "replace", "path": "/a/missing", "value": 1}])
+    with pytest.raises(JSONPatchError):
+        apply_patch({"a": {}}, [{"op": "remove", "path": "/b"}])
+
+
+def test_node_patch_is_used_when_it_reproduces_the_brief():
+    new_brief = {**BRIEF, "client_name": "Globex", "stems_required": True}
+    node_patch = patch_from_field_updates(BRIEF, new_brief, ["client_name", "stems_required"], root="/extracted_brief")
+    baseline = {"extracted_brief": BRIEF, "completeness": 40}
+    snapshot = {"extracted_brief": new_brief, "completeness": 55, BRIEF_PATCH_KEY: node_patch}
+
+    ops, used = state_delta(baseline, snapshot)
+
+    assert used
+    assert apply_patch(baseline, ops) == {key: value for key, value in snapshot.items() if key != BRIEF_PATCH_KEY}
+
+
+def test_stale_or_wrong_node_patch_falls_back_to_a_diff():
+    new_brief = {**BRIEF, "client_name": "Globex"}
+    wrong_patch = [{"op": "replace", "path": "/extracted_brief/client_name", "value": "Initech"}]
+    ops, used = state_delta({"extracted_brief": BRIEF}, {"extracted_brief": new_brief, BRIEF_PATCH_KEY: wrong_patch})
+    assert not used
+    assert apply_patch({"extracted_brief": BRIEF}, ops) == {"extracted_brief": new_brief}
+
+    # The same patch as the baseline's is left over from an earlier turn
+    ops, used = state_delta(
+        {"extracted_brief": BRIEF, BRIEF_PATCH_KEY: wrong_patch},
+        {"extracted_brief": new_brief, BRIEF_PATCH_KEY: wrong_patch},
+    )
+    assert not used
+
+
+def snapshot(state: dict) -> StateSnapshotEvent:
+    return StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
+
+
+def run_agent(monkeypatch, input_state: dict | None, states: list[dict]) -> list:
+    async def run(self, input):
+        for state in states:
+            yield snapshot(state)
+
+    monkeypatch.setattr(state_sync, "STATE_SYNC_MODE", "delta")
+    monkeypatch.setattr(state_sync.LangGraphAGUIAgent, "run", run)
+    agent = DeltaStateAgent.__new__(DeltaStateAgent)
+
+    async def collect():
+        return [event async for event in agent.run(SimpleNamespace(state=input_state))]
+
+    return asyncio.run(collect())
+
+
+def test_client_state_follows_the_deltas(monkeypatch):
+    messages = [{"id": str(i), "role": "user", "content": "brief " * 50} for i in range(5)]
+    first = {"messages": messages, "extracted_brief": BRIEF}
+    second = {"messages": messages + [{"id": "5", "role": "assistant", "content": "ok"}], "extracted_brief": {
+        **BRIEF, "territory": ["Germany", "Austria"],
+    }}
+
+    events = run_agent(monkeypatch, {"messages": messages, "extracted_brief": {}}, [first, second])
+
+    assert [event.type for event in events] == [EventType.STATE_DELTA, EventType.STATE_DELTA]
+    client = {"messages": copy.deepcopy(messages), "extracted_brief": {}}
+    for event, expected in zip(events, [first, second]):
+        # As the client receives it
+        client = apply_patch(client, event.model_dump(mode="json", by_alias=True, exclude_none=True)["delta"])
+        assert client == expected
+
+
+def test_snapshot_is_sent_without_a_baseline_or_when_smaller(monkeypatch):
+    small = {"extracted_brief": {"client_name": "Acme"}}
+    replaced = {"extracted_brief": {"agency_name": "Bright & Co"}}
+
+    events = run_agent(monkeypatch, None, [small, replaced])
+
+    # No baseline for the first; the second delta (remove + add) is larger than the state
+    assert [event.type for event in events] == [EventType.STATE_SNAPSHOT, EventType.STATE_SNAPSHOT]
+    assert events[1].snapshot == replaced
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from typing import TypedDict
+
+import pytest
+
+from agents.structured_output import (
+    build_extraction_model,
+    parse_extraction,
+    parse_extraction_output,
+    parse_stats,
+)
+
+
+class Brief(TypedDict, total=False):
+    client_name: str
+    budget_amount: float
+    territory: list[str]
+    stems_required: bool
+    completeness: int
+
+
+Model = build_extraction_model(Brief)
+
+
+class RepairLLM:
+    """Stub repair model: returns a canned response and records what it was sent"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.prompts: list[str] = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.prompts.append("\n".join(message.content for message in messages))
+        return type("Response", (), {"content": self.content, "usage_metadata": None})()
+
+
+def test_strict_object():
+    parsed = parse_extraction('```json\n{"client_name": "Acme", "completeness": 90}\n```', Model)
+    assert parsed["outcome"] == "strict"
+    # Computed fields are not part of the schema
+    assert parsed["fields"] == {"client_name": "Acme"}
+
+
+def test_tolerant_parse_fixes_commas_comments_and_python_literals():
+    content = """Here is the brief:
+{
+  "client_name": "Acme // Motors", // the client
+  "stems_required": True,
+  "budget_amount": None,
+  "territory": ["Germany", "Austria",],
+}
+Let me know if anything is missing."""
+    parsed = parse_extraction(content, Model)
+    assert parsed["outcome"] == "tolerant"
+    assert parsed["fields"] == {
+        "client_name": "Acme // Motors",
+        "stems_required": True,
+        "budget_amount": None,
+        "territory": ["Germany", "Austria"],
+    }
+    assert parsed["fragments"] == [] and parsed["invalid"] == {}
+
+
+def test_truncated_output_keeps_complete_members_as_partial():
+    content = '{"client_name": "Acme", "budget_amount": 40000, "territory": ["Germany", "Aus'
+    parsed = parse_extraction(content, Model)
+    assert parsed["fields"] == {"client_name": "Acme", "budget_amount": 40000.0}
+    assert len(parsed["fragments"]) == 1
+    assert parsed["fragments"][0].lstrip().startswith('"territory"')
+
+    before = parse_stats.outcomes["partial"]
+    fields = asyncio.run(parse_extraction_output(content, Model))
+    assert fields == {"client_name": "Acme", "budget_amount": 40000.0}
+    assert parse_stats.outcomes["partial"] == before + 1
+
+
+def test_repair_fills_only_the_broken_fields():
+    content = '{"client_name": "Acme", "budget_amount": "forty thousand", "territory": ["Germany", "Aus'
+    repair = RepairLLM(json.dumps({
+        "client_name": "Wrong Client",
+        "budget_amount": 40000,
+        "territory": ["Germany", "Austria"],
+    }))
+
+    fields = asyncio.run(parse_extraction_output(content, Model, repair_llm=repair))
+
+    assert fields == {"client_name": "Acme", "budget_amount": 40000.0, "territory": ["Germany", "Austria"]}
+    [prompt] = repair.prompts
+    # Only the broken members are resent
+    assert '"territory"' in prompt and "forty thousand" in prompt
+    assert "Acme" not in prompt
+
+
+def test_failed_repair_keeps_what_parsed():
+    content = '{"client_name": "Acme", "territory": ["Germ'
+    fields = asyncio.run(parse_extraction_output(content, Model, repair_llm=RepairLLM("not json at all")))
+    assert fields == {"client_name": "Acme"}
+
+
+def test_nothing_usable_raises():
+    with pytest.raises(json.JSONDecodeError):
+        asyncio.run(parse_extraction_output("Sorry, I can't help with that.", Model))